@@ -0,0 +1,108 @@
+# filePath: lambdas/benchmarks/embedding_profiles.py
+"""
+Recall vs. latency vs. memory of the embedding profiles on our control set.
+
+Controls are read from DynamoDB (the same partitions the lambdas load). Each
+control is embedded by its control_query_text; each of its verification
+points is a query whose correct answer is that control. Per profile the
+control vectors are stored as the profile would store them (float32,
+float16 or int8) and every query is searched within its framework:
+    R@1 / R@5      share of queries whose control ranks first / in the top 5
+    embed ms       median Titan latency per text
+    search us      median in-process search time per query
+    bytes/vec      storage per control vector (vs. titan-v1)
+
+Makes one Titan call per control and query per profile (needs Bedrock access).
+
+Usage (from lambdas/):
+    uv run python -m benchmarks.embedding_profiles [profile ...]
+"""
+import statistics
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from src.utils.services.bedrock_runtime import invoke_embedding
+from src.utils.services.controls_repository import ControlsRepository, control_query_text, framework_partition_key, normalize_control
+from src.utils.services.embedding_driver import embed_concurrently
+from src.utils.services.embedding_profiles import PROFILES, EmbeddingProfile, quantize_rows
+from src.utils.services.similarity import normalize_rows, top_k_indices
+from src.utils.settings import OPEN_SEARCH_REGION
+
+FRAMEWORKS = ('GDPR', 'SOC2', 'HIPAA')
+QUERIES_PER_CONTROL = 2
+TOP_K = 5
+
+
+def load_control_set() -> tuple[list[dict[str, Any]], list[tuple[str, str, str]]]:
+    """Controls of every framework, and (framework_id, query text, expected control_id) triples"""
+    repository = ControlsRepository(snapshot_path=None)
+    controls: list[dict[str, Any]] = []
+    queries: list[tuple[str, str, str]] = []
+    for framework in FRAMEWORKS:
+        for item in repository.query_partition(framework_partition_key(framework)):
+            control = normalize_control(item)
+            controls.append(control)
+            for point in control.get('verification_points', [])[:QUERIES_PER_CONTROL]:
+                queries.append((control['framework_id'], str(point), control['control_id']))
+    return controls, queries
+
+
+def embed_timed(profile: EmbeddingProfile, texts: list[str]) -> tuple[list[list[float]], list[float]]:
+    latencies: list[float] = []
+
+    def embed(text: str) -> list[float]:
+        started = time.perf_counter()
+        vector = invoke_embedding(text, model_id=profile.model_id, region_name=OPEN_SEARCH_REGION, **profile.request_options())
+        latencies.append((time.perf_counter() - started) * 1000)
+        return vector
+
+    return embed_concurrently(texts, embed), latencies
+
+
+def evaluate(profile: EmbeddingProfile, controls: list[dict[str, Any]], queries: list[tuple[str, str, str]]) -> dict[str, float]:
+    control_vectors, control_latencies = embed_timed(profile, [control_query_text(c) for c in controls])
+    query_vectors, query_latencies = embed_timed(profile, [text for _, text, _ in queries])
+
+    stored = quantize_rows(normalize_rows(control_vectors), profile.dtype)
+    ranges: dict[str, tuple[int, int]] = {}
+    for row, control in enumerate(controls):
+        start, _ = ranges.get(control['framework_id'], (row, row))
+        ranges[control['framework_id']] = (start, row + 1)
+
+    hits_at_1 = hits_at_k = 0
+    search_us: list[float] = []
+    for (framework_id, _, expected), query in zip(queries, query_vectors):
+        started = time.perf_counter()
+        start, end = ranges[framework_id]
+        q = normalize_rows(query)[0]
+        scores = stored[start:end].astype(np.float32) @ q
+        top = top_k_indices(scores, TOP_K)
+        search_us.append((time.perf_counter() - started) * 1e6)
+
+        ranked = [controls[start + int(i)]['control_id'] for i in top]
+        hits_at_1 += ranked[:1] == [expected]
+        hits_at_k += expected in ranked
+
+    return {
+        'r1': hits_at_1 / len(queries),
+        'rk': hits_at_k / len(queries),
+        'embed_ms': statistics.median(control_latencies + query_latencies),
+        'search_us': statistics.median(search_us),
+        'bytes': profile.bytes_per_vector,
+    }
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(PROFILES)
+    controls, queries = load_control_set()
+    print(f"{len(controls)} controls, {len(queries)} queries, top {TOP_K}")
+
+    baseline = PROFILES['titan-v1'].bytes_per_vector
+    print(f"{'profile':<20}{'R@1':>7}{'R@5':>7}{'embed ms':>10}{'search us':>11}{'bytes/vec':>11}{'smaller':>9}")
+    for name in names:
+        result = evaluate(PROFILES[name], controls, queries)
+        print(f"{name:<20}{result['r1']:>7.3f}{result['rk']:>7.3f}{result['embed_ms']:>10.1f}"
+              f"{result['search_us']:>11.1f}{result['bytes']:>11.0f}{baseline / result['bytes']:>8.0f}x")
@@ -0,0 +1,103 @@
+# filePath: lambdas/benchmarks/filtered_knn.py
+"""
+Post-filtered vs. engine-filtered k-NN as the number of frameworks grows.
+
+For each framework count a throwaway index is created with the production
+mapping (pre/load_indexing.controls_index_body) and filled with random
+vectors. Each query asks for k controls of one framework:
+  post-filter  bool.must [knn, term]  (the previous search_controls body)
+  filtered     knn.filter             (the current search_controls body)
+and reports latency and how many hits actually came back.
+
+Needs a reachable cluster for the configured OPEN_SEARCH_ENV.
+
+Usage (from lambdas/):
+    uv run python -m benchmarks.filtered_knn [queries]
+"""
+import random
+import statistics
+import sys
+import time
+from typing import Any
+
+from opensearchpy import helpers
+
+from pre.load_indexing import controls_index_body
+from src.utils.services.embedding_profiles import get_embedding_profile
+from src.utils.services.opensearch import get_opensearch_client
+
+FRAMEWORK_COUNTS = (1, 3, 10, 30)
+CONTROLS_PER_FRAMEWORK = 150
+PROFILE = get_embedding_profile()
+K = 5
+
+
+def _vector() -> list[float] | list[int]:
+    return PROFILE.index_vector([random.uniform(-1, 1) for _ in range(PROFILE.dimension)])
+
+
+def post_filter_body(vector: list[float] | list[int], framework_id: str) -> dict[str, Any]:
+    return {
+        "size": K,
+        "_source": ["control_id"],
+        "query": {"bool": {"must": [
+            {"knn": {"embedding": {"vector": vector, "k": K}}},
+            {"term": {"framework_id": framework_id}}
+        ]}}
+    }
+
+
+def filtered_body(vector: list[float] | list[int], framework_id: str) -> dict[str, Any]:
+    return {
+        "size": K,
+        "_source": ["control_id"],
+        "query": {"knn": {"embedding": {
+            "vector": vector,
+            "k": K,
+            "filter": {"term": {"framework_id": framework_id}}
+        }}}
+    }
+
+
+def build_index(client: Any, index: str, frameworks: int) -> None:
+    client.indices.create(index=index, body=controls_index_body(PROFILE))
+    actions = (
+        {
+            '_index': index,
+            '_id': f'fw{f}:C-{c}',
+            '_source': {'framework_id': f'fw{f}', 'control_id': f'C-{c}', 'embedding': _vector()}
+        }
+        for f in range(frameworks)
+        for c in range(CONTROLS_PER_FRAMEWORK)
+    )
+    helpers.bulk(client, actions, chunk_size=200)
+    client.indices.refresh(index=index)
+
+
+def measure(client: Any, index: str, frameworks: int, queries: int, body_fn: Any) -> tuple[float, float]:
+    timings: list[float] = []
+    returned: list[int] = []
+    for _ in range(queries):
+        body = body_fn(_vector(), f'fw{random.randrange(frameworks)}')
+        started = time.perf_counter()
+        hits = client.search(index=index, body=body)['hits']['hits']
+        timings.append((time.perf_counter() - started) * 1000)
+        returned.append(len(hits))
+    return statistics.median(timings), statistics.mean(returned)
+
+
+if __name__ == '__main__':
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    client = get_opensearch_client()
+
+    print(f"{'frameworks':>10}{'docs':>8}{'post-filter ms':>16}{'hits':>6}{'filtered ms':>13}{'hits':>6}")
+    for frameworks in FRAMEWORK_COUNTS:
+        index = f'bench_controls_{frameworks}'
+        try:
+            build_index(client, index, frameworks)
+            post_ms, post_hits = measure(client, index, frameworks, queries, post_filter_body)
+            filt_ms, filt_hits = measure(client, index, frameworks, queries, filtered_body)
+            print(f"{frameworks:>10}{frameworks * CONTROLS_PER_FRAMEWORK:>8}"
+                  f"{post_ms:>16.1f}{post_hits:>6.1f}{filt_ms:>13.1f}{filt_hits:>6.1f}")
+        finally:
+            client.indices.delete(index=index, ignore=[404])
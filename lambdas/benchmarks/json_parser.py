@@ -0,0 +1,118 @@
+# filePath: lambdas/benchmarks/json_parser.py
+"""
+Benchmark the single-pass lenient parser against the legacy multi-pass
+sanitize-and-retry pipeline on agent outputs of 10-100KB.
+
+Usage (from lambdas/):
+    uv run python -m benchmarks.json_parser
+    uv run python -m benchmarks.json_parser supervisor_agent_response.txt other_output.txt
+
+Recorded outputs passed as arguments are benchmarked alongside the
+synthetic ones (the supervisor writes its last raw response to
+./supervisor_agent_response.txt).
+"""
+import json
+import re
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+from src.utils.extract_json import LenientJSONError, parse_lenient_json
+
+SIZES_KB = (10, 25, 50, 100)
+REPEATS = 20
+
+
+def legacy_parse(text: str) -> Any:
+    """The pre-existing fence-strip / direct / sanitize / retry pipeline"""
+    if '```' in text:
+        text = re.sub(r'^```(?:json)?\s*\n?', '', text)
+        text = re.sub(r'\n?```\s*$', '', text)
+    text = text.strip()
+    json_str = text[text.find('{'):text.rfind('}') + 1]
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        pass
+    sanitized = json_str.replace('“', '"').replace('”', '"').replace('‘', "'").replace('’', "'")
+    sanitized = re.sub(r'\bTrue\b', 'true', sanitized)
+    sanitized = re.sub(r'\bFalse\b', 'false', sanitized)
+    sanitized = re.sub(r'\bNone\b', 'null', sanitized)
+    sanitized = re.sub(r',(\s*[}\]])', r'\1', sanitized)
+    sanitized = re.sub(r'Decimal\([\'"]([0-9.]+)[\'"]\)', r'\1', sanitized)
+    sanitized = re.sub(r'\\(?!["\\/bfnrtu])', '', sanitized)
+    return json.loads(sanitized)
+
+
+def lenient_parse(text: str) -> Any:
+    return parse_lenient_json(text, expect='object', allow_truncated=True)
+
+
+def _finding(i: int) -> dict[str, Any]:
+    return {
+        'annotation_id': f'0199ae2a-{i:04d}',
+        'page_number': i % 10 + 1,
+        'bookmark_type': 'action_required',
+        'resolved': False,
+        'review_comments': f"🔴 **GDPR-{i}.1** - HIGH\n\n**Issue:** Retention period for \"customer data\" is not specified ({i}).",
+    }
+
+
+def synthetic_output(size_kb: int, dirty: bool) -> str:
+    """Agent-style response: prose, a ```json fence and a ResponseModel payload"""
+    findings: list[dict[str, Any]] = []
+    payload: dict[str, Any] = {
+        'error_message': '',
+        'tool_payload': {'document_id': 'doc-1', 'annotations': findings},
+        'summarised_markdown': '## Compliance summary\n\n' + '- Vague retention clause on page 3\n' * 20,
+        'suggested_next_actions': [{'action': 'review', 'description': 'Review high findings'}],
+    }
+    i = 0
+    while len(json.dumps(payload)) < size_kb * 1024:
+        findings.append(_finding(i))
+        i += 1
+
+    body = json.dumps(payload, indent=2, ensure_ascii=False)
+    if dirty:
+        body = (body
+            .replace('"resolved": false', '"resolved": False')
+            .replace('"error_message": ""', '"error_message": None')
+            .replace('\\"customer data\\"', '“customer data”')
+            .replace('}\n    ]', '},\n    ]'))
+        body = body.replace('\\n\\n**Issue:**', '\n\n**Issue:** see \\d')
+    return f"Here is the result:\n```json\n{body}\n```\nLet me know if you need anything else."
+
+
+def _time(fn: Callable[[str], Any], text: str) -> tuple[float, bool]:
+    timings: list[float] = []
+    ok = True
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        try:
+            fn(text)
+        except (ValueError, LenientJSONError):
+            ok = False
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), ok
+
+
+def run(samples: list[tuple[str, str]]) -> None:
+    print(f"{'sample':<28}{'size':>9}{'legacy ms':>12}{'ok':>5}{'lenient ms':>13}{'ok':>5}")
+    for name, text in samples:
+        legacy_ms, legacy_ok = _time(legacy_parse, text)
+        lenient_ms, lenient_ok = _time(lenient_parse, text)
+        print(f"{name:<28}{len(text) / 1024:>7.1f}KB{legacy_ms:>12.2f}{str(legacy_ok):>5}"
+              f"{lenient_ms:>13.2f}{str(lenient_ok):>5}")
+
+
+if __name__ == '__main__':
+    samples: list[tuple[str, str]] = []
+    for size in SIZES_KB:
+        samples.append((f'clean {size}KB', synthetic_output(size, dirty=False)))
+        samples.append((f'dirty {size}KB', synthetic_output(size, dirty=True)))
+        samples.append((f'truncated {size}KB', synthetic_output(size, dirty=True)[:-(size * 100)]))
+    for path in sys.argv[1:]:
+        with open(path, 'r') as f:
+            samples.append((path[-28:], f.read()))
+    run(samples)
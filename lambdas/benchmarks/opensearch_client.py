@@ -0,0 +1,62 @@
+# filePath: lambdas/benchmarks/opensearch_client.py
+"""
+Per-query OpenSearch latency with and without client reuse.
+
+"fresh" builds a new client (credential lookup, new connection pool, TLS
+handshake) for every query, as search_controls used to; "cached" goes
+through the shared get_opensearch_client. Needs a reachable cluster for the
+configured OPEN_SEARCH_ENV.
+
+Usage (from lambdas/):
+    uv run python -m benchmarks.opensearch_client [queries] [threads]
+"""
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from opensearchpy import OpenSearch
+
+from src.utils.services.embedding_profiles import get_embedding_profile
+from src.utils.services.opensearch import build_opensearch_client, get_opensearch_client
+from src.utils.settings import OPEN_SEARCH_ENV
+
+INDEX = 'compliance_controls'
+PROFILE = get_embedding_profile()
+
+
+def _query_body() -> dict[str, Any]:
+    vector = PROFILE.index_vector([random.uniform(-1, 1) for _ in range(PROFILE.dimension)])
+    return {
+        "size": 5,
+        "_source": ["control_id"],
+        "query": {"knn": {"embedding": {"vector": vector, "k": 5}}}
+    }
+
+
+def _timed_query(get_client: Callable[[], OpenSearch]) -> float:
+    body = _query_body()
+    started = time.perf_counter()
+    get_client().search(index=INDEX, body=body)
+    return (time.perf_counter() - started) * 1000
+
+
+def run(label: str, get_client: Callable[[], OpenSearch], queries: int, threads: int) -> None:
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        timings = list(executor.map(lambda _: _timed_query(get_client), range(queries)))
+    timings.sort()
+    print(f"{label:<8} p50 {statistics.median(timings):8.1f} ms   "
+          f"p95 {timings[int(len(timings) * 0.95) - 1]:8.1f} ms   "
+          f"mean {statistics.mean(timings):8.1f} ms")
+
+
+if __name__ == '__main__':
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    print(f"OPEN_SEARCH_ENV={OPEN_SEARCH_ENV}, {queries} queries, {threads} thread(s)")
+
+    get_opensearch_client().search(index=INDEX, body=_query_body())  # warm the shared client
+    run('fresh', build_opensearch_client, queries, threads)
+    run('cached', get_opensearch_client, queries, threads)
@@ -0,0 +1,70 @@
+# filePath: lambdas/benchmarks/similarity.py
+"""
+find_relevant_chunks scoring: per-pair Python loop vs. one NumPy matrix product.
+
+"loop" is the previous implementation (document_extractor.cosine_similarity
+for every (control, chunk) pair, then a full sort per control); "numpy" is
+similarity.top_k_matches. Both run on the same random 1536-dim vectors and
+their selections are compared.
+
+Usage (from lambdas/):
+    uv run python -m benchmarks.similarity [controls]
+"""
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+from src.utils.services.document_extractor import cosine_similarity
+from src.utils.services.similarity import top_k_matches
+
+DIMENSION = 1536
+CHUNK_COUNTS = (20, 100, 400)
+TOP_K = 3
+THRESHOLD = 0.3
+REPEATS = 5
+
+
+def _vectors(n: int) -> list[list[float]]:
+    # A shared component keeps similarities in the range the threshold is meant for
+    base = [random.gauss(0, 1) for _ in range(DIMENSION)]
+    return [[b + random.gauss(0, 1) for b in base] for _ in range(n)]
+
+
+def loop_top_k(queries: list[list[float]], chunks: list[list[float]]) -> list[list[int]]:
+    selected: list[list[int]] = []
+    for query in queries:
+        scores = [(cosine_similarity(query, chunk), i) for i, chunk in enumerate(chunks)]
+        scores.sort(reverse=True, key=lambda x: x[0])
+        selected.append([i for score, i in scores[:TOP_K] if score > THRESHOLD])
+    return selected
+
+
+def numpy_top_k(queries: list[list[float]], chunks: list[list[float]]) -> list[list[int]]:
+    return [[i for i, _ in row] for row in top_k_matches(queries, chunks, TOP_K, THRESHOLD)]
+
+
+def timed(fn: Callable[..., Any], *args: Any) -> tuple[float, Any]:
+    timings: list[float] = []
+    result = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+if __name__ == '__main__':
+    controls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    random.seed(7)
+    queries = _vectors(controls)
+
+    print(f"{controls} controls x N chunks, {DIMENSION} dims, top {TOP_K} > {THRESHOLD}")
+    print(f"{'chunks':>8}{'loop ms':>12}{'numpy ms':>12}{'speedup':>10}{'same':>6}")
+    for n in CHUNK_COUNTS:
+        chunks = _vectors(n)
+        loop_ms, loop_result = timed(loop_top_k, queries, chunks)
+        numpy_ms, numpy_result = timed(numpy_top_k, queries, chunks)
+        print(f"{n:>8}{loop_ms:>12.1f}{numpy_ms:>12.2f}{loop_ms / numpy_ms:>9.0f}x"
+              f"{str(loop_result == numpy_result):>6}")
@@ -1,52 +1,68 @@
 # filePath: lambdas/comprehensive_check_handler.py
-import json
-from typing import Any
+from typing import Any, Sequence
 from aws_lambda_typing import context as context_
-import boto3
+from src.utils.extract_json import LenientJSONError, parse_lenient_json
 from src.utils.services.inference import comprehensive_file_analysis
+from src.utils.services.analysis_store import analysis_store
 from src.utils.logger import log_with_context
 from src.utils.decorators.auth import require_auth
 from src.utils.bedrock_response import bedrock_response
 from src.utils.services.dynamoDB import DocumentStatus, get_table, DynamoDBTable
-from src.utils.services.embeddings import generate_embedding
-from src.utils.services.document_extractor import extract_text_from_s3, cosine_similarity
-from src.utils.settings import OPEN_SEARCH_REGION
+from src.utils.services.controls_repository import control_query_text, controls_repository
+from src.utils.services.embeddings import generate_embeddings, profile as embedding_profile
+from src.utils.services.document_extractor import extract_text_from_s3
+from src.utils.services.similarity import top_k_matches
+from src.utils.services.bedrock_runtime import analysis_rate_limiter, invoke_claude, log_invocation_metrics
+from src.utils.services.rate_limiter import call_with_throttle_retry
+from src.utils.settings import OPEN_SEARCH_REGION, AGENT_CLAUDE_HAIKU, ANALYSIS_MAX_WORKERS
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from uuid6 import uuid7
 
-bedrock = boto3.client('bedrock-runtime', region_name=OPEN_SEARCH_REGION)  # type: ignore
+# Part of the analysis store key: bump when prompts, chunk selection or scoring change
+ANALYZER_VERSION = f"comprehensive-check/1+{embedding_profile.name}"
 
 def get_all_controls(framework_id: str) -> list[dict[str, Any]]:
     """Get all controls for a framework"""
-    table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
-    response = table.scan(
-        FilterExpression='framework_id = :fid',
-        ExpressionAttributeValues={':fid': f'{framework_id.lower()}_2025'}
-    )
-    return response.get('Items', [])
+    return controls_repository.get_controls(framework_id)
 
-def find_relevant_chunks(chunks: list[dict[str, Any]], controls: list[dict[str, Any]], top_k: int = 3) -> dict[str, list[dict[str, Any]]]:
-    """Find relevant chunks for each control using embeddings"""
-    control_chunks: dict[str, list[dict[str, Any]]] = {}
-    
-    # Pre-compute chunk embeddings
-    chunk_embeddings = [generate_embedding(chunk['text']) for chunk in chunks]
+def get_control_query_embeddings(framework_id: str) -> dict[str, Sequence[float]]:
+    """Query embeddings loaded with the controls, if made by the model that embeds the chunks"""
+    framework = controls_repository.get_framework(framework_id)
+    if framework.embedding_model != embedding_profile.key:
+        return {}
+    return dict(framework.query_embeddings)
+
+def find_relevant_chunks(
+    chunks: list[dict[str, Any]],
+    controls: list[dict[str, Any]],
+    top_k: int = 3,
+    query_embeddings: dict[str, Sequence[float]] | None = None,
+    threshold: float = 0.3
+) -> dict[str, list[dict[str, Any]]]:
+    """Find relevant chunks for each control using embeddings (precomputed control query embeddings are used as-is)"""
+    # Pre-compute chunk embeddings (cached by text hash, so re-checking an
+    # unchanged document makes no embedding calls)
+    chunk_embeddings = generate_embeddings([chunk['text'] for chunk in chunks])
     
-    for control in controls:
-        query = f"{control['requirement']} {' '.join(control.get('keywords', []))}"
-        query_embedding = generate_embedding(query)
-        
-        # Calculate similarity with each chunk
-        chunk_scores = [
-            (cosine_similarity(query_embedding, chunk_emb), chunk)
-            for chunk_emb, chunk in zip(chunk_embeddings, chunks)
-        ]
-        
-        # Get top K chunks
-        chunk_scores.sort(reverse=True, key=lambda x: x[0])
-        control_chunks[control['control_id']] = [c[1] for c in chunk_scores[:top_k] if c[0] > 0.3]
+    # Only controls without a precomputed query embedding are embedded here
+    query_embeddings = dict(query_embeddings or {})
+    missing = [c for c in controls if c['control_id'] not in query_embeddings]
+    if missing:
+        computed = generate_embeddings([control_query_text(c) for c in missing])
+        query_embeddings.update(zip((c['control_id'] for c in missing), computed))
     
-    return control_chunks
+    # One (controls x chunks) similarity matrix, top K chunks per control above the threshold
+    matches = top_k_matches(
+        [query_embeddings[c['control_id']] for c in controls],
+        chunk_embeddings,
+        top_k,
+        threshold
+    )
+    return {
+        control['control_id']: [chunks[i] for i, _ in control_matches]
+        for control, control_matches in zip(controls, matches)
+    }
 
 def analyze_chunks_batch(chunks: list[dict[str, Any]], controls: list[dict[str, Any]], category: str) -> list[dict[str, Any]]:
     """Analyze chunks against multiple controls in one Bedrock call"""
@@ -94,33 +110,140 @@ def analyze_chunks_batch(chunks: list[dict[str, Any]], controls: list[dict[str,
 
         Return ONLY valid JSON array, no additional text."""
 
-    response = bedrock.invoke_model(  # type: ignore
-        modelId='anthropic.claude-3-haiku-20240307-v1:0',
-        body=json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4000,
-            "messages": [{"role": "user", "content": prompt}]
-        })
-    )
-    
-    result = json.loads(response['body'].read())  # type: ignore
-    content = result['content'][0]['text']
+    content = invoke_claude(
+        model_id=AGENT_CLAUDE_HAIKU,
+        prompt=prompt,
+        max_tokens=4000,
+        region_name=OPEN_SEARCH_REGION
+    ).text
     
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
+        # Keep the complete findings if the reply was cut off at max_tokens
+        return parse_lenient_json(content, expect='array', drop_incomplete=True, allow_truncated=True)
+    except LenientJSONError:
         return []
+
+def category_chunks(controls: list[dict[str, Any]], control_chunks: dict[str, list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Unique chunks relevant to any control of a category, in document order"""
+    unique: dict[tuple[tuple[str, Any], ...], dict[str, Any]] = {}
+    for control in controls:
+        for chunk in control_chunks.get(control['control_id'], []):
+            unique.setdefault(tuple(chunk.items()), chunk)
+    return sorted(unique.values(), key=lambda c: (c.get('start_char', 0), c.get('end_char', 0)))
+
+def analyze_categories(
+    controls_by_category: dict[str, list[dict[str, Any]]],
+    control_chunks: dict[str, list[dict[str, Any]]],
+    request_id: str
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """
+    Analyze every category concurrently and merge the results.
+
+    Calls are paced by the shared analysis rate limiter and retried on
+    throttling. Results are merged in category order, so findings and
+    controls_status do not depend on which call finished first.
+
+    Returns:
+        (findings, controls_status)
+    """
+    categories = [(category, controls) for category, controls in controls_by_category.items()]
+
+    def analyze(entry: tuple[str, list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        category, controls = entry
+        chunks = category_chunks(controls, control_chunks)
+        if not chunks:
+            return []
+        log_with_context("INFO", f"Analyzing category: {category}", request_id=request_id)
+        return call_with_throttle_retry(
+            lambda _: analyze_chunks_batch(chunks, controls, category),
+            category,
+            analysis_rate_limiter
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(ANALYSIS_MAX_WORKERS, len(categories)))) as executor:
+        results = list(executor.map(analyze, categories))
+
+    findings: list[dict[str, Any]] = []
+    controls_status: dict[str, str] = {}
+    for batch_findings in results:
+        findings.extend(batch_findings)
+        for finding in batch_findings:
+            for ctrl in finding.get('controls_addressed', []):
+                controls_status[ctrl['control_id']] = ctrl['status']
+    return findings, controls_status
+    
+    
+def analyze_document(document_id: str, framework_id: str, s3_url: str, request_id: str) -> dict[str, Any]:
+    """Extract the document, match text to every control and analyze all categories"""
+    # Extract document text
+    log_with_context("INFO", "Extracting document text", request_id=request_id)
+    chunks = extract_text_from_s3(s3_url)
+    log_with_context("INFO", f"Extracted {len(chunks)} text chunks", request_id=request_id)
+    
+    # Get all controls for framework
+    log_with_context("INFO", f"Loading {framework_id} controls", request_id=request_id)
+    all_controls = get_all_controls(framework_id)
+    log_with_context("INFO", f"Loaded {len(all_controls)} controls", request_id=request_id)
+    
+    # Group controls by category
+    controls_by_category: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for control in all_controls:
+        controls_by_category[control['category']].append(control)
     
+    # Find relevant chunks for each control
+    log_with_context("INFO", "Finding relevant text for controls", request_id=request_id)
+    control_chunks = find_relevant_chunks(chunks, all_controls, query_embeddings=get_control_query_embeddings(framework_id))
     
+    # Analyze all categories concurrently
+    findings, controls_status = analyze_categories(controls_by_category, control_chunks, request_id)
+    
+    # Identify missing controls
+    missing_controls: list[dict[str, str]] = [
+        {
+            'control_id': str(c['control_id']),
+            'control_name': str(c['requirement'])[:100],
+            'severity': str(c['severity']),
+            'reason': 'No relevant text found in document'
+        }
+        for c in all_controls
+        if c['control_id'] not in controls_status
+    ]
+    
+    # Calculate statistics
+    stats = {
+        'total_controls_checked': len(all_controls),
+        'compliant': sum(1 for s in controls_status.values() if s == 'COMPLIANT'),
+        'partial': sum(1 for s in controls_status.values() if s == 'PARTIAL'),
+        'non_compliant': sum(1 for s in controls_status.values() if s == 'NON_COMPLIANT'),
+        'not_addressed': len(missing_controls)
+    }
+    
+    overall_verdict = 'COMPLIANT' if stats['non_compliant'] == 0 and stats['not_addressed'] == 0 else \
+                     'NON_COMPLIANT' if stats['compliant'] < stats['total_controls_checked'] / 2 else 'PARTIAL'
+    
+    log_with_context("INFO", f"Analysis complete: {len(findings)} findings, verdict={overall_verdict}", request_id=request_id)
+    
+    return {
+        'document_id': document_id,
+        'framework': framework_id,
+        'overall_verdict': overall_verdict,
+        'findings': findings,
+        'missing_controls': missing_controls,
+        'statistics': stats
+    }
+
+
 def obtain_inferred_file_record(document_id: str, framework_id: str) -> str | None:
-    """Fetch inferred file record from DynamoDB by scanning for document_id and framework_id"""
+    """Record id of this document's stored analysis (document-framework-index lookup)"""
     table = get_table(DynamoDBTable.INFERRED_FILES)
-    response = table.scan(
-        FilterExpression='document_id = :doc_id AND framework_id = :fw_id',
+    response = table.query(
+        IndexName='document-framework-index',
+        KeyConditionExpression='document_id = :doc_id AND framework_id = :fw_id',
         ExpressionAttributeValues={
             ':doc_id': document_id,
             ':fw_id': framework_id
         },
+        ProjectionExpression='record_id',
         Limit=1
     )
     items = response.get('Items', [])
@@ -199,85 +322,17 @@ def lambda_handler(event: dict[str, Any], context: context_.Context) -> dict[str
         # Ensure s3_url is a string
         s3_url = str(s3_url_raw)
         
-        # Extract document text
-        log_with_context("INFO", "Extracting document text", request_id=context.aws_request_id)
-        chunks = extract_text_from_s3(s3_url)
-        log_with_context("INFO", f"Extracted {len(chunks)} text chunks", request_id=context.aws_request_id)
-        
-        # Get all controls for framework
-        log_with_context("INFO", f"Loading {framework_id} controls", request_id=context.aws_request_id)
-        all_controls = get_all_controls(framework_id)
-        log_with_context("INFO", f"Loaded {len(all_controls)} controls", request_id=context.aws_request_id)
-        
-        # Group controls by category
-        controls_by_category: dict[str, list[dict[str, Any]]] = defaultdict(list)
-        for control in all_controls:
-            controls_by_category[control['category']].append(control)
-        
-        # Find relevant chunks for each control
-        log_with_context("INFO", "Finding relevant text for controls", request_id=context.aws_request_id)
-        control_chunks = find_relevant_chunks(chunks, all_controls)
-        
-        # Analyze by category
-        findings: list[dict[str, Any]] = []
-        controls_status: dict[str, str] = {}
-        
-        for category, controls in controls_by_category.items():
-            log_with_context("INFO", f"Analyzing category: {category}", request_id=context.aws_request_id)
-            
-            # Get unique chunks for this category
-            category_chunks_set: set[tuple[tuple[str, Any], ...]] = set()
-            for control in controls:
-                for chunk in control_chunks.get(control['control_id'], []):
-                    category_chunks_set.add(tuple(chunk.items()))
-            
-            category_chunks_list = [dict(c) for c in category_chunks_set]
-            
-            if category_chunks_list:
-                batch_findings = analyze_chunks_batch(category_chunks_list, controls, category)
-                findings.extend(batch_findings)
-                
-                # Track control status
-                for finding in batch_findings:
-                    for ctrl in finding.get('controls_addressed', []):
-                        controls_status[ctrl['control_id']] = ctrl['status']
-        
-        # Identify missing controls
-        missing_controls: list[dict[str, str]] = [
-            {
-                'control_id': str(c['control_id']),
-                'control_name': str(c['requirement'])[:100],
-                'severity': str(c['severity']),
-                'reason': 'No relevant text found in document'
-            }
-            for c in all_controls
-            if c['control_id'] not in controls_status
-        ]
-        
-        # Calculate statistics
-        stats = {
-            'total_controls_checked': len(all_controls),
-            'compliant': sum(1 for s in controls_status.values() if s == 'COMPLIANT'),
-            'partial': sum(1 for s in controls_status.values() if s == 'PARTIAL'),
-            'non_compliant': sum(1 for s in controls_status.values() if s == 'NON_COMPLIANT'),
-            'not_addressed': len(missing_controls)
-        }
-        
-        overall_verdict = 'COMPLIANT' if stats['non_compliant'] == 0 and stats['not_addressed'] == 0 else \
-                         'NON_COMPLIANT' if stats['compliant'] < stats['total_controls_checked'] / 2 else 'PARTIAL'
-        
-        log_with_context("INFO", f"Analysis complete: {len(findings)} findings, verdict={overall_verdict}", request_id=context.aws_request_id)
-        
-        result: dict[str, Any] = {
-            'document_id': document_id,
-            'framework': framework_id,
-            'overall_verdict': overall_verdict,
-            'findings': findings,
-            'missing_controls': missing_controls,
-            'statistics': stats
-        }
-        
-        inferred_result = comprehensive_file_analysis(result)
+        # Same bytes analyzed before (under any file ID): serve the stored result
+        file_hash = str(document.get('file_hash', ''))
+        inferred_result = None if force_reanalysis else analysis_store.get(
+            file_hash, framework_id, AGENT_CLAUDE_HAIKU, ANALYZER_VERSION, document_id
+        )
+        if inferred_result is not None:
+            log_with_context("INFO", f"Serving stored analysis for file_hash={file_hash}", request_id=context.aws_request_id)
+        else:
+            result = analyze_document(document_id, framework_id, s3_url, context.aws_request_id)
+            inferred_result = comprehensive_file_analysis(result)
+            analysis_store.put(file_hash, framework_id, AGENT_CLAUDE_HAIKU, ANALYZER_VERSION, document_id, inferred_result)
         
         # Store result in DynamoDB InferredFiles table
         inferred_table = get_table(DynamoDBTable.INFERRED_FILES)
@@ -289,6 +344,7 @@ def lambda_handler(event: dict[str, Any], context: context_.Context) -> dict[str
         }
         inferred_table.put_item(Item=item)
         log_with_context("INFO", f"Stored analysis result with record_id={record_id}", request_id=context.aws_request_id)
+        log_invocation_metrics(request_id=context.aws_request_id)
         
         # Update User Files status to COMPLETED
         doc_table.update_item(
@@ -6,7 +6,7 @@ from datetime import datetime, timezone
 from aws_lambda_typing import context as context_
 from src.utils.logger import log_with_context
 from src.utils.decorators.cognito_fe_auth import require_fe_auth
-from src.utils.services.dynamoDB import DocumentStatus, get_table, DynamoDBTable
+from src.utils.services.dynamoDB import DocumentStatus, get_table, DynamoDBTable, user_file_sort_key
 from src.utils.services.s3 import s3_client
 from src.utils.settings import S3_BUCKET_NAME as BUCKET_NAME
 from src.utils.response import response
@@ -118,12 +118,15 @@ def lambda_handler(event: dict[str, Any], context: context_.Context) -> dict[str
             
             # Only deduplicate if same org, same upload type, and status is not 'failed'
             if existing_org_id == org_id and existing_upload_type == upload_type and file_status == 'completed':
-                # Add file to user's uploaded_files set
+                # Add file to user's uploaded_files set (and its upload-time sort key)
                 users_table = get_table(DynamoDBTable.USERS)
                 users_table.update_item(
                     Key={'user_id': user_id},
-                    UpdateExpression='ADD uploaded_files :file_id',
-                    ExpressionAttributeValues={':file_id': {file_id_str}}
+                    UpdateExpression='ADD uploaded_files :file_id, file_sort_keys :sort_key',
+                    ExpressionAttributeValues={
+                        ':file_id': {file_id_str},
+                        ':sort_key': {user_file_sort_key(existing_file.get('created_at', 0), file_id_str)}
+                    }
                 )
                 
                 log_with_context("INFO", 
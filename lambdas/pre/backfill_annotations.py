@@ -0,0 +1,50 @@
+# filePath: lambdas/pre/backfill_annotations.py
+"""
+Index annotations written before FileAnnotationsIndex/DocumentAnnotationsIndex
+were used.
+
+Saves set file_id (FileAnnotationsIndex) and status_framework
+(DocumentAnnotationsIndex) from now on; this indexes older annotations so
+reads and upserts find them too. publish_to_s3.sh runs it on every deploy
+(items that are already indexed are skipped):
+    uv run python -m pre.backfill_annotations
+
+Until it has run against a table, ANNOTATIONS_LEGACY_SCAN=true makes reads
+and upserts scan for the unindexed items instead.
+"""
+from typing import Any, Iterator
+
+from src.utils.services.annotations import annotation_status_key
+from src.utils.services.dynamoDB import DynamoDBTable, get_table
+
+
+def unindexed_annotations(table: Any) -> Iterator[dict[str, Any]]:
+    """Annotations missing file_id or status_framework, from a paginated scan"""
+    scan_kwargs: dict[str, Any] = {
+        'FilterExpression': 'attribute_exists(document_id) AND '
+                            '(attribute_not_exists(file_id) OR attribute_not_exists(status_framework))',
+        'ProjectionExpression': 'annotation_id, document_id, framework_id, resolved'
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+if __name__ == '__main__':
+    table = get_table(DynamoDBTable.ANNOTATIONS)
+    updated = 0
+    for item in unindexed_annotations(table):
+        # Only missing index keys are set, so annotations saved or resolved meanwhile are kept
+        table.update_item(
+            Key={'annotation_id': item['annotation_id']},
+            UpdateExpression='SET file_id = if_not_exists(file_id, :doc_id), status_framework = if_not_exists(status_framework, :status)',
+            ExpressionAttributeValues={
+                ':doc_id': item['document_id'],
+                ':status': annotation_status_key(bool(item.get('resolved', False)), str(item.get('framework_id', '')))
+            }
+        )
+        updated += 1
+    print(f"✅ Indexed {updated} annotations")
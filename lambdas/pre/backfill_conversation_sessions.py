@@ -0,0 +1,62 @@
+# filePath: lambdas/pre/backfill_conversation_sessions.py
+"""
+Build PolicyMateConversationSessions summaries from existing history.
+
+ConversationStore.save_message keeps the summaries current from now on;
+run this once after creating the table so sessions saved before it still
+show up in get_user_sessions:
+    uv run python -m pre.backfill_conversation_sessions
+
+Summaries are rebuilt from every message of the session (message count,
+last message time, title from the first user message) and overwritten.
+"""
+from typing import Any
+
+from src.utils.conversation_store import SESSION_TITLE_MAX_CHARS
+from src.utils.services.dynamoDB import DynamoDBTable, get_table
+
+
+def summarize_history() -> dict[tuple[str, str], dict[str, Any]]:
+    """Session summaries keyed by (user_id, session_id) from a paginated history scan"""
+    table = get_table(DynamoDBTable.CONVERSATION_HISTORY)
+    scan_kwargs: dict[str, Any] = {
+        'ProjectionExpression': 'session_id, #ts, user_id, #role, content, #ttl',
+        'ExpressionAttributeNames': {'#ts': 'timestamp', '#role': 'role', '#ttl': 'ttl'}
+    }
+    summaries: dict[tuple[str, str], dict[str, Any]] = {}
+    first_user_message: dict[tuple[str, str], str] = {}
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if not item.get('user_id'):
+                continue
+            key = (str(item['user_id']), str(item['session_id']))
+            timestamp = str(item['timestamp'])
+            summary = summaries.setdefault(key, {
+                'user_id': key[0],
+                'session_id': key[1],
+                'created_at': timestamp,
+                'last_message_time': timestamp,
+                'message_count': 0
+            })
+            summary['message_count'] += 1
+            summary['created_at'] = min(summary['created_at'], timestamp)
+            summary['last_message_time'] = max(summary['last_message_time'], timestamp)
+            if item.get('ttl') is not None:
+                summary['ttl'] = max(int(item['ttl']), summary.get('ttl', 0))
+            first = first_user_message.get(key)
+            if item.get('role') == 'user' and (first is None or timestamp < first):
+                first_user_message[key] = timestamp
+                summary['title'] = ' '.join(str(item.get('content', '')).split())[:SESSION_TITLE_MAX_CHARS]
+        if 'LastEvaluatedKey' not in response:
+            return summaries
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+if __name__ == '__main__':
+    summaries = summarize_history()
+    with get_table(DynamoDBTable.CONVERSATION_SESSIONS).batch_writer() as batch:
+        for summary in summaries.values():
+            batch.put_item(Item=summary)
+    print(f"✅ Wrote {len(summaries)} session summaries")
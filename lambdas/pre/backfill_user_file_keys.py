@@ -0,0 +1,49 @@
+# filePath: lambdas/pre/backfill_user_file_keys.py
+"""
+Add file_sort_keys to PolicyMateUserFiles items linked before it was kept.
+
+Upload and confirmation handlers add a "<created_at>#<file_id>" key for each
+linked file from now on; run this once so show_doc_tool pages older users
+without reading all their Files items:
+    uv run python -m pre.backfill_user_file_keys
+"""
+from typing import Any, Iterator
+
+from src.utils.services.dynamoDB import DynamoDBTable, batch_get_items, get_table, user_file_sort_key
+
+
+def user_file_links(table: Any) -> Iterator[dict[str, Any]]:
+    """user_id, uploaded_files and file_sort_keys of every user, from a paginated scan"""
+    scan_kwargs: dict[str, Any] = {'ProjectionExpression': 'user_id, uploaded_files, file_sort_keys'}
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+if __name__ == '__main__':
+    table = get_table(DynamoDBTable.DOCUMENTS)
+    updated = 0
+    for user in user_file_links(table):
+        keyed = {str(key).split('#', 1)[1] for key in user.get('file_sort_keys', set())}
+        missing = sorted({str(file_id) for file_id in user.get('uploaded_files', set())} - keyed)
+        if not missing:
+            continue
+        files = batch_get_items(
+            DynamoDBTable.FILES,
+            [{'file_id': file_id} for file_id in missing],
+            projection='file_id, created_at'
+        )
+        if not files:
+            continue
+        table.update_item(
+            Key={'user_id': user['user_id']},
+            UpdateExpression='ADD file_sort_keys :sort_keys',
+            ExpressionAttributeValues={
+                ':sort_keys': {user_file_sort_key(item.get('created_at', 0), str(item['file_id'])) for item in files}
+            }
+        )
+        updated += 1
+    print(f"✅ Added file sort keys for {updated} users")
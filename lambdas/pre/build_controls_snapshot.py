@@ -0,0 +1,95 @@
+# filePath: lambdas/pre/build_controls_snapshot.py
+"""
+Compile compliance controls into the binary snapshot bundled with the lambdas.
+
+Run after pre/load_compliance.py (publish_to_s3.sh runs it before packaging):
+    uv run python -m pre.build_controls_snapshot [--embeddings] [--frameworks GDPR SOC2 HIPAA]
+
+Controls are read from DynamoDB through the same normalization the runtime
+repository uses, so the snapshot's controls_hash is directly comparable with
+the framework's manifest row. A missing manifest row is written here.
+"""
+import argparse
+from datetime import datetime, timezone
+
+from src.utils.services.controls_repository import (
+    MANIFEST_CONTROL_ID,
+    ControlsRepository,
+    compile_framework,
+    control_query_text,
+    framework_partition_key,
+)
+from src.utils.services.controls_snapshot import FrameworkSnapshot, write_snapshot
+from src.utils.services.dynamoDB import DynamoDBTable, get_table
+from src.utils.services.embeddings import generate_embeddings, profile
+from src.utils.settings import CONTROLS_SNAPSHOT_PATH, CONTROLS_VERSION
+
+DEFAULT_FRAMEWORKS = ['GDPR', 'SOC2', 'HIPAA']
+
+
+def ensure_manifest(framework_id: str, compiled: FrameworkSnapshot) -> None:
+    """Record the hash of what was compiled if the partition has no manifest yet"""
+    table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
+    response = table.get_item(Key={'framework_id': framework_id, 'control_id': MANIFEST_CONTROL_ID})
+    recorded = response.get('Item', {}).get('controls_hash')
+
+    if recorded is None:
+        table.put_item(Item={
+            'framework_id': framework_id,
+            'control_id': MANIFEST_CONTROL_ID,
+            'controls_hash': compiled.controls_hash,
+            'control_count': len(compiled.controls),
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        })
+        print(f"  Wrote missing manifest for {framework_id}")
+    elif recorded != compiled.controls_hash:
+        print(f"  ⚠️ Manifest hash for {framework_id} differs from its controls - re-run pre/load_compliance.py")
+
+
+def build_snapshot(frameworks: list[str], version: str, path: str, with_embeddings: bool) -> None:
+    repository = ControlsRepository(snapshot_path=None)
+    compiled_frameworks: list[FrameworkSnapshot] = []
+    vectors: dict[str, list[list[float]]] = {}
+
+    for framework in frameworks:
+        framework_id = framework_partition_key(framework, version)
+        compiled = compile_framework(framework_id, repository.query_partition(framework_id))
+        if not compiled.controls:
+            print(f"  Skipping {framework_id}: no controls")
+            continue
+        ensure_manifest(framework_id, compiled)
+
+        if with_embeddings:
+            if (compiled.embeddings is not None
+                    and compiled.embedding_model == profile.key
+                    and len(compiled.embedding_ids) == len(compiled.controls)):
+                # Query embeddings stored by pre/load_embeddings.py
+                rows = [list(compiled.embedding(row)) for row in range(len(compiled.embedding_ids))]
+            else:
+                rows = generate_embeddings([control_query_text(c) for c in compiled.controls])
+                compiled.embedding_model = profile.key
+                compiled.embedding_dim = len(rows[0])
+                compiled.embedding_ids = [c['control_id'] for c in compiled.controls]
+            vectors[framework_id] = rows
+
+        compiled_frameworks.append(compiled)
+        print(f"  {framework_id}: {len(compiled.controls)} controls, hash {compiled.controls_hash[:12]}")
+
+    size = write_snapshot(
+        path,
+        compiled_frameworks,
+        built_at=datetime.now(timezone.utc).isoformat(),
+        vectors=vectors
+    )
+    print(f"✅ Wrote {path} ({size / 1024:.1f} KB, {len(compiled_frameworks)} frameworks)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frameworks', nargs='+', default=DEFAULT_FRAMEWORKS)
+    parser.add_argument('--version', default=CONTROLS_VERSION)
+    parser.add_argument('--output', default=CONTROLS_SNAPSHOT_PATH)
+    parser.add_argument('--embeddings', action='store_true', help='Also store the query embedding of each control')
+    args = parser.parse_args()
+
+    build_snapshot(args.frameworks, args.version, args.output, args.embeddings)
@@ -1,5 +1,8 @@
 # filePath: lambdas/pre/load_compliance.py
 import json
+from datetime import datetime, timezone
+from typing import Any
+from src.utils.services.controls_repository import MANIFEST_CONTROL_ID, controls_hash, normalize_control
 from src.utils.services.dynamoDB import DynamoDBTable, get_table
 
 table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
@@ -13,6 +16,7 @@ def load_compliance_data(json_file_path: str):
     with table.batch_writer() as batch:
         for framework in data:
             framework_id = framework['framework_id']
+            framework_items: list[dict[str, Any]] = []
             
             for control in framework['controls']:
                 item = {
@@ -38,8 +42,19 @@ def load_compliance_data(json_file_path: str):
                     item['implementation_spec'] = control['implementation_spec']
                 
                 batch.put_item(Item=item)
+                framework_items.append(item)
+            
+            # Manifest row: lets lambdas tell whether their bundled snapshot is current
+            batch.put_item(Item={
+                'framework_id': framework_id,
+                'control_id': MANIFEST_CONTROL_ID,
+                'controls_hash': controls_hash(normalize_control(i) for i in framework_items),
+                'control_count': len(framework_items),
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            })
     
     print("Successfully loaded compliance controls to DynamoDB")
+    print("Run pre.load_embeddings to index them and store their query embeddings")
 
 # Execute loading
 load_compliance_data('./pre/compliance.json')
\ No newline at end of file
@@ -1,23 +1,33 @@
 # filePath: lambdas/pre/load_embeddings.py
-import json
-import boto3
+"""
+Embed compliance controls and bulk-index them into OpenSearch.
+
+Each control row in DynamoDB also gets its query embedding (the embedding of
+control_query_text, stored as float16 bytes) so the lambdas load it with
+the controls instead of embedding every control on every analysis. Run
+after pre/load_compliance.py, which rewrites the rows without them.
+
+Usage (from lambdas/):
+    uv run python -m pre.load_embeddings [--full]
+"""
+import hashlib
+import sys
+import time
+from typing import Any
+from opensearchpy import helpers
+from pre.load_indexing import controls_index_body
+from src.utils.services.controls_repository import control_query_text, is_control_item, query_text_hash
 from src.utils.services.dynamoDB import DynamoDBTable, get_table
-from src.utils.settings import OPEN_SEARCH_REGION
+from src.utils.services.embedding_cache import pack_vector
+from src.utils.services.embedding_driver import embed_concurrently
+from src.utils.services.embeddings import embed_uncached, profile
 
 # Use the centralized OpenSearch client
 from src.utils.services.opensearch import get_opensearch_client
 opensearch = get_opensearch_client()
 
-bedrock = boto3.client('bedrock-runtime', region_name=OPEN_SEARCH_REGION)
-
-def generate_embedding(text: str) -> list[float]:
-    """Generate embedding using Bedrock Titan"""
-    response = bedrock.invoke_model(
-        modelId='amazon.titan-embed-text-v1',
-        body=json.dumps({"inputText": text})
-    )
-    result = json.loads(response['body'].read())
-    return result['embedding']
+EMBED_WORKERS = 8
+BULK_CHUNK_SIZE = 100
 
 def clear_index():
     """Delete and recreate the index"""
@@ -29,74 +39,123 @@ def clear_index():
     
     # Recreate index
     try:
-        index_body = {
-            "mappings": {
-                "properties": {
-                    "framework_id": {"type": "keyword"},
-                    "control_id": {"type": "keyword"},
-                    "requirement": {"type": "text"},
-                    "keywords": {"type": "keyword"},
-                    "category": {"type": "keyword"},
-                    "severity": {"type": "keyword"},
-                    "embedding": {"type": "knn_vector", "dimension": 1536}
-                }
-            }
-        }
-        opensearch.indices.create(index='compliance_controls', body=index_body)
+        opensearch.indices.create(index='compliance_controls', body=controls_index_body())
         print("Created fresh index")
     except Exception as e:
         print(f"Index already exists: {e}")
 
-def load_embeddings():
-    """Load only non-indexed compliance controls from DynamoDB"""
+def embedding_text(item: dict[str, Any]) -> str:
+    """Text that is embedded for a control"""
+    return item['requirement']
+
+
+def text_hash(text: str) -> str:
+    """Hash of the embedded text and the profile that embedded it, so a profile change re-embeds"""
+    return hashlib.sha256(f"{profile.key}\n{text}".encode('utf-8')).hexdigest()
+
+
+def document_id(item: dict[str, Any]) -> str:
+    """Deterministic _id, so re-indexing a control overwrites its document"""
+    return f"{item['framework_id']}:{item['control_id']}"
+
+
+def scan_controls() -> list[dict[str, Any]]:
+    """Every control row in the table (manifest rows excluded)"""
     table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
-    
-    # Scan only non-indexed items
-    response = table.scan(
-        FilterExpression='attribute_not_exists(is_indexed) OR is_indexed = :false',
-        ExpressionAttributeValues={':false': False}
-    )
-    items = response['Items']
+    response = table.scan()
+    items = [item for item in response['Items'] if is_control_item(item)]
     
     while 'LastEvaluatedKey' in response:
-        response = table.scan(
-            FilterExpression='attribute_not_exists(is_indexed) OR is_indexed = :false',
-            ExpressionAttributeValues={':false': False},
-            ExclusiveStartKey=response['LastEvaluatedKey']
-        )
-        items.extend(response['Items'])
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+        items.extend(item for item in response['Items'] if is_control_item(item))
+    return items
+
+
+def embed_all(items: list[dict[str, Any]]) -> list[tuple[dict[str, Any], tuple[list[float], list[float]]]]:
+    """
+    Embed the indexed text and the query text of every control with the
+    concurrent, rate-limited embedding driver; controls with a failed
+    embedding are reported and skipped.
+    """
+    texts = [embedding_text(item) for item in items] + [control_query_text(item) for item in items]
+    vectors = embed_concurrently(texts, embed_uncached, max_workers=EMBED_WORKERS, raise_on_error=False)
+    
+    embedded: list[tuple[dict[str, Any], tuple[list[float], list[float]]]] = []
+    for item, embedding, query_embedding in zip(items, vectors[:len(items)], vectors[len(items):]):
+        if embedding is None or query_embedding is None:
+            print(f"Failed to embed {document_id(item)}")
+            continue
+        embedded.append((item, (embedding, query_embedding)))
+    print(f"Embedded {len(embedded)}/{len(items)} controls")
+    return embedded
+
+
+def load_embeddings(full: bool = False):
+    """
+    Embed and index controls whose requirement or query text changed since they were last indexed.
     
-    print(f"Found {len(items)} non-indexed compliance controls")
+    Args:
+        full: Re-embed every control regardless of its stored hash
+    """
+    started = time.perf_counter()
+    table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
+    
+    # Change detection: the stored hashes are of the texts that were embedded
+    # (and, for embedding_hash, the profile); query embeddings record their model
+    items = scan_controls()
+    pending = [
+        item for item in items
+        if full
+        or item.get('embedding_hash') != text_hash(embedding_text(item))
+        or item.get('query_embedding_hash') != query_text_hash(item)
+        or item.get('query_embedding_model') != profile.key
+    ]
+    print(f"Found {len(pending)}/{len(items)} controls to (re)index")
+    if not pending:
+        return
+    
+    embedded = embed_all(pending)
     
-    for i, item in enumerate(items):
-        try:
-            embedding = generate_embedding(item['requirement'])
-            
-            doc = {
+    actions = (
+        {
+            '_index': 'compliance_controls',
+            '_id': document_id(item),
+            '_source': {
                 'framework_id': item['framework_id'],
                 'control_id': item['control_id'],
                 'requirement': item['requirement'],
                 'keywords': item.get('keywords', []),
                 'category': item['category'],
                 'severity': item['severity'],
-                'embedding': embedding
+                'embedding': profile.index_vector(embedding)
             }
-            
-            opensearch.index(index='compliance_controls', body=doc)
-            
-            # Mark as indexed in DynamoDB
-            table.update_item(
-                Key={'framework_id': item['framework_id'], 'control_id': item['control_id']},
-                UpdateExpression='SET is_indexed = :true',
-                ExpressionAttributeValues={':true': True}
-            )
-            
-            if (i + 1) % 10 == 0:
-                print(f"Indexed {i + 1}/{len(items)} controls")
-        except Exception as e:
-            print(f"Failed to index {item['framework_id']}_{item['control_id']}: {e}")
+        }
+        for item, (embedding, _) in embedded
+    )
+    success, errors = helpers.bulk(opensearch, actions, chunk_size=BULK_CHUNK_SIZE, raise_on_error=False)
+    failed_ids: set[str] = set()
+    for error in errors: # type: ignore[union-attr]
+        op = next(iter(error.values())) # {'index': {'_id': ..., 'error': ...}}
+        failed_ids.add(op.get('_id'))
+        print(f"Bulk index error for {op.get('_id')}: {op.get('error')}")
+    
+    # Record what was indexed and store the query embedding; batch_writer only
+    # puts, so write the whole item back
+    with table.batch_writer() as batch:
+        for item, (_, query_embedding) in embedded:
+            if document_id(item) in failed_ids:
+                continue
+            batch.put_item(Item={
+                **item,
+                'is_indexed': True,
+                'embedding_hash': text_hash(embedding_text(item)),
+                'query_embedding': pack_vector(query_embedding),
+                'query_embedding_model': profile.key,
+                'query_embedding_hash': query_text_hash(item)
+            })
     
-    print(f"Successfully indexed {len(items)} compliance controls")
+    elapsed = time.perf_counter() - started
+    print(f"Successfully indexed {success}/{len(pending)} compliance controls in {elapsed:.1f}s")
 
 if __name__ == '__main__':
-    load_embeddings()
+    load_embeddings(full='--full' in sys.argv)
@@ -1,24 +1,44 @@
 # filePath: lambdas/pre/load_indexing.py
 from typing import Any
+from src.utils.services.embedding_profiles import EmbeddingProfile, get_embedding_profile
 from src.utils.services.opensearch import get_opensearch_client
 
-opensearch = get_opensearch_client()
+# HNSW graph parameters. faiss supports efficient filtering (the framework_id
+# filter inside the knn clause, OpenSearch 2.9+); l2 keeps the ranking the
+# index had with the default method. m=16/ef_construction=128 give near-exact
+# recall at a few hundred vectors per framework; raise ef_search first if
+# recall drops as frameworks are added. Dimension and vector encoding
+# (float32, fp16 scalar quantization or byte vectors) come from the
+# embedding profile.
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 128
+HNSW_EF_SEARCH = 100
 
-index_body: dict[str, Any] = {
-    "mappings": {
-        "properties": {
-            "framework_id": {"type": "keyword"},
-            "control_id": {"type": "keyword"},
-            "requirement": {"type": "text"},
-            "keywords": {"type": "keyword"},
-            "category": {"type": "keyword"},
-            "severity": {"type": "keyword"},
-            "embedding": {
-                "type": "knn_vector",
-                "dimension": 1536
+
+def controls_index_body(profile: EmbeddingProfile | None = None) -> dict[str, Any]:
+    """Settings and mappings of the compliance_controls index for an embedding profile (default: EMBEDDING_PROFILE)"""
+    profile = profile or get_embedding_profile()
+    return {
+        "settings": {
+            "index": {
+                "knn": True,
+                "knn.algo_param.ef_search": HNSW_EF_SEARCH
+            }
+        },
+        "mappings": {
+            "properties": {
+                "framework_id": {"type": "keyword"},
+                "control_id": {"type": "keyword"},
+                "requirement": {"type": "text"},
+                "keywords": {"type": "keyword"},
+                "category": {"type": "keyword"},
+                "severity": {"type": "keyword"},
+                "embedding": profile.knn_field(HNSW_M, HNSW_EF_CONSTRUCTION)
             }
         }
     }
-}
 
-opensearch.indices.create(index='compliance_controls', body=index_body)
+
+if __name__ == '__main__':
+    opensearch = get_opensearch_client()
+    opensearch.indices.create(index='compliance_controls', body=controls_index_body())
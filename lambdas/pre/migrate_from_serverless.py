@@ -1,38 +1,12 @@
 # filePath: lambdas/pre/migrate_from_serverless.py
 #!/usr/bin/env python3
 """Migrate data from AWS OpenSearch Serverless to local OpenSearch"""
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from opensearchpy.helpers import bulk
-from requests_aws4auth import AWS4Auth
-from src.utils.settings import OPEN_SEARCH_HOST, OPEN_SEARCH_REGION
+from pre.opensearch_migrator import copy_documents
+from src.utils.services.opensearch import build_opensearch_client
 
-# AWS OpenSearch Serverless
-service = 'aoss'
-credentials = boto3.Session().get_credentials()
-assert credentials is not None, "AWS credentials not found"
-awsauth = AWS4Auth(
-    credentials.access_key,
-    credentials.secret_key,
-    OPEN_SEARCH_REGION,
-    service,
-    session_token=credentials.token
-)
-
-serverless_client = OpenSearch(
-    hosts=[{'host': f'{OPEN_SEARCH_HOST}.{OPEN_SEARCH_REGION}.aoss.amazonaws.com', 'port': 443}],
-    http_auth=awsauth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
-
-# Local OpenSearch
-local_client = OpenSearch(
-    hosts=[{'host': 'localhost', 'port': 9200}],
-    use_ssl=False,
-    verify_certs=False
-)
+# AWS OpenSearch Serverless -> local OpenSearch
+serverless_client = build_opensearch_client('serverless')
+local_client = build_opensearch_client('local')
 
 def migrate_index(index_name: str):
     """Migrate an index from serverless to local"""
@@ -54,35 +28,9 @@ def migrate_index(index_name: str):
     )
     print(f"Created local index {index_name}")
     
-    # Copy all documents using search_after (serverless doesn't support scroll)
-    docs = []
-    response = serverless_client.search(
-        index=index_name,
-        body={
-            'query': {'match_all': {}},
-            'size': 10000,
-            'sort': [{'_id': 'asc'}]
-        }
-    )
-    
-    hits = response['hits']['hits']
-    docs.extend(hits)
-    print(f"Fetched {len(hits)} documents")
-    
-    # Bulk index to local
-    if docs:
-        actions = [
-            {
-                '_index': index_name,
-                '_id': hit['_id'],
-                '_source': hit['_source']
-            }
-            for hit in docs
-        ]
-        success, failed = bulk(local_client, actions)
-        print(f"Migrated {success} documents, {len(failed)} failed")
-    else:
-        print("No documents to migrate")
+    # Stream all documents using search_after (serverless doesn't support scroll)
+    stats = copy_documents(serverless_client, local_client, index_name, use_scroll=False)
+    print(f"Migrated {stats.written} documents, {stats.failed} failed")
 
 if __name__ == '__main__':
     print("Migrating from AWS OpenSearch Serverless to local...")
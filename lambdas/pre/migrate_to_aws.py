@@ -1,40 +1,13 @@
 # filePath: lambdas/pre/migrate_to_aws.py
 #!/usr/bin/env python3
 """Migrate data from local OpenSearch to AWS OpenSearch Service"""
-import os
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from opensearchpy.helpers import bulk
-from requests_aws4auth import AWS4Auth
-from src.utils.settings import OPEN_SEARCH_HOST, OPEN_SEARCH_REGION
+from pre.load_indexing import controls_index_body
+from pre.opensearch_migrator import copy_documents
+from src.utils.services.opensearch import build_opensearch_client
 
-# Local OpenSearch (always connect to localhost)
-local_client = OpenSearch(
-    hosts=[{'host': 'localhost', 'port': 9200}],
-    use_ssl=False,
-    verify_certs=False
-)
-
-# AWS OpenSearch Service
-service = 'es'
-credentials = boto3.Session().get_credentials()
-assert credentials is not None, "AWS credentials not found"
-
-awsauth = AWS4Auth(
-    credentials.access_key,
-    credentials.secret_key,
-    OPEN_SEARCH_REGION,
-    service,
-    session_token=credentials.token
-)
-
-aws_client = OpenSearch(
-    hosts=[{'host': OPEN_SEARCH_HOST, 'port': 443}],
-    http_auth=awsauth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
+# Local OpenSearch -> AWS OpenSearch Service
+local_client = build_opensearch_client('local')
+aws_client = build_opensearch_client('aws')
 
 def migrate_index(index_name: str, clear_existing: bool = True):
     """Migrate an index from local to AWS"""
@@ -54,17 +27,7 @@ def migrate_index(index_name: str, clear_existing: bool = True):
         mappings = mapping[index_name]['mappings']
     except Exception:
         print(f"Local index not found, using default mapping")
-        mappings = {
-            "properties": {
-                "framework_id": {"type": "keyword"},
-                "control_id": {"type": "keyword"},
-                "requirement": {"type": "text"},
-                "keywords": {"type": "keyword"},
-                "category": {"type": "keyword"},
-                "severity": {"type": "keyword"},
-                "embedding": {"type": "knn_vector", "dimension": 1536}
-            }
-        }
+        mappings = controls_index_body()['mappings']
     
     # Create index on AWS
     try:
@@ -74,7 +37,8 @@ def migrate_index(index_name: str, clear_existing: bool = True):
                 'mappings': mappings,
                 'settings': {
                     'number_of_shards': 1,
-                    'number_of_replicas': 0
+                    'number_of_replicas': 0,
+                    **controls_index_body()['settings']
                 }
             }
         )
@@ -83,28 +47,10 @@ def migrate_index(index_name: str, clear_existing: bool = True):
         print(f"Failed to create index: {e}")
         return
     
-    # Bulk copy documents
+    # Stream documents with a scroll cursor (supported by local OpenSearch)
     try:
-        response = local_client.search(
-            index=index_name,
-            body={'query': {'match_all': {}}, 'size': 10000}
-        )
-        
-        hits = response['hits']['hits']
-        
-        if hits:
-            actions = [
-                {
-                    '_index': index_name,
-                    '_id': hit['_id'],
-                    '_source': hit['_source']
-                }
-                for hit in hits
-            ]
-            success, failed = bulk(aws_client, actions)
-            print(f"Migrated {success} documents, {len(failed)} failed")
-        else:
-            print("No documents found in local index")
+        stats = copy_documents(local_client, aws_client, index_name, use_scroll=True)
+        print(f"Migrated {stats.written} documents, {stats.failed} failed")
     except Exception as e:
         print(f"Error migrating documents: {e}")
         print("Local index may not exist or be empty")
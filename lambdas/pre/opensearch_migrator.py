@@ -0,0 +1,170 @@
+# filePath: lambdas/pre/opensearch_migrator.py
+"""
+Streaming document copy between OpenSearch clusters.
+
+Shared engine of migrate_from_serverless.py and migrate_to_aws.py. The
+source is paged with search_after (or a scroll cursor where the source
+supports it - Serverless does not), and pages are fed lazily into
+helpers.parallel_bulk. parallel_bulk's bounded queue provides backpressure:
+reading stops while the writers are behind, so memory stays at roughly
+queue_size * chunk_size documents whatever the index size.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from opensearchpy import OpenSearch
+from opensearchpy.helpers import parallel_bulk
+
+PAGE_SIZE = 500
+WRITER_THREADS = 4
+WRITER_QUEUE_SIZE = 4
+SCROLL_KEEPALIVE = '2m'
+PROGRESS_EVERY = 5000
+# search_after sort for compliance_controls: keyword fields whose pair is unique
+# (the document _id is "<framework_id>:<control_id>"). Sorting on _id needs
+# fielddata on _id, which Serverless does not allow.
+CONTROLS_SORT: list[dict[str, str]] = [{'framework_id': 'asc'}, {'control_id': 'asc'}]
+
+
+@dataclass
+class MigrationStats:
+    read: int = 0
+    written: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    errors: list[Any] = field(default_factory=list[Any])
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+    def report(self, label: str = 'Progress') -> None:
+        print(f"{label}: read {self.read}, written {self.written}, failed {self.failed} "
+              f"in {self.elapsed:.1f}s ({self.docs_per_second:.0f} docs/s)")
+
+
+def iter_search_after(
+    client: OpenSearch,
+    index: str,
+    page_size: int = PAGE_SIZE,
+    query: dict[str, Any] | None = None,
+    sort: list[dict[str, str]] | None = None
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Pages of hits resuming each page after the last sort value.
+
+    `sort` must be unique per document (keyword fields, the last one a
+    tiebreaker) or documents sharing a sort value across a page boundary
+    are skipped; it defaults to CONTROLS_SORT.
+    """
+    body: dict[str, Any] = {
+        'query': query or {'match_all': {}},
+        'size': page_size,
+        'sort': sort or CONTROLS_SORT
+    }
+    while True:
+        hits = client.search(index=index, body=body)['hits']['hits']
+        if not hits:
+            return
+        yield hits
+        if len(hits) < page_size:
+            return
+        body['search_after'] = hits[-1]['sort']
+
+
+def iter_scroll(
+    client: OpenSearch,
+    index: str,
+    page_size: int = PAGE_SIZE,
+    query: dict[str, Any] | None = None
+) -> Iterator[list[dict[str, Any]]]:
+    """Pages of hits from a scroll cursor (cleared when the generator closes)"""
+    response = client.search(
+        index=index,
+        body={'query': query or {'match_all': {}}, 'size': page_size, 'sort': ['_doc']},
+        scroll=SCROLL_KEEPALIVE
+    )
+    scroll_id = response.get('_scroll_id')
+    try:
+        while response['hits']['hits']:
+            yield response['hits']['hits']
+            response = client.scroll(scroll_id=scroll_id, scroll=SCROLL_KEEPALIVE)
+            scroll_id = response.get('_scroll_id', scroll_id)
+    finally:
+        if scroll_id:
+            try:
+                client.clear_scroll(scroll_id=scroll_id)
+            except Exception:
+                pass
+
+
+def copy_documents(
+    source: OpenSearch,
+    dest: OpenSearch,
+    index: str,
+    dest_index: str | None = None,
+    use_scroll: bool = False,
+    page_size: int = PAGE_SIZE,
+    thread_count: int = WRITER_THREADS,
+    queue_size: int = WRITER_QUEUE_SIZE,
+    sort: list[dict[str, str]] | None = None
+) -> MigrationStats:
+    """
+    Stream every document of `index` on `source` into `dest_index` on `dest`.
+
+    Args:
+        source: Client to read from
+        dest: Client to write to
+        index: Source index name
+        dest_index: Destination index name (defaults to `index`)
+        use_scroll: Page with a scroll cursor instead of search_after
+        page_size: Documents per read page and per bulk request
+        thread_count: Parallel bulk writers
+        queue_size: Bulk requests buffered ahead of the writers
+        sort: Unique search_after sort (defaults to CONTROLS_SORT)
+
+    Returns:
+        MigrationStats with read/written/failed counts and throughput
+    """
+    stats = MigrationStats()
+    if use_scroll:
+        pages = iter_scroll(source, index, page_size)
+    else:
+        pages = iter_search_after(source, index, page_size, sort=sort)
+
+    def actions() -> Iterator[dict[str, Any]]:
+        for page in pages:
+            stats.read += len(page)
+            for hit in page:
+                yield {
+                    '_index': dest_index or index,
+                    '_id': hit['_id'],
+                    '_source': hit['_source']
+                }
+
+    for ok, info in parallel_bulk(
+        dest,
+        actions(),
+        thread_count=thread_count,
+        chunk_size=page_size,
+        queue_size=queue_size,
+        raise_on_error=False
+    ):
+        if ok:
+            stats.written += 1
+        else:
+            stats.failed += 1
+            if len(stats.errors) < 10:
+                stats.errors.append(info)
+        if (stats.written + stats.failed) % PROGRESS_EVERY == 0:
+            stats.report()
+
+    stats.report('Done')
+    for error in stats.errors:
+        print(f"  Failed: {error}")
+    return stats
@@ -26,6 +26,12 @@ uv pip install --python 3.12 --target $BUILD_DIR .
 # Copy the handler file
 cp "$HANDLER_FILE" $BUILD_DIR/
 
+# Compile the controls snapshot bundled under src/data (falls back to DynamoDB if this fails)
+uv run python -m pre.build_controls_snapshot || echo "⚠️ Controls snapshot build failed, packaging without it"
+
+# Index annotations saved before the Annotations GSI keys (already indexed items are skipped)
+uv run python -m pre.backfill_annotations || { echo "❌ Error: Annotations backfill failed!"; exit 1; }
+
 # Copy the src directory (contains agents, utils, etc.)
 cp -r src $BUILD_DIR/
 
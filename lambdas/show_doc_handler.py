@@ -1,11 +1,12 @@
 # filePath: lambdas/show_doc_handler.py
 # Bedrock Agent Lambda handler - uses shared tool logic from src/tools/
 
+import json
 from typing import Any
 from aws_lambda_typing import context as context_
 from src.utils.logger import log_with_context
 from src.utils.decorators.auth import require_auth
-from src.utils.bedrock_response import bedrock_response
+from src.utils.bedrock_response import bedrock_response, get_bedrock_parameters
 from src.tools.show_doc import show_doc_tool
 
 
@@ -21,8 +22,13 @@ def lambda_handler(event: dict[str, Any], context: context_.Context) -> dict[str
         if not user_id:
             raise ValueError('user_id is required')
         
+        # Optional paging (GET /documents query parameters)
+        params = get_bedrock_parameters(event)
+        limit = int(params['limit']) if params.get('limit') else None
+        last_key: dict[str, Any] | None = json.loads(params['last_key']) if params.get('last_key') else None
+        
         # Use shared tool logic
-        result = show_doc_tool(user_id=user_id)
+        result = show_doc_tool(user_id=user_id, limit=limit, last_key=last_key)
         
         log_with_context("INFO", f"Found {result['count']} documents for user {user_id}", request_id=context.aws_request_id)
         
@@ -17,8 +17,8 @@ from src.utils.settings import AGENT_CLAUDE_HAIKU
 from strands.models import BedrockModel
 from strands import tool  # type: ignore[attr-defined]
 import traceback
-import json
 import re
+from src.utils.extract_json import LenientJSONError, parse_lenient_json
 
 
 class SuggestedAction(BaseModel):
@@ -639,9 +639,9 @@ app = BedrockAgentCoreApp()
 def parse_agent_json(text: str) -> dict[str, Any]:
     """
     Parse JSON from agent response with comprehensive error handling.
-    Handles: smart quotes, Python syntax, malformed JSON, truncation, XML-like tags.
+    Handles: smart quotes, Python syntax, malformed JSON, XML-like tags.
+    Truncated JSON raises ValueError instead of returning the fields parsed so far.
     """
-    sanitized: str = "{}"
     if not text or not text.strip():
         raise ValueError("Empty response from agent")
     
@@ -655,8 +655,8 @@ def parse_agent_json(text: str) -> dict[str, Any]:
             suggested_actions_str = actions_match.group(1).strip() if actions_match else "[]"
             
             try:
-                suggested_actions = json.loads(suggested_actions_str)
-            except json.JSONDecodeError:
+                suggested_actions = parse_lenient_json(suggested_actions_str, expect='array')
+            except LenientJSONError:
                 suggested_actions = []
             
             return {
@@ -668,83 +668,14 @@ def parse_agent_json(text: str) -> dict[str, Any]:
         except Exception as e:
             print(f"⚠️ Failed to parse XML-like tags: {e}")
     
+    # Step 1: Single lenient pass (fences, smart quotes, Python syntax)
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
-    # Step 1: Clean and extract JSON
-    text = text.strip()
-    
-    # Remove markdown code blocks
-    if '```' in text:
-        text = re.sub(r'^```(?:json)?\s*\n?', '', text)
-        text = re.sub(r'\n?```\s*$', '', text)
-    
-    # Find JSON object boundaries
-    start_idx = text.find('{')
-    end_idx = text.rfind('}')
-    
-    if start_idx == -1 or end_idx == -1:
+        return parse_lenient_json(text, expect='object')
+    except LenientJSONError as e:
         raise ValueError(
-            f"No JSON object found in response.\n"
+            f"No complete JSON object in response: {e}\n"
             f"Response preview: {text[:500]}"
         )
-    
-    json_str = text[start_idx:end_idx + 1]
-    
-    # Step 2: Fix smart/curly quotes
-    json_str = (json_str
-        .replace('"', '"')
-        .replace('"', '"')
-        .replace(''', "'")
-        .replace(''', "'")
-    )
-    
-    # Step 3: Attempt parsing
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        pass
-    
-    # Step 4: Sanitize Python syntax
-    try:
-        sanitized = json_str
-        
-        # Fix Python types
-        sanitized = re.sub(r'\bTrue\b', 'true', sanitized)
-        sanitized = re.sub(r'\bFalse\b', 'false', sanitized)
-        sanitized = re.sub(r'\bNone\b', 'null', sanitized)
-        
-        # Remove trailing commas
-        sanitized = re.sub(r',(\s*[}\]])', r'\1', sanitized)
-        
-        # Fix Decimal objects
-        sanitized = re.sub(r'Decimal\([\'"]([0-9.]+)[\'"]\)', r'\1', sanitized)
-        
-        # Remove invalid backslash escapes
-        sanitized = re.sub(r'\\(?!["\\/bfnrtu])', '', sanitized)
-        
-        return json.loads(sanitized)
-    except json.JSONDecodeError as second_error:
-        error_pos = second_error.pos
-        context_start = max(0, error_pos - 150)
-        context_end = min(len(sanitized), error_pos + 150)
-        error_context = sanitized[context_start:context_end]
-        is_truncated = not sanitized.rstrip().endswith('}')
-        
-        error_details = [
-            f"JSON parsing failed after sanitization",
-            f"Error at position {error_pos}: {second_error.msg}",
-            f"Context: ...{error_context}...",
-            f"Total length: {len(sanitized)} characters",
-        ]
-        
-        if is_truncated:
-            error_details.append("⚠️ JSON appears TRUNCATED (doesn't end with })")
-            error_details.append(f"Ends with: {sanitized[-200:]}")
-        
-        raise ValueError("\n".join(error_details))
 
 
 @app.entrypoint  # type: ignore[misc]
@@ -9,6 +9,7 @@ from strands import tool  # type: ignore[attr-defined]
 import traceback
 import json
 import re
+from src.utils.extract_json import LenientJSONError, parse_lenient_json
 
 
 class SuggestedAction(BaseModel):
@@ -530,59 +531,14 @@ supervisor_agent = Agent(
 app = BedrockAgentCoreApp()
 
 
-def sanitize_child_agent_json(json_str: str) -> str:
-    """
-    Sanitize JSON string from child agents to fix common parsability issues.
-    
-    Handles:
-    - Unescaped newlines in strings
-    - Unescaped quotes in strings
-    - Invalid backslash escapes
-    - Smart/curly quotes
-    - Python syntax (True/False/None)
-    - Trailing commas
-    - Control characters
-    
-    Args:
-        json_str: Raw JSON string from child agent
-    
-    Returns:
-        Sanitized JSON string ready for parsing
-    """
-    if not json_str or not json_str.strip():
-        return json_str
-    
-    # Step 1: Fix smart/curly quotes to straight quotes
-    sanitized = json_str
-    sanitized = sanitized.replace('"', '"').replace('"', '"')
-    sanitized = sanitized.replace(''', "'").replace(''', "'")
-    
-    # Step 2: Fix Python types to JSON types
-    sanitized = re.sub(r'\bTrue\b', 'true', sanitized)
-    sanitized = re.sub(r'\bFalse\b', 'false', sanitized)
-    sanitized = re.sub(r'\bNone\b', 'null', sanitized)
-    
-    # Step 3: Remove trailing commas before closing brackets/braces
-    sanitized = re.sub(r',(\s*[}\]])', r'\1', sanitized)
-    
-    # Step 4: Fix Decimal objects
-    sanitized = re.sub(r'Decimal\([\'"]([0-9.]+)[\'"]\)', r'\1', sanitized)
-    
-    # Step 5: Fix invalid backslash escapes
-    # Valid JSON escapes: \", \\, \/, \b, \f, \n, \r, \t, \uXXXX
-    # This removes backslashes NOT followed by valid escape chars
-    sanitized = re.sub(r'\\(?!["\\/bfnrtu])', '', sanitized)
-    
-    return sanitized
-
-
 def parse_child_agent_response(response_str: str) -> dict[str, Any]:
     """
     Parse and validate child agent JSON response with comprehensive error recovery.
     
     This function handles responses from child agents (compliance_agent, annotations_agent)
-    which may have JSON formatting issues. It attempts multiple strategies to parse
-    the response successfully.
+    which may have JSON formatting issues. A single lenient pass recovers code fences,
+    smart quotes, Python literals, trailing commas and stray quotes. Truncated output
+    is rejected rather than forwarded as a partial response.
     
     Args:
         response_str: JSON string response from child agent
@@ -591,115 +547,31 @@ def parse_child_agent_response(response_str: str) -> dict[str, Any]:
         Parsed dictionary matching ResponseModel structure
     
     Raises:
-        ValueError: If response cannot be parsed after all recovery attempts
+        ValueError: If response cannot be parsed or is truncated
     """
     if not response_str or not response_str.strip():
         raise ValueError("Empty response from child agent")
     
-    original_str = response_str
-    
-    # Remove any markdown code blocks
-    if '```' in response_str:
-        response_str = re.sub(r'^```(?:json)?\s*\n?', '', response_str)
-        response_str = re.sub(r'\n?```\s*$', '', response_str)
-    
-    # Extract JSON object boundaries
-    response_str = response_str.strip()
-    start_idx = response_str.find('{')
-    end_idx = response_str.rfind('}')
-    
-    if start_idx == -1 or end_idx == -1:
-        raise ValueError(
-            f"No JSON object found in child agent response.\n"
-            f"Response preview: {original_str[:500]}"
-        )
-    
-    json_str = response_str[start_idx:end_idx + 1]
-    
-    # Attempt 1: Direct parse (best case)
     try:
-        parsed = json.loads(json_str)
-        print("✅ Child agent response parsed successfully (direct parse)")
-        return parsed
-    except json.JSONDecodeError as e:
-        print(f"⚠️ Direct parse failed: {e.msg} at position {e.pos}")
-    
-    # Attempt 2: Sanitize and parse
-    sanitized = ""
-    try:
-        sanitized = sanitize_child_agent_json(json_str)
-        parsed = json.loads(sanitized)
-        print("✅ Child agent response parsed successfully (after sanitization)")
-        return parsed
-    except json.JSONDecodeError as e:
-        print(f"⚠️ Sanitized parse failed: {e.msg} at position {e.pos}")
-        
-        # Show error context (sanitized is guaranteed to be set here)
-        if sanitized:
-            error_pos = e.pos
-            context_start = max(0, error_pos - 100)
-            context_end = min(len(sanitized), error_pos + 100)
-            error_context = sanitized[context_start:context_end]
-            print(f"Error context: ...{error_context}...")
-    
-    # Attempt 3: Manual field extraction as last resort
-    try:
-        print("⚠️ Attempting manual field extraction from child agent response...")
-        
-        # Extract fields using regex patterns
-        error_msg_match = re.search(r'"error_message"\s*:\s*"([^"]*)"', json_str)
-        summarised_match = re.search(r'"summarised_markdown"\s*:\s*"((?:[^"\\]|\\.)*)"', json_str, re.DOTALL)
-        
-        error_message = error_msg_match.group(1) if error_msg_match else ""
-        summarised_markdown = summarised_match.group(1) if summarised_match else ""
-        
-        # Unescape the extracted strings
-        if summarised_markdown:
-            summarised_markdown = summarised_markdown.encode().decode('unicode_escape')
-        
-        # Try to extract tool_payload (more complex)
-        tool_payload: dict[str, Any] = {}
-        payload_match = re.search(r'"tool_payload"\s*:\s*(\{[^}]*\}|\{\})', json_str)
-        if payload_match:
-            try:
-                tool_payload = json.loads(payload_match.group(1))
-            except:
-                tool_payload = {}
-        
-        # Try to extract suggested_next_actions
-        suggested_actions: list[dict[str, str]] = []
-        actions_match = re.search(r'"suggested_next_actions"\s*:\s*(\[[^\]]*\]|\[\])', json_str)
-        if actions_match:
-            try:
-                suggested_actions = json.loads(actions_match.group(1))
-            except:
-                suggested_actions = []
-        
-        print("✅ Child agent response reconstructed via manual extraction")
-        
-        return {
-            "error_message": error_message,
-            "tool_payload": tool_payload,
-            "summarised_markdown": summarised_markdown,
-            "suggested_next_actions": suggested_actions
-        }
-        
-    except Exception as extraction_error:
-        print(f"❌ Manual extraction also failed: {extraction_error}")
+        parsed = parse_lenient_json(response_str, expect='object')
+    except LenientJSONError as e:
         raise ValueError(
-            f"Failed to parse child agent response after all recovery attempts.\n"
-            f"Original response length: {len(original_str)} characters\n"
-            f"Last error: {str(extraction_error)}\n"
-            f"Response preview: {original_str[:500]}"
+            f"Failed to parse child agent response.\n"
+            f"Original response length: {len(response_str)} characters\n"
+            f"Last error: {str(e)}\n"
+            f"Response preview: {response_str[:500]}"
         )
+    
+    print("✅ Child agent response parsed successfully")
+    return parsed
 
 
 def parse_agent_json(text: str) -> dict[str, Any]:
     """
     Parse JSON from agent response with comprehensive error handling.
-    Handles: smart quotes, Python syntax, malformed JSON, truncation, XML-like tags.
+    Handles: smart quotes, Python syntax, malformed JSON, XML-like tags.
+    Truncated JSON raises ValueError instead of returning the fields parsed so far.
     """
-    sanitized: str = "{}"
     if not text or not text.strip():
         raise ValueError("Empty response from agent")
     
@@ -713,8 +585,8 @@ def parse_agent_json(text: str) -> dict[str, Any]:
             suggested_actions_str = actions_match.group(1).strip() if actions_match else "[]"
             
             try:
-                suggested_actions = json.loads(suggested_actions_str)
-            except json.JSONDecodeError:
+                suggested_actions = parse_lenient_json(suggested_actions_str, expect='array')
+            except LenientJSONError:
                 suggested_actions = []
             
             return {
@@ -726,83 +598,14 @@ def parse_agent_json(text: str) -> dict[str, Any]:
         except Exception as e:
             print(f"⚠️ Failed to parse XML-like tags: {e}")
     
+    # Step 1: Single lenient pass (fences, smart quotes, Python syntax)
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
-    # Step 1: Clean and extract JSON
-    text = text.strip()
-    
-    # Remove markdown code blocks
-    if '```' in text:
-        text = re.sub(r'^```(?:json)?\s*\n?', '', text)
-        text = re.sub(r'\n?```\s*$', '', text)
-    
-    # Find JSON object boundaries
-    start_idx = text.find('{')
-    end_idx = text.rfind('}')
-    
-    if start_idx == -1 or end_idx == -1:
+        return parse_lenient_json(text, expect='object')
+    except LenientJSONError as e:
         raise ValueError(
-            f"No JSON object found in response.\n"
+            f"No complete JSON object in response: {e}\n"
             f"Response preview: {text[:500]}"
         )
-    
-    json_str = text[start_idx:end_idx + 1]
-    
-    # Step 2: Fix smart/curly quotes
-    json_str = (json_str
-        .replace('"', '"')
-        .replace('"', '"')
-        .replace(''', "'")
-        .replace(''', "'")
-    )
-    
-    # Step 3: Attempt parsing
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        pass
-    
-    # Step 4: Sanitize Python syntax
-    try:
-        sanitized = json_str
-        
-        # Fix Python types
-        sanitized = re.sub(r'\bTrue\b', 'true', sanitized)
-        sanitized = re.sub(r'\bFalse\b', 'false', sanitized)
-        sanitized = re.sub(r'\bNone\b', 'null', sanitized)
-        
-        # Remove trailing commas
-        sanitized = re.sub(r',(\s*[}\]])', r'\1', sanitized)
-        
-        # Fix Decimal objects
-        sanitized = re.sub(r'Decimal\([\'"]([0-9.]+)[\'"]\)', r'\1', sanitized)
-        
-        # Remove invalid backslash escapes
-        sanitized = re.sub(r'\\(?!["\\/bfnrtu])', '', sanitized)
-        
-        return json.loads(sanitized)
-    except json.JSONDecodeError as second_error:
-        error_pos = second_error.pos
-        context_start = max(0, error_pos - 150)
-        context_end = min(len(sanitized), error_pos + 150)
-        error_context = sanitized[context_start:context_end]
-        is_truncated = not sanitized.rstrip().endswith('}')
-        
-        error_details = [
-            f"JSON parsing failed after sanitization",
-            f"Error at position {error_pos}: {second_error.msg}",
-            f"Context: ...{error_context}...",
-            f"Total length: {len(sanitized)} characters",
-        ]
-        
-        if is_truncated:
-            error_details.append("⚠️ JSON appears TRUNCATED (doesn't end with })")
-            error_details.append(f"Ends with: {sanitized[-200:]}")
-        
-        raise ValueError("\n".join(error_details))
 
 
 @app.entrypoint  # type: ignore[misc]
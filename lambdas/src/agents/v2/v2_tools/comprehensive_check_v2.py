@@ -2,7 +2,7 @@
 # Optimized for speed and accuracy with top 10-15 findings
 import traceback
 from typing import Any, List, Dict, Literal, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
 from pydantic import BaseModel
 from uuid6 import uuid7
@@ -10,15 +10,19 @@ import fitz
 from decimal import Decimal
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from src.utils.settings import AGENT_CLAUDE_HAIKU_4_5
+from src.utils.settings import AGENT_CLAUDE_HAIKU_4_5, ANALYSIS_CASCADE_ENABLED, ANALYSIS_ESCALATION_MODEL
+from src.utils.services.embeddings import profile as embedding_profile
 from src.utils.services.dynamoDB import DocumentStatus, DynamoDBTable, get_table
 from src.utils.services.annotations import save_annotations_to_dynamodb, serialize_for_dynamodb
-from src.utils.services.llm_models import get_bedrock_model
-from src.utils.settings import AWS_REGION
+from src.utils.services.analysis_store import analysis_store
+from src.utils.services.controls_repository import controls_repository, summary_line
+from src.utils.services.control_index import select_controls
+from src.utils.services.bedrock_runtime import ClaudeResponse, converse_with_tool, is_input_too_long, log_invocation_metrics
+from src.utils.services.findings_tool import FINDINGS_TOOL_NAME, expand_findings, findings_tool_spec
+from src.utils.services.triage import triage_blocks
 from datetime import datetime, timezone
 import time
 from botocore.exceptions import ClientError
-bedrock = get_bedrock_model(region_name=AWS_REGION) # type: ignore
 
 
 class SimpleAnnotation(BaseModel):
@@ -158,11 +162,20 @@ class OptimizedComplianceAnalyzer:
     MAX_TOTAL_FINDINGS = 15  # Hard limit on total findings
     MAX_FINDINGS_PER_BATCH = 5  # Reduced from unlimited
     MAX_TOKENS_PER_BATCH = 10000  # Slightly reduced
+    CONTROLS_PER_BATCH = 10  # Most relevant controls sent with each batch
+    PROMPT_BLOCK_CHARS = 400  # Block text kept in the analysis prompt
+    MIN_BLOCK_CHARS = 200  # Shortest text a lone oversized block is cut down to
     MAX_PARALLEL_BATCHES = 2  # Reduced from 3 to avoid throttling
+    # Part of the analysis store key: bump when prompts, batching or limits change;
+    # the embedding profile is included because select_controls ranks with it
+    ANALYZER_VERSION = f"optimized-analyzer/1+{embedding_profile.name}{'+cascade' if ANALYSIS_CASCADE_ENABLED else ''}"
     
     def __init__(self):
-        self.controls_table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
         self.cache_table = get_table(DynamoDBTable.INFERRED_FILES)
+        self.analysis_model = ANALYSIS_ESCALATION_MODEL or AGENT_CLAUDE_HAIKU_4_5
+        self._summary_cache: dict[tuple[str, ...], str] = {}
+        # Blocks that could not be analyzed even alone with shortened text
+        self.unanalyzed_blocks: list[int] = []
     
     def check_cached_analysis(self, document_id: str, framework_id: str) -> Dict[str, Any] | None:
         """Check cache for existing analysis"""
@@ -226,6 +239,49 @@ class OptimizedComplianceAnalyzer:
             print(f"⚠ Cache save error: {e}")
             return False
     
+    def load_stored_analysis(
+        self,
+        file_hash: str,
+        framework_id: str,
+        file_id: str,
+        analysis_id: str
+    ) -> List[SimpleAnnotation] | None:
+        """
+        Annotations of an earlier analysis of the same bytes (any file ID),
+        remapped to this file and saved to the Annotations table.
+        
+        Returns:
+            The annotations, or None if these bytes were not analyzed with this model and analyzer version
+        """
+        stored = analysis_store.get(file_hash, framework_id, self.analysis_model, self.ANALYZER_VERSION, file_id, analysis_id)
+        if stored is None:
+            return None
+        annotations = [SimpleAnnotation(**a) for a in stored.get('annotations', [])]
+        save_annotations_to_dynamodb(
+            annotations=annotations,
+            document_id=file_id,
+            framework_id=framework_id,
+            analysis_id=analysis_id
+        )
+        return annotations
+    
+    def store_analysis(
+        self,
+        file_hash: str,
+        framework_id: str,
+        file_id: str,
+        annotations: List[SimpleAnnotation]
+    ) -> bool:
+        """Keep the annotations under the file's content key for later uploads of the same bytes"""
+        return analysis_store.put(
+            file_hash,
+            framework_id,
+            self.analysis_model,
+            self.ANALYZER_VERSION,
+            file_id,
+            {'annotations': [ann.model_dump() for ann in annotations]}
+        )
+    
     def extract_enhanced_blocks(self, pdf_bytes: bytes) -> List[EnhancedTextBlock]:
         """Fast block extraction with smart filtering"""
         all_blocks: list[EnhancedTextBlock] = []
@@ -399,7 +455,7 @@ class OptimizedComplianceAnalyzer:
         
         for block in blocks:
             # Truncate long blocks early
-            block_text = block.text[:400] if len(block.text) > 400 else block.text
+            block_text = block.text[:self.PROMPT_BLOCK_CHARS]
             block_metadata: dict[str, Any] = {
                 'page': block.page_number,
                 'block_idx': block.block_index,
@@ -431,15 +487,15 @@ class OptimizedComplianceAnalyzer:
         return batches
     
     def _create_controls_summary(self, controls: List[Dict[str, Any]]) -> str:
-        """Create concise controls summary - top 10 only"""
-        summary_parts: list[str] = []
-        for control in controls[:10]:
-            summary_parts.append(
-                f"- **{control.get('control_id', 'N/A')}** "
-                f"[{control.get('severity', 'medium')}]: "
-                f"{control.get('requirement', '')[:100]}"
-            )
-        return "\n".join(summary_parts)
+        """Create concise controls summary - top 10 only (memoized per analysis)"""
+        top = controls[:self.CONTROLS_PER_BATCH]
+        key = tuple(c.get('control_id', '') for c in top)
+        summary = self._summary_cache.get(key)
+        if summary is None:
+            # Summary lines are precomputed in the controls snapshot/repository
+            summary = "\n".join(c.get('summary') or summary_line(c) for c in top)
+            self._summary_cache[key] = summary
+        return summary
     
     def create_analysis_prompt(
         self,
@@ -448,11 +504,13 @@ class OptimizedComplianceAnalyzer:
         framework: str
     ) -> str:
         """Create optimized prompt - prioritizes high-severity findings"""
-        controls_summary = self._create_controls_summary(controls)
+        batch_text = "\n".join(block.text for block in batch['blocks'])
+        relevant = select_controls(framework, controls, batch_text, self.CONTROLS_PER_BATCH)
+        controls_summary = self._create_controls_summary(relevant)
         
         pages_content: list[dict[str, Any]] = []
         for block in batch['blocks']:
-            text = block.text[:400] if len(block.text) > 400 else block.text
+            text = block.text[:self.PROMPT_BLOCK_CHARS]
             pages_content.append({
                 'page': block.page_number,
                 'block_idx': block.block_index,
@@ -473,28 +531,11 @@ class OptimizedComplianceAnalyzer:
             2. MEDIUM severity gaps (incomplete policies, ambiguity)
             3. Skip LOW severity unless critical
 
-            **CRITICAL INSTRUCTIONS:**
-            - Return ONLY valid JSON array
-            - NO markdown code blocks
-            - NO explanatory text before or after
-            - NO comments or conclusions
+            **INSTRUCTIONS:**
             - Maximum {self.MAX_FINDINGS_PER_BATCH} findings
-            - Empty array [] if compliant
-
-            **REQUIRED JSON FORMAT:**
-            [
-            {{
-                "page_number": 1,
-                "block_index": 5,
-                "control_id": "GDPR-12.1",
-                "severity": "high|medium",
-                "issue_description": "Specific problem",
-                "bookmark_type": "action_required|verify",
-                "suggested_action": "Fix recommendation"
-            }}
-            ]
-
-            Return ONLY the raw JSON array. Begin your response with [ and end with ].
+            - Use "action_required" for missing requirements, "verify" for ambiguity
+            - Keep each description and action to one or two sentences
+            - Report findings with the {FINDINGS_TOOL_NAME} tool (an empty list if compliant)
         """
     
     def analyze_batch(
@@ -502,13 +543,112 @@ class OptimizedComplianceAnalyzer:
         batch: Dict[str, Any],
         controls: List[Dict[str, Any]],
         framework: str,
-        batch_num: int
+        batch_num: int | str
     ) -> List[Dict[str, Any]]:
-        """Analyze single batch with exponential backoff retry"""
+        """
+        Analyze single batch, splitting it when it does not fit the model.
+        
+        - Prompt over the context window (ValidationException about input
+          length): split in half and re-submit both halves; a lone block is
+          re-submitted with shortened text.
+        - Output cut at max_tokens: keep the findings of fully reported blocks
+          and re-submit the rest, including the last block that got findings.
+        """
         print(f"🤖 Analyzing batch {batch_num}...")
         
         prompt = self.create_analysis_prompt(batch, controls, framework)
         
+        try:
+            response = self._invoke_with_backoff(prompt)
+        except ClientError as e:
+            print(f"  ✂️ Batch {batch_num} rejected as too large: {e}")
+            return self._split_and_analyze(batch['blocks'], controls, framework, batch_num)
+        
+        if response is None:
+            return self._mark_unanalyzed(batch['blocks'], batch_num)
+        
+        findings = expand_findings(response.tool_input, batch['blocks'])
+        
+        if response.stop_reason == 'max_tokens':
+            # The last block that got findings may have been cut mid-way: drop its
+            # findings and re-submit it along with the blocks that got none
+            if findings:
+                last_block = findings[-1]['block_index']
+                findings = [f for f in findings if f['block_index'] != last_block]
+            covered = {f['block_index'] for f in findings}
+            remaining = [b for b in batch['blocks'] if b.block_index not in covered]
+            print(f"  ✂️ Batch {batch_num} truncated at max_tokens: kept {len(findings)} findings, "
+                  f"re-submitting {len(remaining)} blocks")
+            return findings + self._split_and_analyze(remaining, controls, framework, batch_num)
+        
+        print(f"  ✓ Found {len(findings)} issues ({response.output_tokens} output tokens)")
+        return findings
+    
+    def _split_and_analyze(
+        self,
+        blocks: List[EnhancedTextBlock],
+        controls: List[Dict[str, Any]],
+        framework: str,
+        batch_num: int | str
+    ) -> List[Dict[str, Any]]:
+        """Re-submit blocks as two half batches (recursively split further if needed)"""
+        if not blocks:
+            return []
+        
+        if len(blocks) == 1:
+            return self._analyze_shortened(blocks[0], controls, framework, batch_num)
+        
+        mid = len(blocks) // 2
+        findings: list[dict[str, Any]] = []
+        for part, half in enumerate((blocks[:mid], blocks[mid:]), start=1):
+            sub_batch: dict[str, Any] = {
+                'blocks': half,
+                'pages': {b.page_number for b in half},
+                'has_header': any(b.is_header for b in half)
+            }
+            findings.extend(self.analyze_batch(sub_batch, controls, framework, f"{batch_num}.{part}"))
+        return findings
+    
+    def _mark_unanalyzed(self, blocks: List[EnhancedTextBlock], batch_num: int | str) -> List[Dict[str, Any]]:
+        """Record blocks no findings could be obtained for, so the analysis counts as incomplete"""
+        print(f"  ✗ Batch {batch_num}: {len(blocks)} blocks left unanalyzed "
+              f"(pages {sorted({b.page_number for b in blocks})})")
+        self.unanalyzed_blocks.extend(b.block_index for b in blocks)
+        return []
+    
+    def _analyze_shortened(
+        self,
+        block: EnhancedTextBlock,
+        controls: List[Dict[str, Any]],
+        framework: str,
+        batch_num: int | str
+    ) -> List[Dict[str, Any]]:
+        """
+        A lone block that still does not fit is re-submitted with the text the
+        prompt uses (at most PROMPT_BLOCK_CHARS) halved; once it is too short
+        to halve it is recorded as unanalyzed rather than silently dropped.
+        """
+        prompt_text = block.text[:self.PROMPT_BLOCK_CHARS]
+        if len(prompt_text) < 2 * self.MIN_BLOCK_CHARS:
+            return self._mark_unanalyzed([block], batch_num)
+        
+        half = len(prompt_text) // 2
+        shortened = replace(block, text=prompt_text[:half], char_count=half)
+        print(f"  ✂️ Batch {batch_num}: re-submitting block {block.block_index} with its text halved")
+        sub_batch: dict[str, Any] = {
+            'blocks': [shortened],
+            'pages': {block.page_number},
+            'has_header': block.is_header
+        }
+        return self.analyze_batch(sub_batch, controls, framework, f"{batch_num}.t")
+    
+    def _invoke_with_backoff(self, prompt: str) -> ClaudeResponse | None:
+        """
+        Invoke the analysis model with exponential backoff on throttling.
+        
+        Returns None on unrecoverable errors. Re-raises a ValidationException
+        about input length so the caller can split the oversized batch.
+        """
         # Exponential backoff parameters
         max_retries = 5
         base_delay = 2  # Start with 2 seconds
@@ -516,23 +656,14 @@ class OptimizedComplianceAnalyzer:
         
         for attempt in range(max_retries):
             try:
-                response = bedrock.invoke_model( # type: ignore
-                    modelId=AGENT_CLAUDE_HAIKU_4_5,
-                    body=json.dumps({
-                        "anthropic_version": "bedrock-2023-05-31",
-                        "max_tokens": 2000,
-                        "temperature": 0.2,
-                        "messages": [{"role": "user", "content": prompt}]
-                    })
+                return converse_with_tool(
+                    model_id=self.analysis_model,
+                    prompt=prompt,
+                    tool_spec=findings_tool_spec(self.MAX_FINDINGS_PER_BATCH),
+                    max_tokens=2000,
+                    temperature=0.2
                 )
                 
-                response_body: dict[str, Any] = json.loads(response['body'].read()) # type: ignore
-                content = response_body['content'][0]['text']
-                findings = self._parse_claude_response(content)
-                
-                print(f"  ✓ Found {len(findings)} issues")
-                return findings
-                
             except ClientError as e:
                 error_code = e.response.get('Error', {}).get('Code', '')
                 
@@ -548,17 +679,19 @@ class OptimizedComplianceAnalyzer:
                         continue
                     else:
                         print(f"  ✗ Max retries reached. Batch error: {e}")
-                        return []
+                        return None
+                elif is_input_too_long(e):
+                    raise
                 else:
                     # Non-throttling error, don't retry
                     print(f"  ✗ Batch error: {e}")
-                    return []
+                    return None
                     
             except Exception as e:
                 print(f"  ✗ Unexpected error: {e}")
-                return []
+                return None
         
-        return []
+        return None
     
     def analyze_document(
         self,
@@ -569,6 +702,8 @@ class OptimizedComplianceAnalyzer:
     ) -> List[SimpleAnnotation]:
         """Optimized analysis with parallel processing"""
         print(f"🔍 Starting analysis: {s3_path} ({compliance_framework})")
+        self._summary_cache.clear()
+        self.unanalyzed_blocks.clear()
         
         # Load and extract
         pdf_bytes = self._load_pdf_from_s3(s3_path)
@@ -578,6 +713,11 @@ class OptimizedComplianceAnalyzer:
         important_blocks = self.filter_important_blocks(all_blocks)
         print(f"✂️ Filtered to {len(important_blocks)} important blocks")
         
+        # Cascade: cheap triage pass, only flagged blocks get the full prompt
+        if ANALYSIS_CASCADE_ENABLED:
+            flagged = triage_blocks(important_blocks, compliance_framework)
+            important_blocks = [b for b in important_blocks if b.block_index in flagged]
+        
         controls = self._get_framework_controls(compliance_framework)
         print(f"📋 Loaded {len(controls)} controls")
         
@@ -604,6 +744,7 @@ class OptimizedComplianceAnalyzer:
                     all_findings.extend(findings)
                 except Exception as e:
                     print(f"⚠ Batch failed: {e}")
+                    self._mark_unanalyzed(batches[future_to_batch[future]]['blocks'], future_to_batch[future] + 1)
         
         # Apply strict limits and sort by severity
         top_findings = self._get_top_findings(all_findings)
@@ -620,6 +761,7 @@ class OptimizedComplianceAnalyzer:
         )
         
         print(f"✅ Generated {len(annotations)} annotations")
+        log_invocation_metrics()
         return annotations
     
     def _get_top_findings(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -647,44 +789,13 @@ class OptimizedComplianceAnalyzer:
         return document['Body'].read()
     
     def _get_framework_controls(self, framework: str) -> List[Dict[str, Any]]:
-        """Get controls from DynamoDB"""
+        """Get controls from the shared controls repository"""
         try:
-            framework_id = f'{framework.lower()}_2025'
-            response = self.controls_table.query(
-                KeyConditionExpression='framework_id = :fw_id',
-                ExpressionAttributeValues={':fw_id': framework_id}
-            )
-            
-            controls = response.get('Items', [])
-            formatted_controls: List[Dict[str, Any]] = []
-            
-            for control in controls:
-                formatted_controls.append({
-                    'control_id': control.get('control_id', ''),
-                    'framework_id': control.get('framework_id', ''),
-                    'requirement': control.get('requirement', ''),
-                    'severity': control.get('severity', 'medium'),
-                    'category': control.get('category', ''),
-                    'keywords': control.get('keywords', [])
-                })
-            
-            return formatted_controls
+            return controls_repository.get_controls(framework)
         except Exception as e:
             print(f"✗ Error loading controls: {e}")
             return []
     
-    def _parse_claude_response(self, content: str) -> List[Dict[str, Any]]:
-        """Parse Claude JSON response"""
-        try:
-            content = content.strip().replace("```json", "").replace("```", "")
-            
-            findings = json.loads(content.strip())
-            return findings if isinstance(findings, list) else [] # type: ignore
-        except Exception as e:
-            execution_log = traceback.format_exc()
-            print(f"Parse error: {e}\n{execution_log}")
-            return []
-    
     def _create_annotations(
         self,
         findings: List[Dict[str, Any]],
@@ -768,14 +879,25 @@ def auto_analyse_pdf(
         raise ValueError(f"Document {document_id} not found")
     
     s3_path: str = file_record.get('s3_key') # pyright: ignore[reportAssignmentType]
+    file_hash = str(file_record.get('file_hash', ''))
     
     try:
-        annotations = analyzer.analyze_document(
-            s3_path=s3_path,
-            compliance_framework=compliance_framework,
-            file_id=document_id,
-            analysis_id=analysis_id
+        # Same bytes analyzed before under another file ID: reuse those annotations
+        annotations = None if force_reanalysis else analyzer.load_stored_analysis(
+            file_hash, compliance_framework, document_id, analysis_id
         )
+        unanalyzed_blocks: list[int] = []
+        if annotations is None:
+            annotations = analyzer.analyze_document(
+                s3_path=s3_path,
+                compliance_framework=compliance_framework,
+                file_id=document_id,
+                analysis_id=analysis_id
+            )
+            unanalyzed_blocks = list(analyzer.unanalyzed_blocks)
+            # An incomplete analysis is not reused for later uploads of the same bytes
+            if not unanalyzed_blocks:
+                analyzer.store_analysis(file_hash, compliance_framework, document_id, annotations)
         gen_annotations = [ann.model_dump() for ann in annotations]
         
         result: dict[str, Any] = {
@@ -785,18 +907,20 @@ def auto_analyse_pdf(
             'framework': compliance_framework,
             'annotations_count': len(annotations),
             'annotations': gen_annotations,
+            'unanalyzed_blocks': unanalyzed_blocks,
             'cached': False
         }
         
         # Generate verdict
         complete_analysis = generate_compliance_verdict(result)
         
-        # Cache the result
-        analyzer.save_analysis_to_cache(
-            document_id=document_id,
-            framework_id=compliance_framework,
-            analysis_result=complete_analysis
-        )
+        # Cache the result (an incomplete analysis is not cached, so the next request re-analyzes)
+        if not unanalyzed_blocks:
+            analyzer.save_analysis_to_cache(
+                document_id=document_id,
+                framework_id=compliance_framework,
+                analysis_result=complete_analysis
+            )
         
         return complete_analysis
         
@@ -7,10 +7,12 @@ from uuid6 import uuid7
 
 
 from src.tools.comprehensive_check import auto_analyse_pdf
+from src.utils.conversation_store import update_session_summary
 from src.utils.services.dynamoDB import DynamoDBTable, get_table, replace_decimals
 from src.utils.services.annotations import (
     get_annotations_for_document,
     mark_annotation_resolved,
+    query_annotations,
     serialize_for_dynamodb
 )
 
@@ -18,27 +20,42 @@ from src.utils.services.annotations import (
 def get_annotations_tool(
     document_id: str,
     framework_id: str | None = None,
-    include_resolved: bool = False
+    include_resolved: bool = False,
+    limit: int | None = None,
+    next_page_token: Dict[str, Any] | None = None
 ) -> Dict[str, Any]:
     """
-    Retrieve all annotations for a document.
+    Retrieve annotations for a document (all of them, or one page).
     
     Args:
         document_id: Document identifier
         framework_id: Optional framework filter (GDPR, SOC2, HIPAA)
         include_resolved: Whether to include resolved annotations (default: False)
+        limit: Optional page size; without it every annotation is returned
+        next_page_token: Token from the previous page
     
     Returns:
-        Dictionary with status and annotations list
+        Dictionary with status and annotations list (plus next_page_token and has_more)
     """
     try:
-        annotations = get_annotations_for_document(
-            document_id=document_id,
-            framework_id=framework_id,
-            include_resolved=include_resolved
-        )
+        page: Dict[str, Any] = {'next_page_token': None, 'has_more': False}
+        if limit:
+            page = query_annotations(
+                document_id=document_id,
+                framework_id=framework_id,
+                include_resolved=include_resolved,
+                limit=limit,
+                last_key=next_page_token
+            )
+            annotations = page['annotations']
+        else:
+            annotations = get_annotations_for_document(
+                document_id=document_id,
+                framework_id=framework_id,
+                include_resolved=include_resolved
+            )
                 
-        if len(annotations) == 0:
+        if len(annotations) == 0 and not page['has_more'] and not next_page_token:
             analysis_result = auto_analyse_pdf(
                 document_id=document_id,
                 compliance_framework='GDPR' if not framework_id else framework_id,
@@ -53,7 +70,9 @@ def get_annotations_tool(
             'document_id': document_id,
             'framework_id': framework_id,
             'total_annotations': len(annotations),
-            'annotations': annotations
+            'annotations': annotations,
+            'next_page_token': replace_decimals(page['next_page_token']),
+            'has_more': page['has_more']
         }
         
     except Exception as e:
@@ -234,6 +253,7 @@ def create_annotation_conversation_tool(
         # Serialize and save
         message_item_serialized = serialize_for_dynamodb(message_item)
         conversations_table.put_item(Item=message_item_serialized)
+        update_session_summary(session_id, message_item['user_id'], 'user', user_message, timestamp)
         
         print(f"✓ Created conversation session {session_id} for annotation {annotation_id}")
         
@@ -312,6 +332,7 @@ def add_message_to_conversation_tool(
         # Serialize and save
         new_message_serialized = serialize_for_dynamodb(new_message)
         conversations_table.put_item(Item=new_message_serialized)
+        update_session_summary(session_id, new_message['user_id'], role, message, timestamp)
         
         print(f"✓ Added {role} message to session {session_id}")
         
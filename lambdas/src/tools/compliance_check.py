@@ -3,30 +3,27 @@
 
 import json
 from typing import Any
-import boto3
-from src.utils.services.dynamoDB import get_table, DynamoDBTable
-from src.utils.settings import AWS_REGION
-
-bedrock = boto3.client('bedrock-runtime', region_name=AWS_REGION)  # type: ignore
+from src.utils.services.controls_repository import controls_repository
+from src.utils.services.bedrock_runtime import analysis_rate_limiter, invoke_claude
+from src.utils.services.rate_limiter import call_with_throttle_retry
+from src.utils.settings import AGENT_CLAUDE_HAIKU
 
 
 def get_relevant_controls(query: str, framework_id: str, control_id: str | None = None) -> list[dict[str, Any]]:
-    """Get relevant compliance controls from DynamoDB"""
-    table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
-    
-    # If specific control_id provided, get it from DynamoDB
+    """Get relevant compliance controls from the controls repository"""
+    # If specific control_id provided, look it up in the cached framework
     if control_id:
-        response = table.get_item(Key={'framework_id': f'{framework_id.lower()}_2025', 'control_id': control_id})
-        if 'Item' in response:
-            return [response['Item']]
-        return []
-    
-    # Get all controls for framework and use simple keyword matching
-    response = table.scan(
-        FilterExpression='framework_id = :fid',
-        ExpressionAttributeValues={':fid': f'{framework_id.lower()}_2025'}
+        control = controls_repository.get_control(framework_id, control_id)
+        return [control] if control else []
+    
+    # Rank by precomputed keyword sets; ties keep control order
+    framework = controls_repository.get_framework(framework_id)
+    query_lower = query.lower()
+    ranked = sorted(
+        framework.controls,
+        key=lambda c: -sum(1 for kw in framework.keywords.get(c['control_id'], []) if kw in query_lower)
     )
-    return response.get('Items', [])[:5]
+    return ranked[:5]
 
 
 def analyze_compliance(user_text: str, question: str, controls: list[dict[str, Any]]) -> dict[str, Any]:
@@ -68,22 +65,11 @@ def analyze_compliance(user_text: str, question: str, controls: list[dict[str, A
 
                 Return ONLY valid JSON, no additional text."""
 
-    response = bedrock.invoke_model(  # type: ignore
-        modelId='anthropic.claude-3-haiku-20240307-v1:0',
-        body=json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 2000,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        })
-    )
-    
-    result = json.loads(response['body'].read())  # type: ignore
-    content = result['content'][0]['text']
+    content = call_with_throttle_retry(
+        lambda p: invoke_claude(model_id=AGENT_CLAUDE_HAIKU, prompt=p, max_tokens=2000),
+        prompt,
+        analysis_rate_limiter
+    ).text
     
     # Parse JSON response
     try:
@@ -163,12 +149,7 @@ def get_all_controls_tool(framework_id: str) -> dict[str, Any]:
     if framework_id not in ['GDPR', 'SOC2', 'HIPAA']:
         raise ValueError('framework_id must be GDPR, SOC2, or HIPAA')
     
-    table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
-    response = table.scan(
-        FilterExpression='framework_id = :fid',
-        ExpressionAttributeValues={':fid': f'{framework_id.lower()}_2025'}
-    )
-    controls = response.get('Items', [])
+    controls = controls_repository.get_controls(framework_id)
     
     # Ensure all Decimal objects are converted for JSON serialization
     return {
@@ -1,23 +1,28 @@
 # src/tools/comprehensive_check.py
 # Shared business logic for comprehensive document analysis
 from typing import Any, List, Dict, Literal, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
 from pydantic import BaseModel
 from uuid6 import uuid7
 import fitz
 from decimal import Decimal
 
-from src.utils.settings import AGENT_CLAUDE_HAIKU
+from src.utils.settings import AGENT_CLAUDE_HAIKU, ANALYSIS_CASCADE_ENABLED, ANALYSIS_ESCALATION_MODEL
+from src.utils.services.embeddings import profile as embedding_profile
 from src.utils.services.dynamoDB import DocumentStatus, DynamoDBTable, get_table
 from src.utils.services.annotations import save_annotations_to_dynamodb, serialize_for_dynamodb
+from src.utils.services.analysis_store import analysis_store
+from src.utils.services.controls_repository import controls_repository, summary_line
+from src.utils.services.control_index import select_controls
 
-from src.utils.services.llm_models import get_bedrock_model
-from src.utils.settings import AWS_REGION
+from src.utils.services.bedrock_runtime import analysis_rate_limiter, converse_with_tool, is_input_too_long, log_invocation_metrics
+from src.utils.services.rate_limiter import call_with_throttle_retry
+from src.utils.services.findings_tool import FINDINGS_TOOL_NAME, expand_findings, findings_tool_spec
+from src.utils.services.triage import triage_blocks
+from botocore.exceptions import ClientError
 from datetime import datetime, timezone
 
-bedrock = get_bedrock_model(region_name=AWS_REGION)
-
 class SimpleAnnotation(BaseModel):
     """Same as before, omitted for brevity"""
     file_id: str
@@ -210,10 +215,19 @@ class ImprovedComplianceAnalyzer:
     MAX_PAGES = 15
     MAX_ANNOTATIONS_PER_PAGE = 3
     MAX_TOKENS_PER_BATCH = 12000  # Conservative for Bedrock
+    CONTROLS_PER_BATCH = 15  # Most relevant controls sent with each batch
+    PROMPT_BLOCK_CHARS = 500  # Block text kept in the analysis prompt
+    MIN_BLOCK_CHARS = 200  # Shortest text a lone oversized block is cut down to
+    # Part of the analysis store key: bump when prompts, batching or limits change;
+    # the embedding profile is included because select_controls ranks with it
+    ANALYZER_VERSION = f"improved-analyzer/1+{embedding_profile.name}{'+cascade' if ANALYSIS_CASCADE_ENABLED else ''}"
     
     def __init__(self):
-        self.controls_table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
         self.cache_table = get_table(DynamoDBTable.INFERRED_FILES)
+        self.analysis_model = ANALYSIS_ESCALATION_MODEL or AGENT_CLAUDE_HAIKU
+        self._summary_cache: dict[tuple[str, ...], str] = {}
+        # Blocks that could not be analyzed even alone with shortened text
+        self.unanalyzed_blocks: list[int] = []
     
     def check_cached_analysis(
         self,
@@ -330,6 +344,49 @@ class ImprovedComplianceAnalyzer:
             print(f"⚠ Error saving to cache: {e}")
             return False
     
+    def load_stored_analysis(
+        self,
+        file_hash: str,
+        framework_id: str,
+        file_id: str,
+        analysis_id: str
+    ) -> List[SimpleAnnotation] | None:
+        """
+        Annotations of an earlier analysis of the same bytes (any file ID),
+        remapped to this file and saved to the Annotations table.
+        
+        Returns:
+            The annotations, or None if these bytes were not analyzed with this model and analyzer version
+        """
+        stored = analysis_store.get(file_hash, framework_id, self.analysis_model, self.ANALYZER_VERSION, file_id, analysis_id)
+        if stored is None:
+            return None
+        annotations = [SimpleAnnotation(**a) for a in stored.get('annotations', [])]
+        save_annotations_to_dynamodb(
+            annotations=annotations,
+            document_id=file_id,
+            framework_id=framework_id,
+            analysis_id=analysis_id
+        )
+        return annotations
+    
+    def store_analysis(
+        self,
+        file_hash: str,
+        framework_id: str,
+        file_id: str,
+        annotations: List[SimpleAnnotation]
+    ) -> bool:
+        """Keep the annotations under the file's content key for later uploads of the same bytes"""
+        return analysis_store.put(
+            file_hash,
+            framework_id,
+            self.analysis_model,
+            self.ANALYZER_VERSION,
+            file_id,
+            {'annotations': [ann.model_dump() for ann in annotations]}
+        )
+    
     def extract_enhanced_blocks(self, pdf_bytes: bytes) -> List[EnhancedTextBlock]:
         """
         Extract blocks with full metadata and smart classification
@@ -651,15 +708,15 @@ class ImprovedComplianceAnalyzer:
         return batches
     
     def _create_controls_summary(self, controls: List[Dict[str, Any]]) -> str:
-        """Create concise controls summary"""
-        summary_parts:list[str] = []
-        for control in controls[:15]:  # Top 15 only
-            summary_parts.append(
-                f"- **{control.get('control_id', 'N/A')}** "
-                f"[{control.get('severity', 'medium')}]: "
-                f"{control.get('description', '')[:120]}"
-            )
-        return "\n".join(summary_parts)
+        """Create concise controls summary (memoized per analysis)"""
+        top = controls[:self.CONTROLS_PER_BATCH]
+        key = tuple(c.get('control_id', '') for c in top)
+        summary = self._summary_cache.get(key)
+        if summary is None:
+            # Summary lines are precomputed in the controls snapshot/repository
+            summary = "\n".join(c.get('summary') or summary_line(c) for c in top)
+            self._summary_cache[key] = summary
+        return summary
     
     def create_analysis_prompt(
         self,
@@ -670,15 +727,17 @@ class ImprovedComplianceAnalyzer:
         """
         Create optimized prompt with smart text representation
         """
-        controls_summary = self._create_controls_summary(controls)
+        batch_text = "\n".join(block.text for block in batch['blocks'])
+        relevant = select_controls(framework, controls, batch_text, self.CONTROLS_PER_BATCH)
+        controls_summary = self._create_controls_summary(relevant)
         
         # Build structured content
         pages_content:list[dict[str, Any]] = []
         for block in batch['blocks']:
             # Truncate very long blocks
             text = block.text
-            if len(text) > 500:
-                text = text[:497] + "..."
+            if len(text) > self.PROMPT_BLOCK_CHARS:
+                text = text[:self.PROMPT_BLOCK_CHARS - 3] + "..."
             
             # Create structured entry
             entry:dict[str, Any] = {
@@ -707,21 +766,6 @@ class ImprovedComplianceAnalyzer:
                 **YOUR TASK:**
                 Identify compliance issues, gaps, missing requirements, or areas needing clarification.
 
-                **STRICT OUTPUT FORMAT (JSON array only):**
-                ```json
-                [
-                {{
-                    "page_number": 1,
-                    "block_index": 5,
-                    "control_id": "GDPR-12.1",
-                    "severity": "high|medium|low",
-                    "issue_description": "Specific, clear description of what's wrong or missing",
-                    "bookmark_type": "verify|review|info|action_required",
-                    "suggested_action": "Concrete action needed to fix this"
-                }}
-                ]
-                ```
-
                 **RULES:**
                 - Maximum {self.MAX_ANNOTATIONS_PER_PAGE} findings per page
                 - Prioritize HIGH and MEDIUM severity issues
@@ -730,9 +774,9 @@ class ImprovedComplianceAnalyzer:
                 - Use "verify" for ambiguous/unclear statements
                 - Use "review" for potential issues needing human judgment
                 - Use "info" for minor best practice suggestions
-                - Return empty array [] if no issues found
+                - Keep each description and action to one or two sentences
 
-                **Output only valid JSON, no explanations:**"""
+                Report your findings with the {FINDINGS_TOOL_NAME} tool (an empty list if there are none)."""
     
     def analyze_document(
         self,
@@ -745,6 +789,8 @@ class ImprovedComplianceAnalyzer:
         Complete improved analysis pipeline
         """
         print(f"🔍 Starting analysis: {s3_path} ({compliance_framework})")
+        self._summary_cache.clear()
+        self.unanalyzed_blocks.clear()
         
         # Step 1: Load PDF
         pdf_bytes = self._load_pdf_from_s3(s3_path)
@@ -757,6 +803,11 @@ class ImprovedComplianceAnalyzer:
         important_blocks = self.filter_important_blocks(all_blocks)
         print(f"✂️ Filtered to {len(important_blocks)} important blocks")
         
+        # Step 3b: Cascade triage - only flagged blocks get the full-analysis prompt
+        if ANALYSIS_CASCADE_ENABLED:
+            flagged = triage_blocks(important_blocks, compliance_framework)
+            important_blocks = [b for b in important_blocks if b.block_index in flagged]
+        
         # Step 4: Get controls
         controls = self._get_framework_controls(compliance_framework)
         print(f"📋 Loaded {len(controls)} controls for {compliance_framework}")
@@ -775,33 +826,7 @@ class ImprovedComplianceAnalyzer:
         all_findings:list[dict[str, Any]] = []
         for i, batch in enumerate(batches):
             print(f"🤖 Analyzing batch {i+1}/{len(batches)}...")
-            
-            prompt = self.create_analysis_prompt(batch, controls, compliance_framework)
-            
-            try:
-                response = bedrock.invoke_model( # type: ignore
-                    modelId=AGENT_CLAUDE_HAIKU,
-                    body=json.dumps({
-                        "anthropic_version": "bedrock-2023-05-31",
-                        "max_tokens": 4000,
-                        "temperature": 0.3,
-                        "messages": [{
-                            "role": "user",
-                            "content": prompt
-                        }]
-                    })
-                )
-
-                response_body:dict[str, Any] = json.loads(response['body'].read()) # type: ignore
-                content = response_body['content'][0]['text']
-                
-                findings = self._parse_claude_response(content)
-                all_findings.extend(findings)
-                print(f"  ✓ Found {len(findings)} issues in this batch")
-                
-            except Exception as e:
-                print(f"  ✗ Error in batch {i+1}: {e}")
-                continue
+            all_findings.extend(self.analyze_batch(batch, controls, compliance_framework, i + 1))
         
         # Step 7: Apply per-page limits and create annotations
         limited_findings = self._apply_page_limits(all_findings)
@@ -825,9 +850,125 @@ class ImprovedComplianceAnalyzer:
         )
         
         print(f"💾 Annotation persistence: {save_stats}")
+        log_invocation_metrics()
         
         return annotations
     
+    def analyze_batch(
+        self,
+        batch: Dict[str, Any],
+        controls: List[Dict[str, Any]],
+        framework: str,
+        batch_num: int | str
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze a single batch, splitting it when it does not fit the model
+        
+        - Prompt over the context window (ValidationException about input
+          length): split in half and re-submit both halves; a lone block is
+          re-submitted with shortened text
+        - Output cut at max_tokens: keep the findings of fully reported blocks
+          and re-submit the rest, including the last block that got findings
+        """
+        prompt = self.create_analysis_prompt(batch, controls, framework)
+        
+        try:
+            response = call_with_throttle_retry(
+                lambda p: converse_with_tool(
+                    model_id=self.analysis_model,
+                    prompt=p,
+                    tool_spec=findings_tool_spec(),
+                    max_tokens=4000,
+                    temperature=0.3
+                ),
+                prompt,
+                analysis_rate_limiter
+            )
+        except ClientError as e:
+            if not is_input_too_long(e):
+                print(f"  ✗ Error in batch {batch_num}: {e}")
+                return self._mark_unanalyzed(batch['blocks'], batch_num)
+            print(f"  ✂️ Batch {batch_num} rejected as too large: {e}")
+            return self._split_and_analyze(batch['blocks'], controls, framework, batch_num)
+        except Exception as e:
+            print(f"  ✗ Error in batch {batch_num}: {e}")
+            return self._mark_unanalyzed(batch['blocks'], batch_num)
+        
+        findings = expand_findings(response.tool_input, batch['blocks'])
+        
+        if response.stop_reason == 'max_tokens':
+            # The last block that got findings may have been cut mid-way: drop its
+            # findings and re-submit it along with the blocks that got none
+            if findings:
+                last_block = findings[-1]['block_index']
+                findings = [f for f in findings if f['block_index'] != last_block]
+            covered = {f['block_index'] for f in findings}
+            remaining = [b for b in batch['blocks'] if b.block_index not in covered]
+            print(f"  ✂️ Batch {batch_num} truncated at max_tokens: kept {len(findings)} findings, "
+                  f"re-submitting {len(remaining)} blocks")
+            return findings + self._split_and_analyze(remaining, controls, framework, batch_num)
+        
+        print(f"  ✓ Found {len(findings)} issues in batch {batch_num} ({response.output_tokens} output tokens)")
+        return findings
+    
+    def _split_and_analyze(
+        self,
+        blocks: List[EnhancedTextBlock],
+        controls: List[Dict[str, Any]],
+        framework: str,
+        batch_num: int | str
+    ) -> List[Dict[str, Any]]:
+        """Re-submit blocks as two half batches (recursively split further if needed)"""
+        if not blocks:
+            return []
+        
+        if len(blocks) == 1:
+            return self._analyze_shortened(blocks[0], controls, framework, batch_num)
+        
+        mid = len(blocks) // 2
+        findings: list[dict[str, Any]] = []
+        for part, half in enumerate((blocks[:mid], blocks[mid:]), start=1):
+            sub_batch: dict[str, Any] = {
+                'blocks': half,
+                'pages': {b.page_number for b in half},
+                'has_header': any(b.is_header for b in half)
+            }
+            findings.extend(self.analyze_batch(sub_batch, controls, framework, f"{batch_num}.{part}"))
+        return findings
+    
+    def _mark_unanalyzed(self, blocks: List[EnhancedTextBlock], batch_num: int | str) -> List[Dict[str, Any]]:
+        """Record blocks no findings could be obtained for, so the analysis counts as incomplete"""
+        print(f"  ✗ Batch {batch_num}: {len(blocks)} blocks left unanalyzed "
+              f"(pages {sorted({b.page_number for b in blocks})})")
+        self.unanalyzed_blocks.extend(b.block_index for b in blocks)
+        return []
+    
+    def _analyze_shortened(
+        self,
+        block: EnhancedTextBlock,
+        controls: List[Dict[str, Any]],
+        framework: str,
+        batch_num: int | str
+    ) -> List[Dict[str, Any]]:
+        """
+        A lone block that still does not fit is re-submitted with the text the
+        prompt uses (at most PROMPT_BLOCK_CHARS) halved; once it is too short
+        to halve it is recorded as unanalyzed rather than silently dropped.
+        """
+        prompt_text = block.text[:self.PROMPT_BLOCK_CHARS]
+        if len(prompt_text) < 2 * self.MIN_BLOCK_CHARS:
+            return self._mark_unanalyzed([block], batch_num)
+        
+        half = len(prompt_text) // 2
+        shortened = replace(block, text=prompt_text[:half], char_count=half)
+        print(f"  ✂️ Batch {batch_num}: re-submitting block {block.block_index} with its text halved")
+        sub_batch: dict[str, Any] = {
+            'blocks': [shortened],
+            'pages': {block.page_number},
+            'has_header': block.is_header
+        }
+        return self.analyze_batch(sub_batch, controls, framework, f"{batch_num}.t")
+    
     def _load_pdf_from_s3(self, s3_path: str) -> bytes:
         """Load PDF from S3"""
         from src.utils.services.s3 import s3_client
@@ -838,81 +979,22 @@ class ImprovedComplianceAnalyzer:
     
     def _get_framework_controls(self, framework: str) -> List[Dict[str, Any]]:
         """
-        Get controls from DynamoDB using high-level resource client
-        
-        Table Schema:
-        - Partition Key: framework_id (String) - e.g., "gdpr_2025"
-        - Sort Key: control_id (String) - e.g., "GDPR-12.1"
+        Get controls for a framework from the shared controls repository
         
         Args:
             framework: Framework name (GDPR, SOC2, HIPAA)
         
         Returns:
-            List of formatted control dictionaries
+            List of control dictionaries
         """
         try:
-            # Build framework_id for partition key
-            framework_id = f'{framework.lower()}_2025'
-            
-            # Query all controls for this framework
-            response = self.controls_table.query(
-                KeyConditionExpression='framework_id = :fw_id',
-                ExpressionAttributeValues={
-                    ':fw_id': framework_id
-                }
-            )
-            
-            controls = response.get('Items', [])
-            formatted_controls: List[Dict[str, Any]] = []
-            
-            # High-level resource client automatically deserializes
-            # No need for .get('S'), .get('L'), etc.
-            for control in controls:
-                formatted_controls.append({
-                    'control_id': control.get('control_id', ''),
-                    'framework_id': control.get('framework_id', ''),
-                    'article': control.get('article', ''),
-                    'category': control.get('category', ''),
-                    'framework_name': control.get('framework_name', ''),
-                    'requirement': control.get('requirement', ''),  # This is the description
-                    'severity': control.get('severity', 'medium'),
-                    'trust_service': control.get('trust_service', ''),  # For SOC2
-                    'version': control.get('version', ''),
-                    
-                    # Lists are already deserialized by high-level client
-                    'keywords': control.get('keywords', []),
-                    'verification_points': control.get('verification_points', [])
-                })
-            
-            print(f"✓ Loaded {len(formatted_controls)} controls for {framework}")
-            return formatted_controls
-            
+            return controls_repository.get_controls(framework)
         except Exception as e:
             print(f"✗ Error loading controls from DynamoDB: {e}")
             import traceback
             traceback.print_exc()
             return []
     
-    def _parse_claude_response(self, content: str) -> List[Dict[str, Any]]:
-        """Parse Claude JSON response"""
-        try:
-            content = content.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            content = content.strip()
-            findings = json.loads(content)
-            
-            return findings if isinstance(findings, list) else [] # pyright: ignore[reportUnknownVariableType]
-            
-        except Exception as e:
-            print(f"Failed to parse response: {e}")
-            return []
-    
     def _apply_page_limits(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Limit to 3 per page, sorted by severity"""
         severity_order = {'high': 0, 'medium': 1, 'low': 2}
@@ -1035,14 +1117,25 @@ def auto_analyse_pdf(
     if not file_record:
         raise ValueError(f"Document with ID {document_id} not found in Files table")
     s3_path:str = file_record.get('s3_key') # pyright: ignore[reportAssignmentType]
+    file_hash = str(file_record.get('file_hash', ''))
     
     try:
-        annotations = analyzer.analyze_document(
-            s3_path=s3_path,
-            compliance_framework=compliance_framework,
-            file_id=document_id,
-            analysis_id=analysis_id
+        # Same bytes analyzed before under another file ID: reuse those annotations
+        annotations = None if force_reanalysis else analyzer.load_stored_analysis(
+            file_hash, compliance_framework, document_id, analysis_id
         )
+        unanalyzed_blocks: list[int] = []
+        if annotations is None:
+            annotations = analyzer.analyze_document(
+                s3_path=s3_path,
+                compliance_framework=compliance_framework,
+                file_id=document_id,
+                analysis_id=analysis_id
+            )
+            unanalyzed_blocks = list(analyzer.unanalyzed_blocks)
+            # An incomplete analysis is not reused for later uploads of the same bytes
+            if not unanalyzed_blocks:
+                analyzer.store_analysis(file_hash, compliance_framework, document_id, annotations)
         
         # Prepare result
         result: dict[str, Any] = {
@@ -1052,6 +1145,7 @@ def auto_analyse_pdf(
             'framework': compliance_framework,
             'annotations_count': len(annotations),
             'annotations': [ann.model_dump() for ann in annotations],
+            'unanalyzed_blocks': unanalyzed_blocks,
             'cached': False
         }
         
@@ -1064,14 +1158,17 @@ def auto_analyse_pdf(
         
         complete_analysis = generate_compliance_verdict(result)
         
-        cache_saved = analyzer.save_analysis_to_cache(
+        # An incomplete analysis is not cached either, so the next request re-analyzes
+        cache_saved = not unanalyzed_blocks and analyzer.save_analysis_to_cache(
             document_id=document_id,
             framework_id=compliance_framework,
             analysis_result=complete_analysis,
             metadata=metadata
         )
         
-        if cache_saved:
+        if unanalyzed_blocks:
+            print(f"⚠ Analysis incomplete ({len(unanalyzed_blocks)} blocks unanalyzed), not cached")
+        elif cache_saved:
             print(f"✓ Analysis cached successfully")
         else:
             print(f"⚠ Analysis completed but caching failed (non-critical)")
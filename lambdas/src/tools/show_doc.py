@@ -3,86 +3,145 @@
 
 from typing import Any
 from datetime import datetime
-from boto3.dynamodb.conditions import Attr
 
 from src.utils.settings import S3_BUCKET_NAME
-from src.utils.services.dynamoDB import DocumentStatus, get_table, DynamoDBTable
+from src.utils.services.dynamoDB import DocumentStatus, batch_get_items, get_table, DynamoDBTable, user_file_sort_key
 from src.utils.services.document_extractor import format_file_size, format_timestamp, get_status_details
 
+# Files table attributes the listing renders
+DOCUMENT_ATTRIBUTES = ('file_id', 's3_key', 'file_type', 'file_size', 'status', 'created_at', 'page_count')
 
-def show_doc_tool(user_id: str) -> dict[str, Any]:
+
+def get_user_files(user_id: str) -> tuple[set[str], set[str]]:
+    """The user's uploaded_files IDs and file_sort_keys (one GetItem on the user_id key)"""
+    item = get_table(DynamoDBTable.DOCUMENTS).get_item(
+        Key={'user_id': user_id},
+        ProjectionExpression='uploaded_files, file_sort_keys'
+    ).get('Item') or {}
+    file_ids = {str(file_id) for file_id in item.get('uploaded_files', set())}  # pyright: ignore[reportUnknownVariableType, reportGeneralTypeIssues]
+    sort_keys = {str(key) for key in item.get('file_sort_keys', set())}  # pyright: ignore[reportUnknownVariableType, reportGeneralTypeIssues]
+    return file_ids, sort_keys
+
+
+def _get_documents(file_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Listing attributes of these files by file_id (BatchGetItem, 100 keys per request)"""
+    if not file_ids:
+        return {}
+    expression_names = {f'#a{i}': name for i, name in enumerate(DOCUMENT_ATTRIBUTES)}
+    items = batch_get_items(
+        DynamoDBTable.FILES,
+        [{'file_id': file_id} for file_id in file_ids],
+        projection=', '.join(expression_names),
+        expression_names=expression_names
+    )
+    return {str(item['file_id']): item for item in items}
+
+
+def _format_document(item: dict[str, Any]) -> dict[str, Any]:
+    status: int = item.get('status', DocumentStatus.UNKNOWN.value)  # pyright: ignore[reportAssignmentType]
+    status_details = get_status_details(str(status))
+    
+    doc_size = item.get('file_size')
+    timestamp_int = int(str(item.get('created_at')))
+    
+    # Convert DynamoDB types to Python types
+    size_int = int(str(doc_size))
+    
+    return {
+        'document_id': item.get('file_id'),
+        'file_name': str(item.get('s3_key', '')).split('/')[-1] if item.get('s3_key') else 'Unknown',
+        'file_type': item.get('file_type', 'Unknown'),
+        'document_size': size_int,
+        'formatted_size': format_file_size(size_int),
+        'compliance_status': int(str(status)),
+        'status_label': status_details['label'],
+        'status_color': status_details['color'],
+        'status_emoji': status_details['emoji'],
+        'timestamp': timestamp_int,
+        'formatted_date': format_timestamp(timestamp_int),
+        'pages': int(str(item.get('page_count', 0))),
+        's3_key': item.get('s3_key', ''),
+        's3_bucket': S3_BUCKET_NAME
+    }
+
+
+def show_doc_tool(
+    user_id: str,
+    limit: int | None = None,
+    last_key: dict[str, Any] | None = None,
+    newest_first: bool = True
+) -> dict[str, Any]:
     """
     Core document listing logic - shared between Bedrock and Strands agents.
     
+    The user's file IDs and their "<created_at>#<file_id>" sort keys come
+    from one GetItem, so a page is ordered and cut without reading any Files
+    item; only the page's files are fetched with BatchGetItem. The
+    (created_at, file_id) cursor stays valid while files are added.
+    
+    Users linked before file_sort_keys was kept have their keys derived from
+    all their Files items until pre/backfill_user_file_keys.py has run.
+    
     Args:
         user_id: The user ID to fetch documents for
-        org_id: Optional organization ID for logging
+        limit: Optional page size; without it every document is returned
+        last_key: next_page_token of the previous page
+        newest_first: Sort by upload time, newest first (default) or oldest first
     
     Returns:
-        Dictionary with list of documents and metadata
+        Dictionary with list of documents and metadata (plus next_page_token and has_more)
     """
     if not user_id:
         raise ValueError('user_id is required')
     
-    # Get user's uploaded files
-    user_files_response = get_table(DynamoDBTable.DOCUMENTS).scan(
-        FilterExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    results = user_files_response.get('Items', [])
-    complete_id_set: set[str] = set()
-    
-    for row in results:
-        id_set: set[str] = row.get("uploaded_files", set())  # pyright: ignore[reportAssignmentType]
-        complete_id_set = complete_id_set.union(id_set)
-    
-    documents: list[dict[str, Any]] = []
+    file_ids, sort_keys = get_user_files(user_id)
     
     # If user has no files, return empty list
-    if not complete_id_set:
+    if not file_ids:
         return {
             'documents': [],
             'count': 0,
+            'next_page_token': None,
+            'has_more': False,
             'timestamp': datetime.now().isoformat()
         }
     
-    # Query from files table to get metadata
-    response = get_table(DynamoDBTable.FILES).scan(
-        FilterExpression=Attr("file_id").is_in(
-            list(complete_id_set)
-        ) & Attr("status").gte(DocumentStatus.UPLOAD_SUCCESS.value)
-    )
+    loaded: dict[str, dict[str, Any]] = {}
+    if {key.split('#', 1)[1] for key in sort_keys} != file_ids:
+        loaded = _get_documents(sorted(file_ids))
+        sort_keys = {user_file_sort_key(item.get('created_at', 0), file_id) for file_id, item in loaded.items()}
+    
+    ordered = sorted(sort_keys, reverse=newest_first)
+    if last_key:
+        cursor = user_file_sort_key(last_key['created_at'], str(last_key['file_id']))
+        ordered = [key for key in ordered if (key < cursor if newest_first else key > cursor)]
+    
+    # Fetch only what the page needs; files that are not uploaded yet are skipped
+    page_size = limit or len(ordered)
+    page: list[dict[str, Any]] = []
+    position = 0
+    while position < len(ordered) and len(page) < page_size:
+        chunk = [key.split('#', 1)[1] for key in ordered[position:position + page_size - len(page)]]
+        position += len(chunk)
+        loaded.update(_get_documents([file_id for file_id in chunk if file_id not in loaded]))
+        page.extend(
+            loaded[file_id] for file_id in chunk
+            if file_id in loaded
+            and int(str(loaded[file_id].get('status', DocumentStatus.UNKNOWN.value))) >= DocumentStatus.UPLOAD_SUCCESS.value
+        )
+    
+    has_more = position < len(ordered)
+    next_page_token = None
+    if has_more:
+        created_at, file_id = ordered[position - 1].split('#', 1)
+        next_page_token = {'created_at': int(created_at), 'file_id': file_id}
     
-    for item in response.get('Items', []):
-        status: int = item.get('status', DocumentStatus.UNKNOWN.value)  # pyright: ignore[reportAssignmentType]
-        status_details = get_status_details(str(status))
-        
-        doc_size = item.get('file_size')
-        timestamp_int = int(str(item.get('created_at')))
-        
-        # Convert DynamoDB types to Python types
-        size_int = int(str(doc_size))
-        
-        documents.append({
-            'document_id': item.get('file_id'),
-            'file_name': str(item.get('s3_key', '')).split('/')[-1] if item.get('s3_key') else 'Unknown',
-            'file_type': item.get('file_type', 'Unknown'),
-            'document_size': size_int,
-            'formatted_size': format_file_size(size_int),
-            'compliance_status': int(str(status)),
-            'status_label': status_details['label'],
-            'status_color': status_details['color'],
-            'status_emoji': status_details['emoji'],
-            'timestamp': timestamp_int,
-            'formatted_date': format_timestamp(timestamp_int),
-            'pages': int(str(item.get('page_count', 0))),
-            's3_key': item.get('s3_key', ''),
-            's3_bucket': S3_BUCKET_NAME
-        })
+    documents = [_format_document(item) for item in page]
     
     return {
         'documents': documents,
         'count': len(documents),
+        'next_page_token': next_page_token,
+        'has_more': has_more,
         'timestamp': datetime.now().isoformat()
     }
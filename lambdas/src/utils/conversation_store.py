@@ -5,6 +5,9 @@ from uuid6 import uuid7
 from decimal import Decimal
 from src.utils.services.dynamoDB import get_table, DynamoDBTable
 
+MESSAGE_TTL_DAYS = 90
+SESSION_TITLE_MAX_CHARS = 80
+
 def decimal_to_native(obj: Any) -> Any:
     """Convert DynamoDB Decimal types to native Python types"""
     if isinstance(obj, list):
@@ -15,11 +18,51 @@ def decimal_to_native(obj: Any) -> Any:
         return int(obj) if obj % 1 == 0 else float(obj)
     return obj
 
+def update_session_summary(
+    session_id: str,
+    user_id: str,
+    role: str,
+    content: str,
+    timestamp: str,
+    ttl: int | None = None
+) -> None:
+    """
+    Bump a session summary for one saved message: last message time, message
+    count and (from the first user message) title.
+    
+    Every write to conversation history goes through this, so
+    get_user_sessions lists the same sessions the backfill would build.
+    """
+    update_parts = [
+        'last_message_time = :ts',
+        'created_at = if_not_exists(created_at, :ts)'
+    ]
+    expression_names: dict[str, str] = {}
+    expression_values: dict[str, Any] = {':ts': timestamp, ':one': 1}
+    if ttl is not None:
+        update_parts.append('#ttl = :ttl')
+        expression_names['#ttl'] = 'ttl'
+        expression_values[':ttl'] = ttl
+    if role == 'user':
+        update_parts.append('title = if_not_exists(title, :title)')
+        expression_values[':title'] = ' '.join(content.split())[:SESSION_TITLE_MAX_CHARS]
+    
+    update_kwargs: dict[str, Any] = {
+        'Key': {'user_id': user_id, 'session_id': session_id},
+        'UpdateExpression': 'SET ' + ', '.join(update_parts) + ' ADD message_count :one',
+        'ExpressionAttributeValues': expression_values
+    }
+    if expression_names:
+        update_kwargs['ExpressionAttributeNames'] = expression_names
+    get_table(DynamoDBTable.CONVERSATION_SESSIONS).update_item(**update_kwargs)
+
 class ConversationStore:
     """Manages conversation history in DynamoDB"""
     
     def __init__(self):
         self.table = get_table(DynamoDBTable.CONVERSATION_HISTORY)
+        # One summary item per (user, session), kept current by save_message
+        self.sessions_table = get_table(DynamoDBTable.CONVERSATION_SESSIONS)
     
     def save_message(
         self,
@@ -28,11 +71,11 @@ class ConversationStore:
         role: str,
         content: str
     ) -> dict[str, Any]:
-        """Save a message to conversation history"""
+        """Save a message to conversation history and update the session summary"""
         now = datetime.now(timezone.utc)
         timestamp = now.isoformat().replace('+00:00', 'Z')
         message_id = str(uuid7())
-        ttl = int((now + timedelta(days=90)).timestamp())
+        ttl = int((now + timedelta(days=MESSAGE_TTL_DAYS)).timestamp())
         
         item: dict[str, str | int] = {
             'session_id': session_id,
@@ -45,6 +88,7 @@ class ConversationStore:
         }
         
         self.table.put_item(Item=item)  # type: ignore[arg-type]
+        update_session_summary(session_id, user_id, role, content, timestamp, ttl)
         return cast(dict[str, Any], item)
     
     def get_messages(
@@ -79,11 +123,12 @@ class ConversationStore:
         limit: int = 10,
         last_key: dict[str, Any] | None = None
     ) -> dict[str, Any]:
-        """Get paginated list of user's sessions"""
+        """Get paginated list of user's sessions, most recently active first"""
         query_params: dict[str, Any] = {
-            'IndexName': 'UserSessionsIndex',
+            'IndexName': 'UserRecentSessionsIndex',
             'KeyConditionExpression': 'user_id = :uid',
             'ExpressionAttributeValues': {':uid': user_id},
+            'ProjectionExpression': 'session_id, user_id, last_message_time, message_count, title',
             'Limit': limit,
             'ScanIndexForward': False
         }
@@ -91,21 +136,21 @@ class ConversationStore:
         if last_key:
             query_params['ExclusiveStartKey'] = last_key
         
-        response = self.table.query(**query_params)
+        response = self.sessions_table.query(**query_params)
         
-        # Deduplicate sessions
-        sessions: dict[str, dict[str, str]] = {}
-        for item in response['Items']:
-            sid = str(item['session_id'])
-            if sid not in sessions:
-                sessions[sid] = {
-                    'session_id': sid,
-                    'last_message_time': str(item['timestamp']),
-                    'user_id': str(item['user_id'])
-                }
+        sessions: list[dict[str, Any]] = [
+            {
+                'session_id': str(item['session_id']),
+                'last_message_time': str(item['last_message_time']),
+                'user_id': str(item['user_id']),
+                'message_count': decimal_to_native(item.get('message_count', 0)),
+                'title': str(item.get('title', ''))
+            }
+            for item in response['Items']
+        ]
         
         return {
-            'sessions': list(sessions.values()),
+            'sessions': sessions,
             'next_page_token': decimal_to_native(response.get('LastEvaluatedKey')),
             'has_more': 'LastEvaluatedKey' in response
         }
@@ -1,36 +1,341 @@
 # filePath: lambdas/src/utils/extract_json.py
 import json
 import re
-from typing import Any
+from typing import Any, Literal
 
+# Whitespace plus // and /* */ comments, which models occasionally emit
+_WHITESPACE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_BARE_WORD = re.compile(r'[A-Za-z_$][\w$.-]*')
+# A code fence opens a line; ``` elsewhere (e.g. inside a string value) is content
+_FENCE = re.compile(r'^[ \t]*```', re.MULTILINE)
 
-def extract_json_from_response(response_text: str) -> dict[str, Any] | None:
+# Opening quote -> characters that may close it. Smart quotes are accepted
+# as delimiters but are kept verbatim when they appear inside a string.
+_QUOTES: dict[str, str] = {
+    '"': '"',
+    "'": "'",
+    '“': '”“"',
+    '”': '”“"',
+    '„': '”“"',
+    '‘': "’‘'",
+    '’': "’‘'",
+}
+_STRING_CHUNKS = {
+    opener: re.compile('[^' + re.escape(closers + '\\') + ']*')
+    for opener, closers in _QUOTES.items()
+}
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+_LITERALS: dict[str, Any] = {
+    'true': True, 'True': True,
+    'false': False, 'False': False,
+    'null': None, 'None': None, 'undefined': None,
+    'NaN': float('nan'), 'Infinity': float('inf'),
+}
+_VALUE_TERMINATORS = ',:}])'  # ')' closes Decimal('1.5')
+
+
+class LenientJSONError(ValueError):
+    """Raised when text holds no recoverable JSON value"""
+
+
+class _Truncated(Exception):
+    """Input ended inside a value; carries whatever was parsed so far"""
+
+    def __init__(self, partial: Any):
+        super().__init__()
+        self.partial = partial
+
+
+class LenientJSONParser:
     """
-    Extract JSON from agent response, handling markdown code blocks and mixed content.
+    Single-pass, forgiving JSON parser for model and agent output.
+
+    One left-to-right scan handles what used to take several regex passes:
+    - prose and ```json fences around the payload
+    - smart/curly quotes and single quotes as string delimiters
+    - unescaped quotes, raw newlines and invalid escapes inside strings
+    - Python literals (True/False/None) and Decimal('1.5')
+    - trailing or missing commas, comments
+    - truncated input (opt-in with allow_truncated): open containers are
+      closed; with drop_incomplete the element that was cut off is discarded
+      instead of kept half-filled
+
+    Valid JSON takes the C decoder fast path and never reaches the scanner.
     """
-    # Try to find JSON in markdown code block
-    json_block_pattern = r'```json\s*(\{.*?\})\s*```'
-    match = re.search(json_block_pattern, response_text, re.DOTALL)
-    
-    if match:
+
+    def __init__(self, text: str, drop_incomplete: bool = False, allow_truncated: bool = False):
+        self.text = text
+        self.length = len(text)
+        self.pos = 0
+        self.drop_incomplete = drop_incomplete
+        self.allow_truncated = allow_truncated
+        self.truncated = False
+
+    def parse(self, expect: Literal['object', 'array'] | None = None, start: int = 0) -> Any:
+        """Parse the first JSON object/array at or after `start`"""
+        first = _WHITESPACE.match(self.text, start).end() # type: ignore[union-attr]
+        value_start = self._first_opener(expect, start)
+        if value_start == -1:
+            raise LenientJSONError(f"No JSON {expect or 'value'} found. Preview: {self.text[:200]}")
+        value = self._decode(value_start)
+
+        # Braces in prose before a code fence are not the payload: once that value
+        # has ended, the fence after it is the one to read. A value that runs past
+        # the fence holds it (markdown inside a string), and an opener after a
+        # fence is already fenced, so neither needs a second look.
+        if first < value_start and not _FENCE.search(self.text, first, value_start):
+            fence = _FENCE.search(self.text, self.pos)
+            fenced = self._first_opener(expect, fence.end()) if fence else -1
+            if fenced != -1:
+                value = self._decode(fenced)
+        return value
+
+    def _decode(self, start: int) -> Any:
+        """The value at `start`: the C decoder if it is valid JSON, else one lenient scan"""
         try:
-            return json.loads(match.group(1))
+            value, self.pos = json.JSONDecoder().raw_decode(self.text, start)
+            return value
         except json.JSONDecodeError:
             pass
-    
-    # Try to find raw JSON object
-    json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-    matches = re.finditer(json_pattern, response_text, re.DOTALL)
-    
-    for match in matches:
+
+        self.pos = start
         try:
-            parsed = json.loads(match.group(0))
-            # Validate it has required structure
-            if 'response_type' in parsed and 'content' in parsed:
-                return parsed
-        except json.JSONDecodeError:
-            continue
-    
+            return self._value()
+        except _Truncated as truncated:
+            self.truncated = True
+            if not self.allow_truncated:
+                raise LenientJSONError(f"JSON is truncated at position {self.length}. Ends with: {self.text[-200:]}")
+            return truncated.partial
+
+    @staticmethod
+    def _openers(expect: Literal['object', 'array'] | None) -> str:
+        return {'object': '{', 'array': '['}.get(expect or '', '{[')
+
+    def _first_opener(self, expect: Literal['object', 'array'] | None, offset: int) -> int:
+        candidates = [i for i in (self.text.find(o, offset) for o in self._openers(expect)) if i != -1]
+        return min(candidates) if candidates else -1
+
+    def _skip_whitespace(self) -> bool:
+        """Advance past whitespace/comments; returns True if input remains"""
+        self.pos = _WHITESPACE.match(self.text, self.pos).end() # type: ignore[union-attr]
+        return self.pos < self.length
+
+    def _value(self) -> Any:
+        char = self.text[self.pos]
+        if char == '{':
+            return self._object()
+        if char == '[':
+            return self._array()
+        if char in _QUOTES:
+            return self._string()
+
+        number = _NUMBER.match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            raw = number.group(0)
+            value: Any = float(raw) if any(c in raw for c in '.eE') else int(raw)
+            if self.pos >= self.length:
+                raise _Truncated(value)
+            return value
+
+        word = _BARE_WORD.match(self.text, self.pos)
+        if word:
+            self.pos = word.end()
+            token = word.group(0)
+            if token == 'Decimal' and self.text.startswith('(', self.pos):
+                return self._decimal()
+            if self.pos >= self.length:
+                raise _Truncated(_LITERALS.get(token, token))
+            # Unquoted strings are kept as-is rather than rejected
+            return _LITERALS.get(token, token)
+
+        raise LenientJSONError(f"Unexpected character {char!r} at position {self.pos}")
+
+    def _decimal(self) -> Any:
+        """Decimal('1.5') / Decimal(1.5) -> number"""
+        self.pos += 1  # (
+        if not self._skip_whitespace():
+            raise _Truncated(None)
+        inner = self._value()
+        if self._skip_whitespace() and self.text[self.pos] == ')':
+            self.pos += 1
+        if isinstance(inner, str):
+            try:
+                return float(inner) if any(c in inner for c in '.eE') else int(inner)
+            except ValueError:
+                return inner
+        return inner
+
+    def _object(self) -> dict[str, Any]:
+        self.pos += 1  # {
+        result: dict[str, Any] = {}
+
+        while True:
+            if not self._skip_whitespace():
+                raise _Truncated(result)
+            char = self.text[self.pos]
+            if char in '}]':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+
+            try:
+                key = self._value()
+            except _Truncated:
+                raise _Truncated(result)
+
+            if not self._skip_whitespace():
+                raise _Truncated(result)
+            if self.text[self.pos] in ':=':
+                self.pos += 1
+            if not self._skip_whitespace():
+                raise _Truncated(result)
+
+            try:
+                value = self._value()
+            except _Truncated as truncated:
+                if not self.drop_incomplete:
+                    result[str(key)] = truncated.partial
+                raise _Truncated(result)
+            result[str(key)] = value
+
+    def _array(self) -> list[Any]:
+        self.pos += 1  # [
+        result: list[Any] = []
+
+        while True:
+            if not self._skip_whitespace():
+                raise _Truncated(result)
+            char = self.text[self.pos]
+            if char in ']}':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+
+            try:
+                result.append(self._value())
+            except _Truncated as truncated:
+                if not self.drop_incomplete:
+                    result.append(truncated.partial)
+                raise _Truncated(result)
+
+    def _closes_string(self, quote_pos: int) -> bool:
+        """A quote ends the string only if a delimiter (or a new line) follows it"""
+        after = _WHITESPACE.match(self.text, quote_pos + 1).end() # type: ignore[union-attr]
+        if after >= self.length:
+            return True
+        next_char = self.text[after]
+        if next_char in _VALUE_TERMINATORS:
+            return True
+        # Missing comma between entries: `"a": "x"\n  "b": 1`
+        return next_char in _QUOTES and '\n' in self.text[quote_pos + 1:after]
+
+    def _string(self) -> str:
+        opener = self.text[self.pos]
+        closers = _QUOTES[opener]
+        chunk_pattern = _STRING_CHUNKS[opener]
+        self.pos += 1
+        parts: list[str] = []
+
+        while True:
+            chunk = chunk_pattern.match(self.text, self.pos)
+            parts.append(chunk.group(0)) # type: ignore[union-attr]
+            self.pos = chunk.end() # type: ignore[union-attr]
+
+            if self.pos >= self.length:
+                raise _Truncated(''.join(parts))
+
+            char = self.text[self.pos]
+            if char == '\\':
+                if self.pos + 1 >= self.length:
+                    raise _Truncated(''.join(parts))
+                escaped = self.text[self.pos + 1]
+                if escaped == 'u':
+                    parts.append(self._unicode_escape())
+                    continue
+                # Unknown escapes (\d, \., \') keep the character, drop the backslash
+                parts.append(_ESCAPES.get(escaped, escaped))
+                self.pos += 2
+                continue
+
+            # char is one of the closers
+            if self._closes_string(self.pos):
+                self.pos += 1
+                return ''.join(parts)
+            parts.append(char)
+            self.pos += 1
+
+    def _unicode_escape(self) -> str:
+        """Decode \\uXXXX (and surrogate pairs); malformed escapes are kept literally"""
+        hex_digits = self.text[self.pos + 2:self.pos + 6]
+        try:
+            code = int(hex_digits, 16)
+        except ValueError:
+            self.pos += 2
+            return 'u'
+        if len(hex_digits) < 4:
+            raise _Truncated('')
+        self.pos += 6
+
+        if 0xD800 <= code <= 0xDBFF and self.text.startswith('\\u', self.pos):
+            try:
+                low = int(self.text[self.pos + 2:self.pos + 6], 16)
+                if 0xDC00 <= low <= 0xDFFF:
+                    self.pos += 6
+                    return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00))
+            except ValueError:
+                pass
+        return chr(code)
+
+
+def parse_lenient_json(
+    text: str,
+    expect: Literal['object', 'array'] | None = None,
+    drop_incomplete: bool = False,
+    allow_truncated: bool = False
+) -> Any:
+    """
+    Parse the first JSON object/array in model output, forgiving common LLM mistakes.
+
+    Args:
+        text: Raw model/agent output
+        expect: Restrict to the first 'object' or 'array' (default: whichever comes first)
+        drop_incomplete: Discard the element that was cut off if the text is truncated
+        allow_truncated: Return what was parsed from truncated text instead of raising
+
+    Returns:
+        Parsed Python value
+
+    Raises:
+        LenientJSONError: If no JSON value can be recovered
+    """
+    return LenientJSONParser(text, drop_incomplete=drop_incomplete, allow_truncated=allow_truncated).parse(expect)
+
+
+def extract_json_from_response(response_text: str) -> dict[str, Any] | None:
+    """
+    Extract JSON from agent response, handling markdown code blocks and mixed content.
+    """
+    parser = LenientJSONParser(response_text)
+    is_fenced = '```json' in response_text
+    offset = 0
+
+    while offset < len(response_text):
+        try:
+            parsed = parser.parse(expect='object', start=offset)
+        except LenientJSONError:
+            return None
+
+        # A fenced block is trusted as-is; bare JSON must look like an agent response
+        if isinstance(parsed, dict) and (is_fenced or ('response_type' in parsed and 'content' in parsed)):
+            return parsed # pyright: ignore[reportUnknownVariableType]
+        offset = parser.pos
+
     return None
 
 
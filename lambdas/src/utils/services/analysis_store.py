@@ -0,0 +1,151 @@
+# filePath: lambdas/src/utils/services/analysis_store.py
+"""
+Content-addressed store of analysis results.
+
+Results are keyed by what actually determines them: the SHA-256 of the
+file bytes (file_hash, computed at upload), the framework, the controls
+version, the model and the analyzer version. The same policy uploaded
+under different file IDs (or by different users) is analyzed once; later
+uploads are served with one GetItem and the stored result is remapped to
+the requesting file.
+
+Bump an analyzer's version whenever its prompt, selection or post-processing
+changes, so results of the old pipeline stop matching.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from uuid6 import uuid7
+
+from src.utils.services.dynamoDB import DynamoDBTable, get_table
+from src.utils.settings import CONTROLS_VERSION
+
+# Fields that name the file (or analysis) a result belongs to
+FILE_ID_FIELDS = ('document_id', 'file_id')
+
+
+def analysis_key(
+    file_hash: str,
+    framework_id: str,
+    model_id: str,
+    analyzer_version: str,
+    controls_version: str = CONTROLS_VERSION
+) -> str:
+    """SHA-256 of the parts that determine an analysis result"""
+    parts = [file_hash, framework_id.upper(), controls_version, model_id, analyzer_version]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def remap_file_ids(value: Any, document_id: str, analysis_id: str | None = None) -> Any:
+    """
+    Copy of a stored result pointed at another file.
+
+    document_id/file_id fields are set to `document_id`, analysis_id fields to
+    `analysis_id` (when given), and annotation_id fields get fresh IDs so the
+    new file's annotations never overwrite the source file's.
+    """
+    if isinstance(value, dict):
+        remapped: dict[str, Any] = {}
+        for key, item in value.items():  # pyright: ignore[reportUnknownVariableType]
+            if key in FILE_ID_FIELDS:
+                remapped[key] = document_id
+            elif key == 'analysis_id' and analysis_id is not None:
+                remapped[key] = analysis_id
+            elif key == 'annotation_id':
+                remapped[key] = str(uuid7())
+            else:
+                remapped[key] = remap_file_ids(item, document_id, analysis_id)
+        return remapped
+    if isinstance(value, list):
+        return [remap_file_ids(item, document_id, analysis_id) for item in value]  # pyright: ignore[reportUnknownVariableType]
+    return value
+
+
+class AnalysisStore:
+    """Analysis results by content key in the PolicyMateAnalysisResults table"""
+
+    def __init__(self, table_name: DynamoDBTable = DynamoDBTable.ANALYSIS_RESULTS):
+        self.table_name = table_name
+
+    def get(
+        self,
+        file_hash: str,
+        framework_id: str,
+        model_id: str,
+        analyzer_version: str,
+        document_id: str,
+        analysis_id: str | None = None
+    ) -> dict[str, Any] | None:
+        """
+        Stored result for these bytes and settings, remapped to `document_id`.
+
+        Args:
+            file_hash: SHA-256 of the file bytes (Files table `file_hash`)
+            framework_id: Framework identifier (GDPR, SOC2, HIPAA)
+            model_id: Model that produced the result
+            analyzer_version: Version of the analysis pipeline
+            document_id: File the result is served for
+            analysis_id: Analysis ID to give the served result
+
+        Returns:
+            The remapped result, or None on a miss (or without a file_hash)
+        """
+        if not file_hash:
+            return None
+        key = analysis_key(file_hash, framework_id, model_id, analyzer_version)
+        try:
+            item = get_table(self.table_name).get_item(
+                Key={'analysis_key': key},
+                ProjectionExpression='#result, source_document_id',
+                ExpressionAttributeNames={'#result': 'result'}
+            ).get('Item')
+        except Exception as e:
+            print(f"⚠️  Analysis store lookup failed: {e}")
+            return None
+        if not item:
+            return None
+
+        print(f"✓ Analysis store hit for {framework_id} (analyzed as {item.get('source_document_id')})")
+        return remap_file_ids(json.loads(str(item['result'])), document_id, analysis_id)
+
+    def put(
+        self,
+        file_hash: str,
+        framework_id: str,
+        model_id: str,
+        analyzer_version: str,
+        document_id: str,
+        result: dict[str, Any]
+    ) -> bool:
+        """
+        Store a result under its content key.
+
+        The result is kept as compact JSON; it is remapped when served, so the
+        IDs of the analyzed file can stay in it.
+
+        Returns:
+            True if stored, False otherwise (never raises)
+        """
+        if not file_hash:
+            return False
+        try:
+            get_table(self.table_name).put_item(Item={
+                'analysis_key': analysis_key(file_hash, framework_id, model_id, analyzer_version),
+                'file_hash': file_hash,
+                'framework_id': framework_id.upper(),
+                'controls_version': CONTROLS_VERSION,
+                'model_id': model_id,
+                'analyzer_version': analyzer_version,
+                'source_document_id': document_id,
+                'result': json.dumps(result, separators=(',', ':'), default=str),
+                'created_at': datetime.now(timezone.utc).isoformat()
+            })
+            return True
+        except Exception as e:
+            print(f"⚠️  Analysis store write failed: {e}")
+            return False
+
+
+analysis_store = AnalysisStore()
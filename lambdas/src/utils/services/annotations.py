@@ -1,10 +1,29 @@
 # src/utils/services/annotations.py
 # DynamoDB operations for managing annotations
-from typing import Any, List, Dict
+from typing import Any, Iterator, List, Dict, Sequence
 import hashlib
 from datetime import datetime, timezone
 
 from src.utils.services.dynamoDB import DynamoDBTable, get_table
+from src.utils.settings import ANNOTATIONS_LEGACY_SCAN
+
+# GSI on (file_id, analysis_id); annotations store their document_id as file_id
+FILE_ANNOTATIONS_INDEX = 'FileAnnotationsIndex'
+# GSI on (document_id, status_framework) for reading a document's annotations
+DOCUMENT_ANNOTATIONS_INDEX = 'DocumentAnnotationsIndex'
+
+# What the UI and agents render; the default projection of annotation reads
+ANNOTATION_ATTRIBUTES = (
+    'annotation_id', 'document_id', 'framework_id', 'analysis_id',
+    'page_number', 'x', 'y', 'width', 'height',
+    'bookmark_type', 'review_comments', 'resolved',
+    'created_at', 'updated_at'
+)
+
+
+def annotation_status_key(resolved: bool, framework_id: str) -> str:
+    """DocumentAnnotationsIndex sort key: "open#GDPR", "resolved#SOC2", ..."""
+    return f"{'resolved' if resolved else 'open'}#{framework_id}"
 
 
 def generate_annotation_hash(annotation: Dict[str, Any]) -> str:
@@ -63,6 +82,100 @@ def serialize_for_dynamodb(item: Any) -> Any:
         return item
 
 
+def find_existing_annotations(annotations_table: Any, document_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Stored annotations of a document by annotation_hash.
+    
+    Reads FileAnnotationsIndex (file_id = document_id) page by page, projecting
+    only what an upsert needs, so the cost follows the document's annotation
+    count rather than the size of the table. Only with ANNOTATIONS_LEGACY_SCAN
+    on is a document with nothing indexed scanned for older items.
+    
+    Args:
+        annotations_table: ANNOTATIONS table resource
+        document_id: Document identifier
+    
+    Returns:
+        annotation_hash -> {annotation_id, annotation_hash, created_at}
+    """
+    existing: dict[str, dict[str, Any]] = {}
+    query_kwargs: dict[str, Any] = {
+        'IndexName': FILE_ANNOTATIONS_INDEX,
+        'KeyConditionExpression': 'file_id = :doc_id',
+        'ExpressionAttributeValues': {':doc_id': document_id},
+        'ProjectionExpression': 'annotation_id, annotation_hash, created_at'
+    }
+    while True:
+        response = annotations_table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            hash_val = item.get('annotation_hash')
+            if hash_val and isinstance(hash_val, str):
+                existing[hash_val] = item
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    if not existing and ANNOTATIONS_LEGACY_SCAN:
+        # Annotations saved before file_id was set are only found by a scan
+        for item in scan_document_annotations(
+            annotations_table, document_id, attributes=('annotation_id', 'annotation_hash', 'created_at')
+        ):
+            hash_val = item.get('annotation_hash')
+            if hash_val and isinstance(hash_val, str):
+                existing[hash_val] = item
+    return existing
+
+
+def scan_document_annotations(
+    annotations_table: Any,
+    document_id: str,
+    framework_id: str | None = None,
+    include_resolved: bool = True,
+    attributes: Sequence[str] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    A document's annotations from a paginated table scan.
+    
+    Only for items written before file_id/status_framework were set (which
+    the indexes cannot see); pre/backfill_annotations.py adds both.
+    
+    Args:
+        annotations_table: ANNOTATIONS table resource
+        document_id: Document identifier
+        framework_id: Optional framework filter (GDPR, SOC2, HIPAA)
+        include_resolved: Whether to include resolved annotations
+        attributes: Attributes to return (None for the whole item)
+    
+    Returns:
+        List of annotation dictionaries
+    """
+    filter_parts = ['document_id = :doc_id']
+    expression_values: dict[str, Any] = {':doc_id': document_id}
+    if framework_id:
+        filter_parts.append('framework_id = :fw_id')
+        expression_values[':fw_id'] = framework_id
+    if not include_resolved:
+        filter_parts.append('resolved = :resolved')
+        expression_values[':resolved'] = False
+    
+    scan_kwargs: dict[str, Any] = {
+        'FilterExpression': ' AND '.join(filter_parts),
+        'ExpressionAttributeValues': expression_values
+    }
+    if attributes:
+        expression_names = {f'#a{i}': name for i, name in enumerate(attributes)}
+        scan_kwargs['ProjectionExpression'] = ', '.join(expression_names)
+        scan_kwargs['ExpressionAttributeNames'] = expression_names
+    
+    annotations: list[dict[str, Any]] = []
+    while True:
+        response = annotations_table.scan(**scan_kwargs)
+        annotations.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return annotations
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
 def save_annotations_to_dynamodb(
     annotations: List[Any],  # SimpleAnnotation objects
     document_id: str,
@@ -73,6 +186,9 @@ def save_annotations_to_dynamodb(
     Save annotations to DynamoDB ANNOTATIONS table with update capability.
     Updates existing annotations at the same location (based on annotation_hash).
     
+    Existing hashes come from one paginated FileAnnotationsIndex query and all
+    items are written through a batch writer (25 puts per request).
+    
     Args:
         annotations: List of SimpleAnnotation objects (must have model_dump() method)
         document_id: Document identifier
@@ -100,26 +216,16 @@ def save_annotations_to_dynamodb(
     print(f"💾 Saving {len(annotations)} annotations to DynamoDB...")
     
     # First, query existing annotations for this document to build a hash map
-    existing_annotations: dict[str, dict[str, Any]] = {}
     try:
-        # Scan for existing annotations with this document_id
-        response = annotations_table.scan(
-            FilterExpression='document_id = :doc_id',
-            ExpressionAttributeValues={':doc_id': document_id}
-        )
-        
-        for item in response.get('Items', []):
-            hash_val = item.get('annotation_hash')
-            if hash_val and isinstance(hash_val, str):
-                existing_annotations[hash_val] = item
-        
+        existing_annotations = find_existing_annotations(annotations_table, document_id)
         print(f"  📊 Found {len(existing_annotations)} existing annotations for this document")
-        
     except Exception as e:
         print(f"  ⚠️  Could not check for existing annotations: {e}")
         print(f"  ⚠️  Proceeding without deduplication check")
         existing_annotations = {}
     
+    now = datetime.now(timezone.utc).isoformat()
+    items: dict[str, dict[str, Any]] = {}
     for annotation in annotations:
         try:
             # Convert to dict
@@ -127,21 +233,14 @@ def save_annotations_to_dynamodb(
             
             # Generate hash for deduplication
             annotation_hash = generate_annotation_hash(annotation_dict)
+            existing = existing_annotations.get(annotation_hash)
             
-            # Check if annotation already exists
-            is_update = annotation_hash in existing_annotations
-            
-            if is_update:
-                # Get existing annotation_id to preserve it
-                existing_annotation_id = existing_annotations[annotation_hash].get('annotation_id')
-                print(f"  🔄 Updating existing annotation {existing_annotation_id} (hash: {annotation_hash})")
-            else:
-                existing_annotation_id = annotation_dict.get('annotation_id')
-                print(f"  ➕ Creating new annotation {existing_annotation_id} (hash: {annotation_hash})")
+            # Preserve the existing annotation_id (and created_at) or use the new one
+            annotation_id = existing.get('annotation_id') if existing else annotation_dict.get('annotation_id')
             
-            # Prepare item for DynamoDB
             annotation_item: dict[str, Any] = {
-                'annotation_id': existing_annotation_id,  # Preserve existing ID or use new one
+                'annotation_id': annotation_id,
+                'file_id': document_id,  # FileAnnotationsIndex hash key
                 'document_id': document_id,
                 'framework_id': framework_id,
                 'analysis_id': analysis_id,
@@ -154,32 +253,39 @@ def save_annotations_to_dynamodb(
                 'bookmark_type': annotation_dict.get('bookmark_type'),
                 'review_comments': annotation_dict.get('review_comments'),
                 'resolved': annotation_dict.get('resolved', False),
+                'status_framework': annotation_status_key(bool(annotation_dict.get('resolved', False)), framework_id),
                 'generated_by_policy_mate': True,  # Mark as AI-generated
-                'updated_at': datetime.now(timezone.utc).isoformat()
+                'created_at': (existing or {}).get('created_at') or now,
+                'updated_at': now
             }
             
-            # Add created_at only for new annotations
-            if not is_update:
-                annotation_item['created_at'] = datetime.now(timezone.utc).isoformat()
-            
-            # Serialize for DynamoDB (handle Decimal types)
-            annotation_item_serialized = serialize_for_dynamodb(annotation_item)
-            
-            # Save to DynamoDB (put_item will create or overwrite)
-            annotations_table.put_item(Item=annotation_item_serialized)
-            
-            if is_update:
+            if existing:
                 updated_count += 1
-            else:
+            elif annotation_hash not in items:
                 created_count += 1
             
+            # Serialize for DynamoDB (handle Decimal types); the same location twice keeps the last one
+            items[annotation_hash] = serialize_for_dynamodb(annotation_item)
+            
         except Exception as e:
-            print(f"  ✗ Failed to save annotation: {e}")
+            print(f"  ✗ Failed to prepare annotation: {e}")
             failed_count += 1
             import traceback
             traceback.print_exc()
             continue
     
+    try:
+        # put_item per item would be one round trip each; the batch writer sends 25 at a time
+        with annotations_table.batch_writer(overwrite_by_pkeys=['annotation_id']) as batch:
+            for item in items.values():
+                batch.put_item(Item=item)
+    except Exception as e:
+        print(f"  ✗ Failed to save annotations: {e}")
+        import traceback
+        traceback.print_exc()
+        failed_count = len(annotations)
+        created_count = updated_count = 0
+    
     print(f"✅ Annotation save complete: {created_count} created, {updated_count} updated, {failed_count} failed")
     
     return {
@@ -190,10 +296,96 @@ def save_annotations_to_dynamodb(
     }
 
 
+def query_annotations(
+    document_id: str,
+    framework_id: str | None = None,
+    include_resolved: bool = False,
+    attributes: Sequence[str] | None = ANNOTATION_ATTRIBUTES,
+    limit: int = 100,
+    last_key: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """
+    One page of a document's annotations from DocumentAnnotationsIndex.
+    
+    The index sort key is "<open|resolved>#<framework>", so unresolved
+    annotations (optionally of one framework) are a key condition; only
+    include_resolved with a framework needs a filter.
+    
+    When the index has nothing for the document (and ANNOTATIONS_LEGACY_SCAN
+    is on), the whole result comes from scan_document_annotations as one page.
+    
+    Args:
+        document_id: Document identifier
+        framework_id: Optional framework filter (GDPR, SOC2, HIPAA)
+        include_resolved: Whether to include resolved annotations
+        attributes: Attributes to return (None for the whole item)
+        limit: Maximum number of items evaluated for this page
+        last_key: next_page_token of the previous page
+    
+    Returns:
+        Dictionary with annotations, next_page_token and has_more
+    """
+    key_condition = 'document_id = :doc_id'
+    expression_values: dict[str, Any] = {':doc_id': document_id}
+    expression_names: dict[str, str] = {}
+    query_params: dict[str, Any] = {'IndexName': DOCUMENT_ANNOTATIONS_INDEX, 'Limit': limit}
+    
+    if not include_resolved:
+        expression_values[':status'] = annotation_status_key(False, framework_id or '')
+        key_condition += ' AND status_framework = :status' if framework_id else ' AND begins_with(status_framework, :status)'
+    elif framework_id:
+        query_params['FilterExpression'] = 'framework_id = :fw_id'
+        expression_values[':fw_id'] = framework_id
+    
+    if attributes:
+        expression_names = {f'#a{i}': name for i, name in enumerate(attributes)}
+        query_params['ProjectionExpression'] = ', '.join(expression_names)
+        query_params['ExpressionAttributeNames'] = expression_names
+    
+    if last_key:
+        query_params['ExclusiveStartKey'] = last_key
+    
+    annotations_table = get_table(DynamoDBTable.ANNOTATIONS)
+    response = annotations_table.query(
+        KeyConditionExpression=key_condition,
+        ExpressionAttributeValues=expression_values,
+        **query_params
+    )
+    
+    if ANNOTATIONS_LEGACY_SCAN and not last_key and not response.get('Items') and 'LastEvaluatedKey' not in response:
+        # Nothing indexed: the document may only have items from before status_framework
+        legacy = scan_document_annotations(annotations_table, document_id, framework_id, include_resolved, attributes)
+        return {'annotations': legacy, 'next_page_token': None, 'has_more': False}
+    
+    return {
+        'annotations': response.get('Items', []),
+        'next_page_token': response.get('LastEvaluatedKey'),
+        'has_more': 'LastEvaluatedKey' in response
+    }
+
+
+def iter_annotations(
+    document_id: str,
+    framework_id: str | None = None,
+    include_resolved: bool = False,
+    attributes: Sequence[str] | None = ANNOTATION_ATTRIBUTES,
+    page_size: int = 100
+) -> Iterator[Dict[str, Any]]:
+    """Every matching annotation of a document, fetched page by page as the caller consumes them"""
+    last_key: dict[str, Any] | None = None
+    while True:
+        page = query_annotations(document_id, framework_id, include_resolved, attributes, page_size, last_key)
+        yield from page['annotations']
+        if not page['has_more']:
+            return
+        last_key = page['next_page_token']
+
+
 def get_annotations_for_document(
     document_id: str,
     framework_id: str | None = None,
-    include_resolved: bool = False
+    include_resolved: bool = False,
+    attributes: Sequence[str] | None = ANNOTATION_ATTRIBUTES
 ) -> List[Dict[str, Any]]:
     """
     Retrieve all annotations for a document from DynamoDB.
@@ -202,33 +394,13 @@ def get_annotations_for_document(
         document_id: Document identifier
         framework_id: Optional framework filter (GDPR, SOC2, HIPAA)
         include_resolved: Whether to include resolved annotations
+        attributes: Attributes to return (None for the whole item)
     
     Returns:
         List of annotation dictionaries
     """
-    annotations_table = get_table(DynamoDBTable.ANNOTATIONS)
-    
     try:
-        # Build filter expression
-        filter_parts = ['document_id = :doc_id']
-        expression_values: dict[str, Any] = {':doc_id': document_id}
-        
-        if framework_id:
-            filter_parts.append('framework_id = :fw_id')
-            expression_values[':fw_id'] = framework_id
-        
-        if not include_resolved:
-            filter_parts.append('resolved = :resolved')
-            expression_values[':resolved'] = False
-        
-        filter_expression = ' AND '.join(filter_parts)
-        
-        response = annotations_table.scan(
-            FilterExpression=filter_expression,
-            ExpressionAttributeValues=expression_values
-        )
-        
-        annotations = response.get('Items', [])
+        annotations = list(iter_annotations(document_id, framework_id, include_resolved, attributes))
         print(f"✓ Retrieved {len(annotations)} annotations for document {document_id}")
         
         return annotations
@@ -257,11 +429,21 @@ def mark_annotation_resolved(
     annotations_table = get_table(DynamoDBTable.ANNOTATIONS)
     
     try:
+        # The index sort key carries the framework, so read it before flipping the status
+        item = annotations_table.get_item(
+            Key={'annotation_id': annotation_id},
+            ProjectionExpression='framework_id'
+        ).get('Item')
+        if item is None:
+            print(f"✗ Annotation {annotation_id} not found")
+            return False
+        
         annotations_table.update_item(
             Key={'annotation_id': annotation_id},
-            UpdateExpression='SET resolved = :resolved, updated_at = :updated_at',
+            UpdateExpression='SET resolved = :resolved, status_framework = :status, updated_at = :updated_at',
             ExpressionAttributeValues={
                 ':resolved': resolved,
+                ':status': annotation_status_key(resolved, str(item.get('framework_id', ''))),
                 ':updated_at': datetime.now(timezone.utc).isoformat()
             },
             ReturnValues='UPDATED_NEW'
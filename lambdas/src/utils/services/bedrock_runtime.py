@@ -0,0 +1,324 @@
+# filePath: lambdas/src/utils/services/bedrock_runtime.py
+"""
+Shared Bedrock runtime invocation service.
+
+Every model call in the lambdas goes through this module so that:
+- one client per region is built lazily and reused across invocations,
+- the connection pool is sized for the analysis fan-out instead of botocore's
+  default of 10,
+- the adaptive retry policy from llm_models applies everywhere, and
+- per-model latency and token histograms are recorded in one place.
+"""
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from botocore.config import Config
+
+from src.utils.logger import log_with_context
+from src.utils.services.llm_models import get_bedrock_model, retry_config
+from src.utils.services.rate_limiter import AdaptiveRateLimiter
+from src.utils.settings import ANALYSIS_MAX_RPS, AWS_REGION, BEDROCK_MAX_POOL_CONNECTIONS
+
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+TITAN_EMBED_MODEL = "amazon.titan-embed-text-v1"
+
+# Botocore retries only brief transient errors on the shared client. Every caller
+# retries throttling itself, paced by a shared limiter: call_with_throttle_retry
+# (embeddings, triage, LLM.invoke, compliance checks, the analyzers and handler)
+# or _invoke_with_backoff (v2 analyzer). retry_config's 10 adaptive attempts
+# under those loops came to ~60 tries per call.
+BEDROCK_CLIENT_MAX_ATTEMPTS = 3
+
+pooled_config = retry_config.merge(Config(
+    max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+    retries={'max_attempts': BEDROCK_CLIENT_MAX_ATTEMPTS, 'mode': 'standard'}
+))
+
+# Paces the Claude calls of the container (shared by all threads and callers)
+analysis_rate_limiter = AdaptiveRateLimiter(ANALYSIS_MAX_RPS)
+
+_clients: dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+# How Bedrock words a ValidationException for a prompt over the context window
+_INPUT_TOO_LONG = re.compile(
+    r'too long|too many (?:input )?tokens|context (?:window|length)|exceeds? the max|maximum (?:context|input)',
+    re.IGNORECASE
+)
+
+
+def is_input_too_long(error: Exception) -> bool:
+    """True for a ValidationException about input/context length (not a bad model ID or parameter)"""
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    details: dict[str, Any] = response.get('Error', {})
+    return details.get('Code') == 'ValidationException' and bool(_INPUT_TOO_LONG.search(str(details.get('Message', ''))))
+
+
+def get_bedrock_runtime(region_name: str = AWS_REGION) -> Any:
+    """Get the shared, lazily constructed bedrock-runtime client for a region"""
+    client = _clients.get(region_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(region_name)
+            if client is None:
+                client = get_bedrock_model(region_name=region_name, config=pooled_config)
+                _clients[region_name] = client
+    return client
+
+
+class Histogram:
+    """Fixed-bucket histogram; each bucket counts observations <= its bound"""
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict[str, Any]:
+        labels = [str(b) for b in self.bounds] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 2),
+            'avg': round(self.total / self.count, 2) if self.count else 0,
+            'min': self.min if self.count else 0,
+            'max': self.max,
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+class ModelMetrics:
+    """Latency and token histograms for a single model ID"""
+
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.input_tokens = Histogram(TOKEN_BUCKETS)
+        self.output_tokens = Histogram(TOKEN_BUCKETS)
+        self.errors = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'latency_ms': self.latency_ms.snapshot(),
+            'input_tokens': self.input_tokens.snapshot(),
+            'output_tokens': self.output_tokens.snapshot(),
+            'errors': self.errors
+        }
+
+
+_metrics: dict[str, ModelMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(model_id: str, latency_ms: float, input_tokens: int, output_tokens: int, error: bool = False) -> None:
+    with _metrics_lock:
+        metrics = _metrics.setdefault(model_id, ModelMetrics())
+        metrics.latency_ms.observe(latency_ms)
+        if error:
+            metrics.errors += 1
+            return
+        metrics.input_tokens.observe(input_tokens)
+        metrics.output_tokens.observe(output_tokens)
+
+
+def get_invocation_metrics() -> dict[str, dict[str, Any]]:
+    """Snapshot of per-model metrics recorded in this container"""
+    with _metrics_lock:
+        return {model_id: m.snapshot() for model_id, m in _metrics.items()}
+
+
+def log_invocation_metrics(request_id: str = "") -> None:
+    """Emit the per-model metrics snapshot as a structured log line"""
+    log_with_context("INFO", "Bedrock invocation metrics", request_id=request_id, metrics=get_invocation_metrics())
+
+
+def _header_tokens(response: dict[str, Any], header: str) -> int:
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    try:
+        return int(headers.get(header, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _invoke(model_id: str, body: dict[str, Any], region_name: str) -> tuple[dict[str, Any], dict[str, Any], float]:
+    """Invoke a model and return (raw response, parsed body, latency in ms)"""
+    client = get_bedrock_runtime(region_name)
+    started = time.perf_counter()
+    try:
+        response: dict[str, Any] = client.invoke_model(modelId=model_id, body=json.dumps(body))
+        response_body: dict[str, Any] = json.loads(response['body'].read())
+    except Exception:
+        _record(model_id, (time.perf_counter() - started) * 1000, 0, 0, error=True)
+        raise
+    return response, response_body, (time.perf_counter() - started) * 1000
+
+
+@dataclass
+class ClaudeResponse:
+    """Text and accounting for one Anthropic messages call"""
+    text: str
+    stop_reason: str | None
+    input_tokens: int
+    output_tokens: int
+    latency_ms: float
+    tool_input: dict[str, Any] | None = None
+
+
+def invoke_claude(
+    model_id: str,
+    prompt: str,
+    max_tokens: int = 4000,
+    temperature: float | None = None,
+    region_name: str = AWS_REGION
+) -> ClaudeResponse:
+    """
+    Invoke an Anthropic model with a single user message.
+
+    Args:
+        model_id: Bedrock model ID
+        prompt: User message content
+        max_tokens: Output token cap
+        temperature: Optional sampling temperature
+        region_name: Bedrock region
+
+    Returns:
+        ClaudeResponse with the first text block, stop reason and token usage
+    """
+    body: dict[str, Any] = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if temperature is not None:
+        body["temperature"] = temperature
+
+    response, response_body, latency_ms = _invoke(model_id, body, region_name)
+
+    usage = response_body.get('usage', {})
+    input_tokens = int(usage.get('input_tokens') or _header_tokens(response, 'x-amzn-bedrock-input-token-count'))
+    output_tokens = int(usage.get('output_tokens') or _header_tokens(response, 'x-amzn-bedrock-output-token-count'))
+    _record(model_id, latency_ms, input_tokens, output_tokens)
+
+    content = response_body.get('content') or [{}]
+    return ClaudeResponse(
+        text=content[0].get('text', ''),
+        stop_reason=response_body.get('stop_reason'),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        latency_ms=latency_ms
+    )
+
+
+def converse_with_tool(
+    model_id: str,
+    prompt: str,
+    tool_spec: dict[str, Any],
+    max_tokens: int = 4000,
+    temperature: float | None = None,
+    region_name: str = AWS_REGION
+) -> ClaudeResponse:
+    """
+    Call the Converse API with a single tool the model is forced to use.
+
+    The structured answer comes back as the tool's parsed input, so there is
+    no free-text JSON to clean up.
+
+    Args:
+        model_id: Bedrock model ID
+        prompt: User message content
+        tool_spec: Converse toolSpec (name, description, inputSchema)
+        max_tokens: Output token cap
+        temperature: Optional sampling temperature
+        region_name: Bedrock region
+
+    Returns:
+        ClaudeResponse with tool_input set (None if the model produced no
+        tool call, e.g. when cut off at max_tokens)
+    """
+    inference_config: dict[str, Any] = {"maxTokens": max_tokens}
+    if temperature is not None:
+        inference_config["temperature"] = temperature
+
+    client = get_bedrock_runtime(region_name)
+    started = time.perf_counter()
+    try:
+        response: dict[str, Any] = client.converse(
+            modelId=model_id,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig=inference_config,
+            toolConfig={
+                "tools": [{"toolSpec": tool_spec}],
+                "toolChoice": {"tool": {"name": tool_spec["name"]}}
+            }
+        )
+    except Exception:
+        _record(model_id, (time.perf_counter() - started) * 1000, 0, 0, error=True)
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    usage = response.get('usage', {})
+    input_tokens = int(usage.get('inputTokens', 0))
+    output_tokens = int(usage.get('outputTokens', 0))
+    _record(model_id, latency_ms, input_tokens, output_tokens)
+
+    text_parts: list[str] = []
+    tool_input: dict[str, Any] | None = None
+    for block in response.get('output', {}).get('message', {}).get('content', []):
+        if 'text' in block:
+            text_parts.append(block['text'])
+        tool_use = block.get('toolUse')
+        if tool_use and tool_use.get('name') == tool_spec["name"] and isinstance(tool_use.get('input'), dict):
+            tool_input = tool_use['input']
+
+    return ClaudeResponse(
+        text=''.join(text_parts),
+        stop_reason=response.get('stopReason'),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        latency_ms=latency_ms,
+        tool_input=tool_input
+    )
+
+
+def invoke_embedding(
+    text: str,
+    model_id: str = TITAN_EMBED_MODEL,
+    region_name: str = AWS_REGION,
+    dimensions: int | None = None,
+    normalize: bool = False
+) -> list[float]:
+    """Generate a Titan text embedding (dimensions/normalize are Titan v2 options)"""
+    body: dict[str, Any] = {"inputText": text}
+    if dimensions:
+        body["dimensions"] = dimensions
+    if normalize:
+        body["normalize"] = True
+    response, response_body, latency_ms = _invoke(model_id, body, region_name)
+
+    input_tokens = int(response_body.get('inputTextTokenCount') or _header_tokens(response, 'x-amzn-bedrock-input-token-count'))
+    _record(model_id, latency_ms, input_tokens, 0)
+
+    return response_body['embedding']
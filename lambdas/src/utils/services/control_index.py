@@ -0,0 +1,147 @@
+# filePath: lambdas/src/utils/services/control_index.py
+"""
+In-process embedding index over a framework's controls.
+
+Each batch of document blocks gets the controls most similar to it instead of
+the first N in table order. The index is a row-normalized float32 NumPy
+matrix, built once per container (and per controls_hash) from the query
+embeddings loaded with the controls (snapshot or DynamoDB) when they come from
+the active embedding profile, or from OpenSearch otherwise. Scoring a batch is
+one matrix-vector product plus an argpartition.
+"""
+import threading
+from typing import Any, Literal, Sequence
+
+import numpy as np
+
+from src.utils.services.controls_repository import FrameworkControls, controls_repository
+from src.utils.services.embeddings import generate_embedding, profile
+from src.utils.services.opensearch import get_control_embeddings
+from src.utils.services.similarity import normalize_rows, top_k_indices
+
+# Titan text embeddings accept ~8k tokens; stay well inside that
+MAX_QUERY_CHARS = 20000
+
+
+class ControlIndex:
+    """Cosine top-k over one framework's control embeddings"""
+
+    def __init__(self, control_ids: list[str], matrix: np.ndarray):
+        self.control_ids = control_ids
+        self.matrix = normalize_rows(matrix)
+
+    def __len__(self) -> int:
+        return len(self.control_ids)
+
+    def top_k(
+        self,
+        queries: Sequence[Sequence[float]] | np.ndarray,
+        k: int,
+        reduce: Literal['centroid', 'max'] = 'centroid'
+    ) -> list[tuple[str, float]]:
+        """
+        Controls closest to one or more query embeddings.
+
+        Args:
+            queries: Query embeddings, shape (m, dim) or (dim,)
+            k: Number of controls to return
+            reduce: 'centroid' scores against the mean query direction,
+                    'max' takes each control's best similarity to any query
+
+        Returns:
+            (control_id, cosine similarity) pairs, most similar first
+        """
+        q = normalize_rows(queries)
+
+        if reduce == 'max':
+            scores = (self.matrix @ q.T).max(axis=1)
+        else:
+            centroid = q.mean(axis=0)
+            centroid /= np.linalg.norm(centroid) or 1.0
+            scores = self.matrix @ centroid
+
+        return [(self.control_ids[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+
+_indexes: dict[tuple[str, str], ControlIndex | None] = {}
+_indexes_lock = threading.Lock()
+
+
+def _build_index(framework: FrameworkControls) -> ControlIndex | None:
+    known = set(framework.by_id)
+    snapshot = framework.compiled
+
+    # Queries are embedded with the active profile; vectors of another model
+    # (or dimension) are not comparable, so those fall back to the vector store
+    # (OpenSearch, or the embedded store, which only loads the active profile)
+    if snapshot.embeddings is not None and snapshot.embedding_model != profile.key:
+        print(f"⚠️ Stored {framework.framework_id} embeddings are from {snapshot.embedding_model or 'an unknown model'}, "
+              f"not {profile.key}; using the vector store")
+    elif snapshot.embeddings is not None:
+        # Zero-copy view over the precomputed query embeddings; normalized into a new matrix
+        matrix = np.frombuffer(snapshot.embeddings, dtype=np.float32).reshape(-1, snapshot.embedding_dim)
+        rows = [i for i, cid in enumerate(snapshot.embedding_ids) if cid in known]
+        return ControlIndex([snapshot.embedding_ids[i] for i in rows], matrix[rows])
+
+    embeddings = get_control_embeddings(framework.framework_id)
+    ids = [cid for cid in embeddings if cid in known]
+    if not ids:
+        return None
+    return ControlIndex(ids, np.array([embeddings[cid] for cid in ids], dtype=np.float32))
+
+
+def get_control_index(framework: str) -> ControlIndex | None:
+    """Index for a framework, built once per container and controls version"""
+    controls = controls_repository.get_framework(framework)
+    key = (controls.framework_id, controls.controls_hash)
+    if key in _indexes:
+        return _indexes[key]
+
+    with _indexes_lock:
+        if key not in _indexes:
+            try:
+                _indexes[key] = _build_index(controls)
+            except Exception as e:
+                print(f"⚠️ Control index unavailable for {framework}: {e}")
+                _indexes[key] = None
+            index = _indexes[key]
+            print(f"🧭 Control index for {framework}: {len(index) if index else 0} controls")
+    return _indexes[key]
+
+
+def select_controls(
+    framework: str,
+    controls: list[dict[str, Any]],
+    text: str,
+    k: int
+) -> list[dict[str, Any]]:
+    """
+    The k controls most relevant to a piece of document text.
+
+    Falls back to the first k controls when no index or embedding is available,
+    which is what the prompts used before.
+
+    Args:
+        framework: Framework name (GDPR, SOC2, HIPAA)
+        controls: The framework's controls
+        text: Document text to match (e.g. a batch's blocks joined)
+        k: Number of controls to return
+
+    Returns:
+        Selected controls, most relevant first
+    """
+    if len(controls) <= k or not text.strip():
+        return controls[:k]
+
+    try:
+        index = get_control_index(framework)
+        if index is None:
+            return controls[:k]
+        query = generate_embedding(text[:MAX_QUERY_CHARS])
+        by_id = {c['control_id']: c for c in controls}
+        selected = [by_id[cid] for cid, _ in index.top_k(query, k) if cid in by_id]
+    except Exception as e:
+        print(f"⚠️ Control selection failed, using first {k}: {e}")
+        return controls[:k]
+
+    return selected or controls[:k]
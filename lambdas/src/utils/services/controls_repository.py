@@ -0,0 +1,310 @@
+# filePath: lambdas/src/utils/services/controls_repository.py
+"""
+Single access path for compliance controls.
+
+Controls live in PolicyMateComplianceControls under the framework_id
+partition key ("gdpr_2025"). The repository queries that partition (never a
+table scan), follows LastEvaluatedKey, projects only the attributes the
+analyzers and tools read, and keeps the result in an in-process TTL cache
+keyed by (framework, version). After the first load in a container every
+caller gets the same list back without touching DynamoDB.
+
+When a compiled snapshot is bundled with the package, the cold load is a
+single GetItem on the framework's manifest row instead: if its
+controls_hash matches the snapshot, the snapshot is used as-is; otherwise
+the partition is queried as above.
+
+Each control's query embedding (control_query_text, written by
+pre/load_embeddings.py) is loaded alongside it from either source, so
+callers matching document text against controls only embed the document.
+
+Returned controls are shared between callers - treat them as read-only.
+"""
+import hashlib
+import json
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from src.utils.services.controls_snapshot import ControlsSnapshot, FrameworkSnapshot, load_snapshot
+from src.utils.services.dynamoDB import DynamoDBTable, get_table, replace_decimals
+from src.utils.services.embedding_cache import unpack_vector
+from src.utils.settings import CONTROLS_CACHE_TTL_SECONDS, CONTROLS_SNAPSHOT_PATH, CONTROLS_VERSION
+
+CONTROL_ATTRIBUTES = (
+    'framework_id',
+    'control_id',
+    'framework_name',
+    'version',
+    'article',
+    'category',
+    'requirement',
+    'severity',
+    'trust_service',
+    'keywords',
+    'verification_points',
+)
+
+# Precomputed query embedding stored on each control row: float16 bytes, the
+# model that produced them and the sha256 of the control_query_text embedded
+QUERY_EMBEDDING_ATTRIBUTES = ('query_embedding', 'query_embedding_model', 'query_embedding_hash')
+
+# Defaults filled in for attributes a control does not carry
+_DEFAULTS: dict[str, Any] = {
+    'severity': 'medium',
+    'keywords': [],
+    'verification_points': [],
+}
+
+# Per-framework manifest row written by pre/load_compliance.py. Sort keys
+# starting with '#' are bookkeeping rows, never controls.
+MANIFEST_CONTROL_ID = '#manifest'
+SUMMARY_REQUIREMENT_CHARS = 120
+
+
+def framework_partition_key(framework: str, version: str = CONTROLS_VERSION) -> str:
+    """GDPR -> gdpr_2025"""
+    return f'{framework.lower()}_{version}'
+
+
+def is_control_item(item: dict[str, Any]) -> bool:
+    """False for manifest/bookkeeping rows in the controls table"""
+    return not str(item.get('control_id', '')).startswith('#')
+
+
+def normalize_control(item: dict[str, Any]) -> dict[str, Any]:
+    """Project a raw table item onto CONTROL_ATTRIBUTES, as the repository returns it"""
+    control = {attr: item.get(attr, _DEFAULTS.get(attr, '')) for attr in CONTROL_ATTRIBUTES}
+    return replace_decimals(control)
+
+
+def controls_hash(controls: Iterable[dict[str, Any]]) -> str:
+    """Content hash of normalized controls; order-independent"""
+    canonical = sorted(
+        json.dumps({attr: c.get(attr) for attr in CONTROL_ATTRIBUTES}, sort_keys=True, ensure_ascii=False)
+        for c in controls
+    )
+    return hashlib.sha256('\n'.join(canonical).encode('utf-8')).hexdigest()
+
+
+def summary_line(control: dict[str, Any]) -> str:
+    """One prompt line per control, as used in the analysis prompts"""
+    return (
+        f"- **{control.get('control_id', 'N/A')}** "
+        f"[{control.get('severity', 'medium')}]: "
+        f"{str(control.get('requirement', ''))[:SUMMARY_REQUIREMENT_CHARS]}"
+    )
+
+
+def control_query_text(control: dict[str, Any]) -> str:
+    """Text embedded to match document content against a control"""
+    return f"{control.get('requirement', '')} {' '.join(control.get('keywords', []))}"
+
+
+def query_text_hash(control: dict[str, Any]) -> str:
+    return hashlib.sha256(control_query_text(control).encode('utf-8')).hexdigest()
+
+
+def keyword_set(control: dict[str, Any]) -> list[str]:
+    """Lower-cased keywords plus the category, de-duplicated"""
+    words = [str(k).lower() for k in control.get('keywords', [])]
+    if control.get('category'):
+        words.append(str(control['category']).lower())
+    return sorted(set(words))
+
+
+def compile_framework(framework_id: str, controls: list[dict[str, Any]]) -> FrameworkSnapshot:
+    """
+    Normalize one partition and precompute everything derived from it.
+
+    Each control gets its prompt `summary` line; keyword sets are kept
+    alongside. Stored query embeddings that are current for the control's
+    text become the embedding rows (all from one model, else none are used).
+    Shared by the snapshot build step and the DynamoDB fallback.
+    """
+    compiled: list[dict[str, Any]] = []
+    stored: dict[str, tuple[str, Any]] = {}
+    for item in sorted(controls, key=lambda c: c['control_id']):
+        control = normalize_control(item)
+        control['summary'] = summary_line(control)
+        compiled.append(control)
+        if item.get('query_embedding') is not None and item.get('query_embedding_hash') == query_text_hash(control):
+            stored[control['control_id']] = (str(item.get('query_embedding_model', '')), item['query_embedding'])
+
+    snapshot = FrameworkSnapshot(
+        framework_id=framework_id,
+        controls_hash=controls_hash(compiled),
+        controls=compiled,
+        keywords={c['control_id']: keyword_set(c) for c in compiled}
+    )
+
+    models = {model for model, _ in stored.values()}
+    if stored and len(models) == 1:
+        matrix = array('f')
+        for control_id, (_, data) in stored.items():
+            matrix.extend(unpack_vector(getattr(data, 'value', data)))  # boto3 Binary or bytes
+        snapshot.embedding_model = models.pop()
+        snapshot.embedding_ids = list(stored)
+        snapshot.embedding_dim = len(matrix) // len(stored)
+        snapshot.embeddings = memoryview(matrix)
+    return snapshot
+
+
+@dataclass
+class FrameworkControls:
+    """Cached controls of one framework with their precomputed data"""
+    framework_id: str
+    controls: list[dict[str, Any]]
+    by_id: dict[str, dict[str, Any]]
+    keywords: dict[str, list[str]]
+    controls_hash: str
+    source: str  # 'snapshot' or 'dynamodb'
+    compiled: FrameworkSnapshot
+    # control_id -> query embedding row (zero-copy float32 view), if precomputed
+    query_embeddings: dict[str, memoryview]
+    loaded_at: float
+
+    @classmethod
+    def build(cls, compiled: FrameworkSnapshot, source: str) -> 'FrameworkControls':
+        query_embeddings: dict[str, memoryview] = {}
+        if compiled.embeddings is not None:
+            query_embeddings = {cid: compiled.embedding(row) for row, cid in enumerate(compiled.embedding_ids)}
+        return cls(
+            framework_id=compiled.framework_id,
+            controls=compiled.controls,
+            by_id={c['control_id']: c for c in compiled.controls},
+            keywords=compiled.keywords,
+            controls_hash=compiled.controls_hash,
+            source=source,
+            compiled=compiled,
+            query_embeddings=query_embeddings,
+            loaded_at=time.monotonic()
+        )
+
+    @property
+    def embedding_model(self) -> str:
+        """Model of query_embeddings ('' when there are none)"""
+        return self.compiled.embedding_model if self.query_embeddings else ''
+
+
+class ControlsRepository:
+    """Partition-query loader with an in-process TTL cache"""
+
+    def __init__(
+        self,
+        ttl_seconds: int = CONTROLS_CACHE_TTL_SECONDS,
+        snapshot_path: str | None = CONTROLS_SNAPSHOT_PATH
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self._snapshot = self._load_snapshot(snapshot_path)
+        self._cache: dict[tuple[str, str], FrameworkControls] = {}
+        self._lock = threading.Lock()
+
+    def get_controls(self, framework: str, version: str = CONTROLS_VERSION) -> list[dict[str, Any]]:
+        """
+        All controls for a framework, sorted by control_id.
+
+        Args:
+            framework: Framework name (GDPR, SOC2, HIPAA)
+            version: Controls version, the framework_id suffix
+
+        Returns:
+            List of control dictionaries (cached; do not mutate)
+        """
+        return self.get_framework(framework, version).controls
+
+    def get_control(
+        self,
+        framework: str,
+        control_id: str,
+        version: str = CONTROLS_VERSION
+    ) -> dict[str, Any] | None:
+        """Single control by ID, served from the same cached partition"""
+        return self.get_framework(framework, version).by_id.get(control_id)
+
+    def get_framework(self, framework: str, version: str = CONTROLS_VERSION) -> FrameworkControls:
+        """Controls plus precomputed keyword sets and (snapshot) embeddings"""
+        key = (framework.upper(), version)
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+            return entry
+
+        # One loader per container; concurrent callers wait for its result
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or time.monotonic() - entry.loaded_at >= self.ttl_seconds:
+                entry = self._load(framework_partition_key(framework, version))
+                self._cache[key] = entry
+                print(f"✓ Loaded {len(entry.controls)} controls for {framework} ({version}) from {entry.source}")
+        return entry
+
+    def invalidate(self, framework: str | None = None, version: str = CONTROLS_VERSION) -> None:
+        """Drop one framework (or everything) from the cache"""
+        with self._lock:
+            if framework is None:
+                self._cache.clear()
+            else:
+                self._cache.pop((framework.upper(), version), None)
+
+    @staticmethod
+    def _load_snapshot(path: str | None) -> ControlsSnapshot | None:
+        """Map the bundled snapshot once, at container init"""
+        if not path:
+            return None
+        try:
+            return load_snapshot(path)
+        except Exception as e:
+            print(f"⚠️ Could not load controls snapshot {path}: {e}")
+            return None
+
+    def _load(self, framework_id: str) -> FrameworkControls:
+        bundled = self._snapshot.framework(framework_id) if self._snapshot else None
+
+        if bundled is not None:
+            current_hash = self._manifest_hash(framework_id)
+            if current_hash == bundled.controls_hash:
+                return FrameworkControls.build(bundled, source='snapshot')
+            print(f"⚠️ Controls snapshot for {framework_id} is stale "
+                  f"({bundled.controls_hash[:12]} vs {str(current_hash)[:12]}), querying DynamoDB")
+
+        return FrameworkControls.build(
+            compile_framework(framework_id, self.query_partition(framework_id)),
+            source='dynamodb'
+        )
+
+    def _manifest_hash(self, framework_id: str) -> str | None:
+        """controls_hash recorded when the partition was last loaded"""
+        table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
+        response = table.get_item(
+            Key={'framework_id': framework_id, 'control_id': MANIFEST_CONTROL_ID},
+            ProjectionExpression='controls_hash'
+        )
+        return response.get('Item', {}).get('controls_hash')
+
+    def query_partition(self, framework_id: str) -> list[dict[str, Any]]:
+        """Query every control in a framework_id partition (with its stored query embedding), following pagination"""
+        table = get_table(DynamoDBTable.COMPLIANCE_CONTROLS)
+        names = {f'#a{i}': attr for i, attr in enumerate(CONTROL_ATTRIBUTES + QUERY_EMBEDDING_ATTRIBUTES)}
+        query_kwargs: dict[str, Any] = {
+            'KeyConditionExpression': '#a0 = :fw_id',
+            'ExpressionAttributeValues': {':fw_id': framework_id},
+            'ExpressionAttributeNames': names,
+            'ProjectionExpression': ', '.join(names),
+        }
+
+        items: list[dict[str, Any]] = []
+        while True:
+            response = table.query(**query_kwargs)
+            items.extend(item for item in response.get('Items', []) if is_control_item(item))
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        return items
+
+
+# Module-level instance shared by every caller in the container
+controls_repository = ControlsRepository()
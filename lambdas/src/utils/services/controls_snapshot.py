@@ -0,0 +1,159 @@
+# filePath: lambdas/src/utils/services/controls_snapshot.py
+"""
+Versioned binary snapshot of compiled compliance controls.
+
+Built by `pre/build_controls_snapshot.py` and shipped inside the deployment
+package so a cold start does not have to query DynamoDB for controls.
+
+File layout (little-endian):
+    magic b'PMCS' | format version (u16) | header length (u32)
+    header: UTF-8 JSON with one entry per framework_id
+            (controls_hash, controls incl. precomputed summaries, keyword
+            sets, embedding row offset/count)
+    zero padding to a 4-byte boundary
+    embeddings: one float32 matrix, rows grouped by framework
+
+The file is memory-mapped; embeddings are exposed as zero-copy views.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+MAGIC = b'PMCS'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<4sHI')
+
+
+@dataclass
+class FrameworkSnapshot:
+    """Compiled controls of one framework_id partition"""
+    framework_id: str
+    controls_hash: str
+    controls: list[dict[str, Any]]
+    keywords: dict[str, list[str]]
+    embedding_model: str = ''
+    embedding_dim: int = 0
+    # control_ids in embedding row order; empty when built without embeddings
+    embedding_ids: list[str] = field(default_factory=list[str])
+    embeddings: memoryview | None = None  # flat float32, len(embedding_ids) * embedding_dim
+
+    def embedding(self, row: int) -> memoryview:
+        """Row `row` of the embedding matrix"""
+        assert self.embeddings is not None
+        return self.embeddings[row * self.embedding_dim:(row + 1) * self.embedding_dim]
+
+
+@dataclass
+class ControlsSnapshot:
+    built_at: str
+    frameworks: dict[str, FrameworkSnapshot]
+
+    def framework(self, framework_id: str) -> FrameworkSnapshot | None:
+        return self.frameworks.get(framework_id)
+
+
+def write_snapshot(
+    path: str,
+    frameworks: Sequence[FrameworkSnapshot],
+    built_at: str,
+    vectors: dict[str, Sequence[Sequence[float]]] | None = None
+) -> int:
+    """
+    Write a snapshot file.
+
+    Args:
+        path: Output path
+        frameworks: Compiled frameworks (embeddings field ignored)
+        built_at: ISO timestamp recorded in the header
+        vectors: Optional framework_id -> embedding rows, in embedding_ids order
+
+    Returns:
+        Bytes written
+    """
+    vectors = vectors or {}
+    matrix = array('f')
+    header: dict[str, Any] = {'built_at': built_at, 'frameworks': {}}
+
+    for fw in frameworks:
+        rows = vectors.get(fw.framework_id, [])
+        entry: dict[str, Any] = {
+            'controls_hash': fw.controls_hash,
+            'controls': fw.controls,
+            'keywords': fw.keywords,
+            'embedding_model': fw.embedding_model,
+            'embedding_dim': fw.embedding_dim if rows else 0,
+            'embedding_ids': fw.embedding_ids if rows else [],
+            'embedding_offset': len(matrix),
+        }
+        for row in rows:
+            if len(row) != fw.embedding_dim:
+                raise ValueError(f"{fw.framework_id}: embedding of {len(row)} dims, expected {fw.embedding_dim}")
+            matrix.extend(row)
+        header['frameworks'][fw.framework_id] = entry
+
+    if sys.byteorder != 'little':
+        matrix.byteswap()
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    padding = -(_PREAMBLE.size + len(header_bytes)) % 4
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * padding)
+        f.write(matrix.tobytes())
+    os.replace(tmp_path, path)
+    return _PREAMBLE.size + len(header_bytes) + padding + len(matrix) * matrix.itemsize
+
+
+def load_snapshot(path: str) -> ControlsSnapshot | None:
+    """
+    Memory-map a snapshot file.
+
+    Returns None when the file is missing or was written in another format
+    version, so callers fall back to DynamoDB.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = _PREAMBLE.unpack_from(mapped, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        print(f"⚠️ Ignoring controls snapshot {path}: format {magic!r} v{version}")
+        mapped.close()
+        return None
+
+    header_end = _PREAMBLE.size + header_len
+    header = json.loads(mapped[_PREAMBLE.size:header_end].decode('utf-8'))
+    data_start = header_end + (-header_end % 4)
+
+    # Zero-copy float32 view; only valid on little-endian hosts (all Lambda targets)
+    matrix = memoryview(mapped)[data_start:].cast('f') if sys.byteorder == 'little' else None
+
+    frameworks: dict[str, FrameworkSnapshot] = {}
+    for framework_id, entry in header['frameworks'].items():
+        dim = entry['embedding_dim']
+        ids = entry['embedding_ids']
+        offset = entry['embedding_offset']
+        embeddings = matrix[offset:offset + len(ids) * dim] if matrix is not None and dim else None
+        frameworks[framework_id] = FrameworkSnapshot(
+            framework_id=framework_id,
+            controls_hash=entry['controls_hash'],
+            controls=entry['controls'],
+            keywords=entry['keywords'],
+            embedding_model=entry['embedding_model'],
+            embedding_dim=dim if embeddings is not None else 0,
+            embedding_ids=ids if embeddings is not None else [],
+            embeddings=embeddings
+        )
+
+    return ControlsSnapshot(built_at=header['built_at'], frameworks=frameworks)
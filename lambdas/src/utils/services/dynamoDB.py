@@ -1,4 +1,5 @@
 # filePath: lambdas/src/utils/services/dynamoDB.py
+import time
 import boto3
 from enum import Enum
 from typing import Any
@@ -13,6 +14,7 @@ deserializer = TypeDeserializer()
 class DynamoDBTable(Enum):
     COMPLIANCE_CONTROLS = "PolicyMateComplianceControls"
     CONVERSATION_HISTORY = "PolicyMateConversationHistory"
+    CONVERSATION_SESSIONS = "PolicyMateConversationSessions"
     COMPLIANCE_REPORTS = "PolicyMateComplianceReports"
     DOCUMENTS = "PolicyMateUserFiles"
     FILES = "PolicyMateFiles"
@@ -21,6 +23,8 @@ class DynamoDBTable(Enum):
     INFERRED_FILES = "PolicyMateInferredFiles"
     ANNOTATIONS = "PolicyMateAnnotations"
     POLLING_STATUS = "PolicyMatePollingStatus"
+    EMBEDDING_CACHE = "PolicyMateEmbeddingCache"
+    ANALYSIS_RESULTS = "PolicyMateAnalysisResults"
     
 # We're trying to create a processing workflow simple enough for Hack
 # Once our idea looks great -> we can move to step functions or 
@@ -44,6 +48,57 @@ def get_table(table_name: DynamoDBTable | str):
         return dynamodb.Table(table_name)
     return dynamodb.Table(table_name.value)
 
+def user_file_sort_key(created_at: Any, file_id: str) -> str:
+    """
+    Entry of a user's file_sort_keys set: "<created_at ms, 13 digits>#<file_id>".
+
+    Kept next to uploaded_files so a user's documents sort and page by upload
+    time as plain strings, without reading every Files item.
+    """
+    return f"{int(str(created_at)):013d}#{file_id}"
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+BATCH_GET_RETRIES = 5
+
+def batch_get_items(
+    table_name: DynamoDBTable,
+    keys: list[dict[str, Any]],
+    projection: str | None = None,
+    expression_names: dict[str, str] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Items for many primary keys: BatchGetItem in chunks of 100, retrying
+    UnprocessedKeys with backoff. Missing keys are skipped; order is not kept.
+    
+    Args:
+        table_name: Table to read
+        keys: Primary keys (duplicates are not allowed by DynamoDB)
+        projection: Optional ProjectionExpression
+        expression_names: ExpressionAttributeNames used by the projection
+    
+    Returns:
+        The found items
+    """
+    items: list[dict[str, Any]] = []
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request_keys: dict[str, Any] = {'Keys': keys[start:start + BATCH_GET_LIMIT]}
+        if projection:
+            request_keys['ProjectionExpression'] = projection
+        if expression_names:
+            request_keys['ExpressionAttributeNames'] = expression_names
+        request: dict[str, Any] = {table_name.value: request_keys}
+        for attempt in range(BATCH_GET_RETRIES + 1):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table_name.value, []))
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+            if attempt == BATCH_GET_RETRIES:
+                raise RuntimeError(f"{table_name.value}: keys still unprocessed after {BATCH_GET_RETRIES} retries")
+            time.sleep(0.05 * 2 ** attempt)
+    return items
+
 def replace_decimals(obj: Any) -> Any:
     """
     Recursively replace Decimal objects with int/float for JSON serialization.
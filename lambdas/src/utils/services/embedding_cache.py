@@ -0,0 +1,166 @@
+# filePath: lambdas/src/utils/services/embedding_cache.py
+"""
+Two-tier cache for text embeddings.
+
+Entries are keyed by (embedding profile key, SHA-256 of the text), so an
+unchanged chunk or control query is embedded once no matter which document,
+request or container asks for it again:
+- tier 1 is a bounded in-process LRU of encoded vectors,
+- tier 2 is the PolicyMateEmbeddingCache DynamoDB table, one item per key
+  holding the encoded vector and a TTL.
+
+Vectors are encoded as little-endian float16 (3 KB for Titan v1 instead of
+~30 KB of Number attributes, or ~49 KB as a Python list), or as int8 for
+int8 embedding profiles. They are returned decoded from that encoding,
+including on a miss, so a cold and a warm run rank chunks identically.
+"""
+import hashlib
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Literal
+
+from src.utils.services.dynamoDB import DynamoDBTable, batch_get_items, get_table
+from src.utils.services.embedding_profiles import INT8_SCALE, quantize_int8
+from src.utils.settings import EMBEDDING_CACHE_PERSISTENT, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL_DAYS
+
+Encoding = Literal['float16', 'int8']
+
+
+def cache_key(model_id: str, text: str) -> str:
+    """<model>#<sha256 of the UTF-8 text>"""
+    return f"{model_id}#{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def pack_vector(vector: list[float], encoding: Encoding = 'float16') -> bytes:
+    """float16 little-endian bytes, or normalized int8 (x127)"""
+    if encoding == 'int8':
+        return struct.pack(f'<{len(vector)}b', *quantize_int8(vector))
+    return struct.pack(f'<{len(vector)}e', *vector)
+
+
+def unpack_vector(data: bytes, encoding: Encoding = 'float16') -> list[float]:
+    if encoding == 'int8':
+        return [v / INT8_SCALE for v in struct.unpack(f'<{len(data)}b', data)]
+    return list(struct.unpack(f'<{len(data) // 2}e', data))
+
+
+class EmbeddingCache:
+    """Bounded LRU in front of an optional DynamoDB table"""
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        persistent: bool = EMBEDDING_CACHE_PERSISTENT,
+        ttl_days: int = EMBEDDING_CACHE_TTL_DAYS
+    ):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.ttl_days = ttl_days
+        self._entries: OrderedDict[str, tuple[Encoding, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        model_id: str,
+        texts: Iterable[str],
+        compute: Callable[[list[str]], list[list[float]]],
+        encoding: Encoding = 'float16'
+    ) -> list[list[float]]:
+        """
+        Embeddings for `texts` in input order, computing only what neither
+        tier has. Duplicate texts are computed once.
+
+        Args:
+            model_id: Embedding model/profile key the vectors come from (part of the key)
+            texts: Texts to embed
+            compute: Embeds the missed texts, returning vectors in the same order
+            encoding: How new vectors are stored (the profile's cache_encoding)
+
+        Returns:
+            One vector per input text
+        """
+        texts = list(texts)
+        keys = [cache_key(model_id, text) for text in texts]
+        found: dict[str, tuple[Encoding, bytes]] = {}
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+            self.hits += sum(1 for key in keys if key in found)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self.persistent:
+            stored = self._read_table(missing)
+            self.table_hits += len(stored)
+            found.update(stored)
+            self._remember(stored)
+
+        pending = {key: text for key, text in zip(keys, texts) if key not in found}
+        computed: dict[str, tuple[Encoding, bytes]] = {}
+        if pending:
+            vectors = compute(list(pending.values()))
+            computed = {key: (encoding, pack_vector(v, encoding)) for key, v in zip(pending, vectors)}
+        if computed:
+            self.misses += len(computed)
+            found.update(computed)
+            self._remember(computed)
+            if self.persistent:
+                self._write_table(model_id, computed)
+
+        decoded = {key: unpack_vector(data, enc) for key, (enc, data) in found.items()}
+        return [decoded[key] for key in keys]
+
+    def clear(self) -> None:
+        """Drop the in-process tier (the table is left alone)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, vectors: dict[str, tuple[Encoding, bytes]]) -> None:
+        with self._lock:
+            for key, entry in vectors.items():
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_table(self, keys: list[str]) -> dict[str, tuple[Encoding, bytes]]:
+        """BatchGetItem in chunks of 100, retrying UnprocessedKeys"""
+        vectors: dict[str, tuple[Encoding, bytes]] = {}
+        try:
+            items = batch_get_items(
+                DynamoDBTable.EMBEDDING_CACHE,
+                [{'cache_key': key} for key in keys],
+                projection='cache_key, vector, encoding'
+            )
+            for item in items:
+                data = item['vector']
+                vectors[item['cache_key']] = (item.get('encoding', 'float16'), bytes(getattr(data, 'value', data)))
+        except Exception as e:
+            print(f"⚠️  Embedding cache read failed, embedding instead: {e}")
+        return vectors
+
+    def _write_table(self, model_id: str, vectors: dict[str, tuple[Encoding, bytes]]) -> None:
+        expires_at = int(time.time()) + self.ttl_days * 86400
+        try:
+            with get_table(DynamoDBTable.EMBEDDING_CACHE).batch_writer() as batch:
+                for key, (encoding, data) in vectors.items():
+                    batch.put_item(Item={
+                        'cache_key': key,
+                        'model_id': model_id,
+                        'encoding': encoding,
+                        'vector': data,
+                        'ttl': expires_at
+                    })
+        except Exception as e:
+            print(f"⚠️  Embedding cache write failed: {e}")
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,79 @@
+# filePath: lambdas/src/utils/services/embedding_driver.py
+"""
+Concurrent embedding of many texts.
+
+Titan embeds one text per request, so a document's chunks used to cost one
+round trip each, back to back. embed_concurrently runs them on a bounded
+thread pool, paces request starts through the container's shared
+AdaptiveRateLimiter and retries throttled requests with backoff, so wall
+time tracks the slowest request instead of the sum. Results come back in
+input order.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Literal, Sequence, TypeVar, overload
+
+from src.utils.services.rate_limiter import AdaptiveRateLimiter, call_with_throttle_retry
+from src.utils.settings import EMBEDDING_MAX_RPS, EMBEDDING_MAX_WORKERS
+
+S = TypeVar('S')
+T = TypeVar('T')
+
+# Shared by every embedding caller in the container
+embedding_rate_limiter = AdaptiveRateLimiter(EMBEDDING_MAX_RPS)
+
+
+@overload
+def embed_concurrently(
+    items: Sequence[S],
+    embed: Callable[[S], T],
+    max_workers: int = ...,
+    limiter: AdaptiveRateLimiter = ...,
+    raise_on_error: Literal[True] = ...
+) -> list[T]: ...
+@overload
+def embed_concurrently(
+    items: Sequence[S],
+    embed: Callable[[S], T],
+    max_workers: int = ...,
+    limiter: AdaptiveRateLimiter = ...,
+    *,
+    raise_on_error: Literal[False]
+) -> list[T | None]: ...
+def embed_concurrently(
+    items: Sequence[S],
+    embed: Callable[[S], T],
+    max_workers: int = EMBEDDING_MAX_WORKERS,
+    limiter: AdaptiveRateLimiter = embedding_rate_limiter,
+    raise_on_error: bool = True
+) -> list[T] | list[T | None]:
+    """
+    Apply `embed` to every item concurrently.
+
+    Args:
+        items: Texts (or records) to embed
+        embed: Embeds one item (e.g. invoke_embedding)
+        max_workers: Concurrent requests at most
+        limiter: Rate limiter shared with other callers
+        raise_on_error: Re-raise the first failure; otherwise failed
+                        items are reported and get None
+
+    Returns:
+        One result per item, in input order
+    """
+    if not items:
+        return []
+
+    def run(item: S) -> T | None:
+        try:
+            return call_with_throttle_retry(embed, item, limiter)
+        except Exception as e:
+            if raise_on_error:
+                raise
+            print(f"⚠️  Embedding failed for {str(item)[:60]!r}: {e}")
+            return None
+
+    if len(items) == 1 or max_workers <= 1:
+        return [run(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(run, items))
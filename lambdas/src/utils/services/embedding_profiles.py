@@ -0,0 +1,122 @@
+# filePath: lambdas/src/utils/services/embedding_profiles.py
+"""
+Embedding profiles: which model embeds, at what output dimension, and how
+the vectors are stored.
+
+EMBEDDING_PROFILE picks one for the whole deployment. The profile decides
+the Titan request, the OpenSearch knn_vector mapping (pre/load_indexing.py),
+the encoding of the embedding cache and the key that precomputed control
+embeddings are matched by, so vectors of different profiles never meet.
+
+Bytes per stored vector:
+    titan-v1             1536 x float32   6144  (the original setup)
+    titan-v2-1024        1024 x float32   4096
+    titan-v2-512         512 x float16    1024  (6x smaller)
+    titan-v2-256         256 x float16     512  (12x smaller)
+    titan-v2-256-int8    256 x int8        256  (24x smaller)
+
+Titan v2 vectors are requested normalized, so int8 quantization is a fixed
+scale (x127) and l2 ranking equals cosine ranking.
+"""
+from dataclasses import dataclass
+from typing import Any, Literal, Sequence
+
+import numpy as np
+
+from src.utils.settings import EMBEDDING_PROFILE
+
+VectorDtype = Literal['float32', 'float16', 'int8']
+
+INT8_SCALE = 127
+
+
+@dataclass(frozen=True)
+class EmbeddingProfile:
+    name: str
+    model_id: str
+    dimension: int
+    dtype: VectorDtype
+    # Titan v2 takes the output dimension (and normalization) in the request
+    configurable: bool = False
+
+    @property
+    def key(self) -> str:
+        """Identifies vectors of this profile in caches and stored control rows"""
+        return f"{self.model_id}@{self.dimension}" if self.configurable else self.model_id
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.dimension * np.dtype(self.dtype).itemsize
+
+    @property
+    def cache_encoding(self) -> Literal['float16', 'int8']:
+        """Encoding of cached vectors: int8 profiles stay int8, everything else float16"""
+        return 'int8' if self.dtype == 'int8' else 'float16'
+
+    def request_options(self) -> dict[str, Any]:
+        """Extra invoke_embedding arguments for this profile"""
+        return {'dimensions': self.dimension, 'normalize': True} if self.configurable else {}
+
+    def index_vector(self, vector: Sequence[float]) -> list[float] | list[int]:
+        """Vector as sent to OpenSearch (byte vectors for int8 profiles)"""
+        if self.dtype == 'int8':
+            return quantize_int8(vector)
+        return [float(v) for v in vector]
+
+    def knn_field(self, m: int, ef_construction: int) -> dict[str, Any]:
+        """knn_vector mapping of the embedding field"""
+        parameters: dict[str, Any] = {'m': m, 'ef_construction': ef_construction}
+        if self.dtype == 'float16':
+            parameters['encoder'] = {'name': 'sq', 'parameters': {'type': 'fp16'}}
+        field: dict[str, Any] = {
+            'type': 'knn_vector',
+            'dimension': self.dimension,
+            'method': {
+                'name': 'hnsw',
+                'engine': 'faiss',
+                'space_type': 'l2',
+                'parameters': parameters
+            }
+        }
+        if self.dtype == 'int8':
+            field['data_type'] = 'byte'
+        return field
+
+
+PROFILES: dict[str, EmbeddingProfile] = {
+    profile.name: profile
+    for profile in (
+        EmbeddingProfile('titan-v1', 'amazon.titan-embed-text-v1', 1536, 'float32'),
+        EmbeddingProfile('titan-v2-1024', 'amazon.titan-embed-text-v2:0', 1024, 'float32', configurable=True),
+        EmbeddingProfile('titan-v2-512', 'amazon.titan-embed-text-v2:0', 512, 'float16', configurable=True),
+        EmbeddingProfile('titan-v2-256', 'amazon.titan-embed-text-v2:0', 256, 'float16', configurable=True),
+        EmbeddingProfile('titan-v2-256-int8', 'amazon.titan-embed-text-v2:0', 256, 'int8', configurable=True),
+    )
+}
+
+
+def get_embedding_profile(name: str = EMBEDDING_PROFILE) -> EmbeddingProfile:
+    """Profile by name (defaults to EMBEDDING_PROFILE)"""
+    profile = PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"Unknown embedding profile '{name}', expected one of {sorted(PROFILES)}")
+    return profile
+
+
+def quantize_int8(vector: Sequence[float]) -> list[int]:
+    """Normalize, then scale to [-127, 127] and round"""
+    array = np.array(vector, dtype=np.float32)
+    array /= np.linalg.norm(array) or 1.0
+    return np.rint(array * INT8_SCALE).astype(np.int8).tolist()
+
+
+def quantize_rows(matrix: np.ndarray, dtype: VectorDtype) -> np.ndarray:
+    """
+    Store a row-normalized float32 matrix in `dtype`.
+
+    int8 rows are scaled by 127; they must be upcast (and re-normalized,
+    which the scale does not affect) before scoring.
+    """
+    if dtype == 'int8':
+        return np.rint(matrix * INT8_SCALE).astype(np.int8)
+    return matrix.astype(np.dtype(dtype), copy=False)
@@ -1,16 +1,24 @@
 # filePath: lambdas/src/utils/services/embeddings.py
-import json
-import boto3
 from src.utils.settings import OPEN_SEARCH_REGION
-from mypy_boto3_bedrock_agent_runtime.client import AgentsforBedrockRuntimeClient
+from src.utils.services.bedrock_runtime import invoke_embedding
+from src.utils.services.embedding_cache import embedding_cache
+from src.utils.services.embedding_driver import embed_concurrently
+from src.utils.services.embedding_profiles import get_embedding_profile
 
-bedrock: AgentsforBedrockRuntimeClient = boto3.client('bedrock-runtime', region_name=OPEN_SEARCH_REGION) # pyright: ignore[reportUnknownVariableType, reportUnknownMemberType]
+# Active embedding profile (EMBEDDING_PROFILE): model, dimension and storage precision
+profile = get_embedding_profile()
+
+def embed_uncached(text: str) -> list[float]:
+    """One Titan call with the active profile, bypassing the cache"""
+    return invoke_embedding(text, model_id=profile.model_id, region_name=OPEN_SEARCH_REGION, **profile.request_options())
+
+def _embed_many(texts: list[str]) -> list[list[float]]:
+    return embed_concurrently(texts, embed_uncached)
 
 def generate_embedding(text: str) -> list[float]:
-    """Generate embedding using Bedrock Titan"""
-    response = bedrock.invoke_model( # type: ignore
-        modelId='amazon.titan-embed-text-v1',
-        body=json.dumps({"inputText": text})
-    )
-    result = json.loads(response['body'].read()) # type: ignore
-    return result['embedding']
+    """Generate embedding using Bedrock Titan (served from the embedding cache when seen before)"""
+    return embedding_cache.get_or_compute(profile.key, [text], _embed_many, profile.cache_encoding)[0]
+
+def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """Embeddings for many texts in input order: one cache lookup, misses embedded concurrently"""
+    return embedding_cache.get_or_compute(profile.key, texts, _embed_many, profile.cache_encoding)
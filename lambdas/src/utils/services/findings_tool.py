@@ -0,0 +1,95 @@
+# filePath: lambdas/src/utils/services/findings_tool.py
+"""
+Forced-tool schema for batch compliance findings.
+
+The analysis model reports findings by calling `record_findings`, so they
+arrive as the tool's already-parsed JSON input instead of free text. Keys are
+single letters to keep output tokens down; `expand_findings` maps them back
+to the finding dicts the analyzers work with. The page number is not asked
+for at all - it is looked up from the block the finding points at.
+"""
+from typing import Any, Iterable, Mapping
+
+FINDINGS_TOOL_NAME = "record_findings"
+
+# Compact key -> finding field
+_FIELDS = {
+    'b': 'block_index',
+    'c': 'control_id',
+    's': 'severity',
+    't': 'bookmark_type',
+    'd': 'issue_description',
+    'a': 'suggested_action',
+}
+
+SEVERITIES = ['high', 'medium', 'low']
+BOOKMARK_TYPES = ['action_required', 'verify', 'review', 'info']
+
+
+def findings_tool_spec(max_findings: int | None = None) -> dict[str, Any]:
+    """Converse API toolSpec for the findings array"""
+    findings_schema: dict[str, Any] = {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "b": {"type": "integer", "description": "block_idx of the offending block"},
+                "c": {"type": "string", "description": "Control ID, e.g. GDPR-12.1"},
+                "s": {"type": "string", "enum": SEVERITIES},
+                "t": {"type": "string", "enum": BOOKMARK_TYPES},
+                "d": {"type": "string", "description": "Specific issue, one or two sentences"},
+                "a": {"type": "string", "description": "Concrete fix, one sentence"},
+            },
+            "required": ["b", "c", "s", "t", "d", "a"]
+        }
+    }
+    if max_findings:
+        findings_schema["maxItems"] = max_findings
+
+    return {
+        "name": FINDINGS_TOOL_NAME,
+        "description": "Record the compliance findings for the given blocks. Call with an empty list if there are none.",
+        "inputSchema": {
+            "json": {
+                "type": "object",
+                "properties": {"f": findings_schema},
+                "required": ["f"]
+            }
+        }
+    }
+
+
+def expand_findings(tool_input: Mapping[str, Any] | None, blocks: Iterable[Any]) -> list[dict[str, Any]]:
+    """
+    Convert `record_findings` input into full finding dicts.
+
+    Findings that point at a block outside this batch are dropped.
+
+    Args:
+        tool_input: The toolUse input ({"f": [...]}), may be None or partial
+        blocks: Blocks of the batch (anything with block_index and page_number)
+
+    Returns:
+        Findings with page_number, block_index, control_id, severity,
+        bookmark_type, issue_description and suggested_action
+    """
+    pages = {block.block_index: block.page_number for block in blocks}
+    raw = (tool_input or {}).get('f') or []
+
+    findings: list[dict[str, Any]] = []
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        finding: dict[str, Any] = {
+            field: item[key] for key, field in _FIELDS.items() if key in item
+        }
+        try:
+            block_index = int(finding.get('block_index')) # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            continue
+        if block_index not in pages:
+            continue
+        finding['block_index'] = block_index
+        finding['page_number'] = pages[block_index]
+        findings.append(finding)
+    return findings
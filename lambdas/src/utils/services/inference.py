@@ -1,62 +1,184 @@
-import json
 from typing import Any
 from src.utils.services.llm import llm
+from src.utils.settings import ANALYSIS_NARRATIVE_ENABLED
+
+TOP_FINDINGS = 5
+TOP_MISSING_CONTROLS = 10
+MAX_NEXT_ACTIONS = 4
+NARRATIVE_MAX_CHARS = 800
+
+VERDICT_BADGES = {
+    'COMPLIANT': '✅ Compliant',
+    'PARTIAL': '⚠️ Partially Compliant',
+    'NON_COMPLIANT': '❌ Non-Compliant',
+}
+
+# Order in which findings and missing controls are surfaced
+STATUS_PRIORITY = {'NON_COMPLIANT': 0, 'PARTIAL': 1, 'UNCLEAR': 2, 'COMPLIANT': 3}
+SEVERITY_PRIORITY = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+NARRATIVE_PROMPT = """
+    Write one short paragraph (at most 4 sentences, plain text, no markdown, no lists)
+    summarising this compliance analysis for a business reader. Mention the overall
+    verdict and the most important gaps. Do not invent facts beyond the data below.
+
+    {digest}
+    """
+
+
+def _finding_rank(finding: dict[str, Any]) -> int:
+    statuses = [c.get('status', '') for c in finding.get('controls_addressed', [])]
+    return min((STATUS_PRIORITY.get(s, 2) for s in statuses), default=2)
 
-COMPREHENSIVE_FILE_ANALYSIS_PROMPT = """
-    You must analyze the compliance data and return a valid JSON response that strictly follows this schema:
-    {
-        "error_message": "string (empty if successful)",
-        "tool_payload": {
-            "document_id": "string",
-            "framework": "string (GDPR/SOC2/HIPAA)",
-            "overall_verdict": "string (Compliant/Non-Compliant)",
-            "findings": ["array of finding objects"],
-            "missing_controls": ["array of control objects"],
-            "statistics": {}
-        },
-        "summarised_markdown": "string (formatted markdown summary)",
-        "suggested_next_actions": [
-            {
-                "action": "string",
-                "description": "string"
-            }
-        ]
-    }
 
-    INPUT FORMAT:
-    You will receive analysis results with these fields:
-    - document_id: Document identifier
-    - framework: Compliance framework (GDPR/SOC2/HIPAA)
-    - overall_verdict: Compliant or Non-Compliant
-    - findings: List of compliance findings
-    - missing_controls: List of missing security controls
-    - statistics: Numerical statistics about the analysis
-
-    INSTRUCTIONS:
-    1. Copy the entire input result into the "tool_payload" field exactly as received
-    2. If processing fails, set "error_message" with a clear explanation and leave other fields empty/null
-    3. If successful, leave "error_message" as an empty string
-    4. Generate a concise, web-friendly markdown summary in "summarised_markdown" that includes:
-       - Overall verdict with visual indicators
-       - Key findings (top 3-5)
-       - Critical missing controls
-       - Summary statistics
-    5. Suggest 2-4 actionable next steps based on the findings
-    6. Ensure the output is valid, parsable JSON with no additional text
-    7. CRITICAL: Keep your entire response under 16,000 characters total. The tool_payload must be complete and unmodified, but keep summarised_markdown and suggested_next_actions concise to stay within the character limit.
-
-    Your response must contain ONLY the JSON object, nothing else.
+def top_findings(findings: list[dict[str, Any]], limit: int = TOP_FINDINGS) -> list[dict[str, Any]]:
+    """Most severe findings first (non-compliant, partial, unclear, compliant), stable otherwise"""
+    return sorted(findings, key=_finding_rank)[:limit]
+
+
+def critical_missing_controls(missing: list[dict[str, Any]], limit: int = TOP_MISSING_CONTROLS) -> list[dict[str, Any]]:
+    """Missing controls by severity, then control_id"""
+    return sorted(
+        missing,
+        key=lambda c: (SEVERITY_PRIORITY.get(str(c.get('severity', '')).lower(), 4), str(c.get('control_id', '')))
+    )[:limit]
+
+
+def render_summary_markdown(payload: dict[str, Any], narrative: str = '') -> str:
+    """
+    Deterministic markdown summary of a comprehensive analysis result.
+
+    Args:
+        payload: document_id, framework, overall_verdict, findings, missing_controls, statistics
+        narrative: Optional paragraph placed under the verdict
+
+    Returns:
+        Markdown with verdict, statistics, top findings and critical missing controls
     """
+    verdict = str(payload.get('overall_verdict', ''))
+    stats = payload.get('statistics', {})
+    findings = payload.get('findings', [])
+    missing = payload.get('missing_controls', [])
 
-def comprehensive_file_analysis(result: dict[str, Any]) -> dict[str, Any]:
+    lines = [
+        f"## {payload.get('framework', '')} Compliance Summary",
+        '',
+        f"**Overall verdict:** {VERDICT_BADGES.get(verdict, verdict or 'Unknown')}",
+    ]
+    if narrative:
+        lines += ['', narrative]
+
+    lines += [
+        '',
+        '### Statistics',
+        '',
+        '| Controls checked | Compliant | Partial | Non-compliant | Not addressed |',
+        '|---|---|---|---|---|',
+        f"| {stats.get('total_controls_checked', 0)} | {stats.get('compliant', 0)} | {stats.get('partial', 0)} "
+        f"| {stats.get('non_compliant', 0)} | {stats.get('not_addressed', 0)} |",
+    ]
+
+    if findings:
+        lines += ['', f"### Key Findings (top {min(len(findings), TOP_FINDINGS)} of {len(findings)})", '']
+        for finding in top_findings(findings):
+            controls = ', '.join(
+                f"{c.get('control_id', '?')} ({c.get('status', 'UNCLEAR')})"
+                for c in finding.get('controls_addressed', [])
+            ) or 'no controls'
+            summary = finding.get('summary') or finding.get('verdict') or str(finding.get('text_snippet', ''))[:160]
+            lines.append(f"- **{controls}**: {summary}")
+            for gap in finding.get('gaps', [])[:2]:
+                lines.append(f"  - Gap: {gap}")
+
+    if missing:
+        shown = critical_missing_controls(missing)
+        lines += ['', f"### Missing Controls ({len(missing)})", '']
+        for control in shown:
+            lines.append(f"- **{control.get('control_id', '?')}** [{control.get('severity', 'medium')}]: {control.get('control_name', '')}")
+        if len(missing) > len(shown):
+            lines.append(f"- …and {len(missing) - len(shown)} more")
+
+    return '\n'.join(lines)
+
+
+def suggest_next_actions(payload: dict[str, Any], limit: int = MAX_NEXT_ACTIONS) -> list[dict[str, str]]:
+    """Rule-based next steps from the statistics, missing controls and finding recommendations"""
+    stats = payload.get('statistics', {})
+    actions: list[dict[str, str]] = []
+
+    missing = critical_missing_controls(payload.get('missing_controls', []), limit=3)
+    if missing:
+        ids = ', '.join(str(c.get('control_id', '')) for c in missing)
+        actions.append({
+            'action': 'Address missing controls',
+            'description': f"Add policy language for {stats.get('not_addressed', len(missing))} unaddressed controls, starting with {ids}."
+        })
+    if stats.get('non_compliant'):
+        actions.append({
+            'action': 'Remediate non-compliant sections',
+            'description': f"Revise the text behind the {stats['non_compliant']} non-compliant controls listed in the key findings."
+        })
+    if stats.get('partial'):
+        actions.append({
+            'action': 'Strengthen partially compliant sections',
+            'description': f"Close the gaps noted for the {stats['partial']} partially compliant controls."
+        })
+
+    seen: set[str] = set()
+    for finding in top_findings(payload.get('findings', []), limit=len(payload.get('findings', []))):
+        for recommendation in finding.get('recommendations', []):
+            if len(actions) >= limit:
+                break
+            if recommendation and recommendation not in seen:
+                seen.add(recommendation)
+                actions.append({'action': 'Apply recommendation', 'description': str(recommendation)})
+
+    if not actions:
+        actions.append({
+            'action': 'Schedule a periodic review',
+            'description': 'Re-run the analysis when the document or the framework controls change.'
+        })
+    return actions[:limit]
+
+
+def _narrative_digest(payload: dict[str, Any]) -> str:
+    """Compact input for the narrative call: verdict, statistics and the top items only"""
+    lines = [
+        f"Framework: {payload.get('framework', '')}",
+        f"Verdict: {payload.get('overall_verdict', '')}",
+        f"Statistics: {payload.get('statistics', {})}",
+    ]
+    for finding in top_findings(payload.get('findings', []), limit=3):
+        lines.append(f"Finding: {finding.get('summary') or finding.get('verdict', '')}")
+    for control in critical_missing_controls(payload.get('missing_controls', []), limit=3):
+        lines.append(f"Missing: {control.get('control_id', '')} {control.get('control_name', '')}")
+    return '\n'.join(lines)
+
+
+def generate_narrative(payload: dict[str, Any]) -> str:
+    """Short LLM-written paragraph; empty on failure so the summary never depends on it"""
+    try:
+        text = llm.invoke(prompt=NARRATIVE_PROMPT.format(digest=_narrative_digest(payload)), max_tokens=300)
+    except Exception as e:
+        print(f"⚠️ Narrative generation failed: {e}")
+        return ''
+    return ' '.join(text.split())[:NARRATIVE_MAX_CHARS]
+
+
+def comprehensive_file_analysis(result: dict[str, Any], narrative: bool = ANALYSIS_NARRATIVE_ENABLED) -> dict[str, Any]:
     """
-    Use the LLM to process the comprehensive analysis result and obtain a structured inference.
-    
+    Build the structured inference for a comprehensive analysis result.
+
+    The payload is passed through unchanged and the markdown summary and next
+    actions are rendered locally; an LLM is only asked for an optional short
+    narrative paragraph.
+
     Args:
         result: The raw analysis result dictionary containing document_id, framework, overall_verdict, findings, missing_controls, and statistics.
+        narrative: Add an LLM-written paragraph to the summary
 
     Returns:
-        A JSON string containing the structured inference.
+        Dictionary with error_message, tool_payload, summarised_markdown and suggested_next_actions.
     """
     tool_payload = {
         "document_id": result.get("document_id", ""),
@@ -66,9 +188,10 @@ def comprehensive_file_analysis(result: dict[str, Any]) -> dict[str, Any]:
         "missing_controls": result.get("missing_controls", []),
         "statistics": result.get("statistics", {})
     }
-    
-    request_prompt = f"{COMPREHENSIVE_FILE_ANALYSIS_PROMPT}\n\nINPUT RESULT:\n{tool_payload}"
 
-    response = llm.invoke(prompt=request_prompt)
-    
-    return json.loads(response)
\ No newline at end of file
+    return {
+        "error_message": "",
+        "tool_payload": tool_payload,
+        "summarised_markdown": render_summary_markdown(tool_payload, generate_narrative(tool_payload) if narrative else ''),
+        "suggested_next_actions": suggest_next_actions(tool_payload)
+    }
@@ -1,25 +1,16 @@
 from src.utils.settings import OPEN_SEARCH_REGION, AGENT_CLAUDE_HAIKU as AGENT_NAME
-import boto3
-import json
-
-bedrock = boto3.client('bedrock-runtime', region_name=OPEN_SEARCH_REGION) # type: ignore
+from src.utils.services.bedrock_runtime import analysis_rate_limiter, invoke_claude
+from src.utils.services.rate_limiter import call_with_throttle_retry
 
 class LLM():
-    def invoke(self, prompt: str) -> str:
-        response = bedrock.invoke_model(  # type: ignore
-            modelId=AGENT_NAME,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4000,
-                "messages": [{"role": "user", "content": prompt}]
-            })
+    def invoke(self, prompt: str, max_tokens: int = 4000) -> str:
+        response = call_with_throttle_retry(
+            lambda p: invoke_claude(model_id=AGENT_NAME, prompt=p, max_tokens=max_tokens, region_name=OPEN_SEARCH_REGION),
+            prompt,
+            analysis_rate_limiter
         )
-        
-        result = json.loads(response['body'].read())  # type: ignore
-        content = result['content'][0]['text']
-        return content
+        return response.text
 
 
 # Create a default instance
 llm = LLM()
-
@@ -1,91 +1,110 @@
 # filePath: lambdas/src/utils/services/opensearch.py
+import threading
 from typing import Any
 import boto3
 from opensearchpy import OpenSearch, RequestsHttpConnection
 from requests_aws4auth import AWS4Auth  # type: ignore
+from src.utils.services.embedding_profiles import get_embedding_profile
+from src.utils.services.vector_store import get_embedded_store
 from src.utils.settings import (
     OPEN_SEARCH_ENV,
     OPEN_SEARCH_HOST,
     OPEN_SEARCH_REGION,
     OPEN_SEARCH_LOCAL_HOST,
-    OPEN_SEARCH_LOCAL_PORT
+    OPEN_SEARCH_LOCAL_PORT,
+    OPEN_SEARCH_POOL_MAXSIZE
 )
 
-def get_opensearch_client() -> OpenSearch:
-    """Get OpenSearch client with environment-based configuration"""
-    if OPEN_SEARCH_ENV == 'local':
+_clients: dict[str, OpenSearch] = {}
+_clients_lock = threading.Lock()
+
+
+def _aws_auth(service: str) -> AWS4Auth:
+    """SigV4 auth that re-reads credentials as they rotate (role sessions expire)"""
+    credentials = boto3.Session().get_credentials()
+    assert credentials is not None, "AWS credentials not found"
+    
+    # RefreshableCredentials renew themselves shortly before expiry; AWS4Auth
+    # takes a frozen copy per request instead of keeping the startup keys
+    return AWS4Auth(
+        refreshable_credentials=credentials,
+        region=OPEN_SEARCH_REGION,
+        service=service
+    )
+
+
+def build_opensearch_client(env: str = OPEN_SEARCH_ENV) -> OpenSearch:
+    """Build a new OpenSearch client for an environment (prefer get_opensearch_client)"""
+    if env == 'local':
         return OpenSearch(
             hosts=[{'host': OPEN_SEARCH_LOCAL_HOST, 'port': OPEN_SEARCH_LOCAL_PORT}],
             use_ssl=False,
-            verify_certs=False
+            verify_certs=False,
+            maxsize=OPEN_SEARCH_POOL_MAXSIZE
         )
     
     # AWS OpenSearch Service (managed)
-    if OPEN_SEARCH_ENV == 'aws':
-        service = 'es'
-        credentials = boto3.Session().get_credentials()
-        assert credentials is not None, "AWS credentials not found"
-        
-        awsauth = AWS4Auth(
-            credentials.access_key,
-            credentials.secret_key,
-            OPEN_SEARCH_REGION,
-            service,
-            session_token=credentials.token
-        )
-        
+    if env == 'aws':
         return OpenSearch(
             hosts=[{'host': OPEN_SEARCH_HOST, 'port': 443}],
-            http_auth=awsauth,
+            http_auth=_aws_auth('es'),
             use_ssl=True,
             verify_certs=True,
-            connection_class=RequestsHttpConnection
+            connection_class=RequestsHttpConnection,
+            pool_maxsize=OPEN_SEARCH_POOL_MAXSIZE
         )
     
     # AWS OpenSearch Serverless
-    service = 'aoss'
-    credentials = boto3.Session().get_credentials()
-    assert credentials is not None, "AWS credentials not found"
-    
-    awsauth = AWS4Auth(
-        credentials.access_key,
-        credentials.secret_key,
-        OPEN_SEARCH_REGION,
-        service,
-        session_token=credentials.token
-    )
-    
     return OpenSearch(
         hosts=[{'host': f'{OPEN_SEARCH_HOST}.{OPEN_SEARCH_REGION}.aoss.amazonaws.com', 'port': 443}],
-        http_auth=awsauth,
+        http_auth=_aws_auth('aoss'),
         use_ssl=True,
         verify_certs=True,
-        connection_class=RequestsHttpConnection
+        connection_class=RequestsHttpConnection,
+        pool_maxsize=OPEN_SEARCH_POOL_MAXSIZE
     )
 
+
+def get_opensearch_client(env: str = OPEN_SEARCH_ENV) -> OpenSearch:
+    """Get the shared OpenSearch client for an environment, built once per container"""
+    client = _clients.get(env)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(env)
+            if client is None:
+                client = build_opensearch_client(env)
+                _clients[env] = client
+    return client
+
 def search_controls(query_embedding: list[float], framework_id: str, k: int = 5) -> list[dict[str, Any]]:
-    """Search for relevant compliance controls using vector similarity"""
+    """
+    Search for relevant compliance controls using vector similarity.
+
+    The embedded store only holds vectors of the active embedding profile; a
+    framework without them returns no controls, as if it had no index.
+    """
+    if OPEN_SEARCH_ENV == 'embedded':
+        return get_embedded_store().search(query_embedding, framework_id, k)
+    
     opensearch = get_opensearch_client()
     
+    # Filter inside the knn clause: the engine searches only this framework's
+    # vectors (efficient filtering) instead of taking the global top-k and
+    # dropping other frameworks afterwards, which could return fewer than k
     search_body: dict[str, Any] = {
         "size": k,
+        "_source": {"excludes": ["embedding"]},
         "query": {
-            "bool": {
-                "must": [
-                    {
-                        "knn": {
-                            "embedding": {
-                                "vector": query_embedding,
-                                "k": k
-                            }
-                        }
-                    },
-                    {
+            "knn": {
+                "embedding": {
+                    "vector": get_embedding_profile().index_vector(query_embedding),
+                    "k": k,
+                    "filter": {
                         "term": {
                             "framework_id": framework_id
                         }
                     }
-                ]
+                }
             }
         }
     }
@@ -93,6 +112,31 @@ def search_controls(query_embedding: list[float], framework_id: str, k: int = 5)
     results = opensearch.search(index='compliance_controls', body=search_body)
     return [hit['_source'] for hit in results['hits']['hits']]
 
+def get_control_embeddings(framework_id: str, max_controls: int = 1000) -> dict[str, list[float]]:
+    """Fetch the stored embedding of every control in a framework (of the active profile when embedded)"""
+    if OPEN_SEARCH_ENV == 'embedded':
+        store = get_embedded_store()
+        start, end = store.ranges.get(framework_id, (0, 0))
+        return {
+            store.sources[row]['control_id']: store.matrix[row].astype('float32').tolist()
+            for row in range(start, end)
+        }
+    
+    opensearch = get_opensearch_client()
+    
+    search_body: dict[str, Any] = {
+        "size": max_controls,
+        "_source": ["control_id", "embedding"],
+        "query": {"term": {"framework_id": framework_id}}
+    }
+    
+    results = opensearch.search(index='compliance_controls', body=search_body)
+    return {
+        hit['_source']['control_id']: hit['_source']['embedding']
+        for hit in results['hits']['hits']
+        if hit['_source'].get('embedding')
+    }
+
 def index_document(index: str, document: dict[str, Any]) -> dict[str, Any]:
     """Index a document in OpenSearch"""
     opensearch = get_opensearch_client()
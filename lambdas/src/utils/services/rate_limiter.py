@@ -0,0 +1,87 @@
+# filePath: lambdas/src/utils/services/rate_limiter.py
+"""
+Adaptive request pacing shared by the threads of one container.
+
+Callers acquire() before each request; starts are spaced 1/rate apart no
+matter how many workers are waiting. A throttling response halves the rate
+(down to min_rate) and every success adds a little back, so a burst of
+workers settles just under the account's quota instead of hammering it.
+"""
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+from botocore.exceptions import ClientError
+
+S = TypeVar('S')
+T = TypeVar('T')
+
+THROTTLE_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+
+THROTTLING_ERROR_CODES = frozenset({
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceQuotaExceededException',
+})
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """True for AWS errors that mean 'slow down and retry'"""
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code', '') in THROTTLING_ERROR_CODES
+
+
+class AdaptiveRateLimiter:
+    """Requests-per-second pacing that backs off on throttling"""
+
+    def __init__(self, max_rate: float, min_rate: float = 1.0, recovery_step: float = 0.1):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.recovery_step = recovery_step
+        self.rate = max_rate
+        self._next_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until this caller may start a request"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1.0 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+
+def call_with_throttle_retry(
+    fn: Callable[[S], T],
+    item: S,
+    limiter: AdaptiveRateLimiter,
+    retries: int = THROTTLE_RETRIES
+) -> T:
+    """Run one request under the limiter, retrying throttling errors with backoff and jitter"""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            result = fn(item)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt == retries:
+                raise
+            limiter.on_throttle()
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS)
+            time.sleep(delay + random.uniform(0, delay / 2))
+            continue
+        limiter.on_success()
+        return result
+    raise AssertionError('unreachable')
@@ -0,0 +1,68 @@
+# filePath: lambdas/src/utils/services/similarity.py
+"""
+Vectorized cosine similarity and top-k selection.
+
+Rows are L2-normalized once, every query is scored against every candidate
+with a single float32 matrix product, and each row's top k is picked with
+argpartition (O(n)) before only those k are sorted. Shared by
+find_relevant_chunks, the control index and the embedded vector store.
+"""
+from typing import Any, Sequence
+
+import numpy as np
+
+
+def normalize_rows(vectors: Sequence[Sequence[float]] | Sequence[Any] | np.ndarray) -> np.ndarray:
+    """
+    Row-normalized float32 copy of `vectors`, shape (n, dim).
+
+    Zero rows stay zero, so they score 0 against everything (like
+    document_extractor.cosine_similarity).
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores of a 1-D array, highest first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def top_k_matches(
+    queries: Sequence[Sequence[float]] | Sequence[Any] | np.ndarray,
+    candidates: Sequence[Sequence[float]] | Sequence[Any] | np.ndarray,
+    k: int,
+    threshold: float | None = None
+) -> list[list[tuple[int, float]]]:
+    """
+    The k candidates most similar to each query.
+
+    Args:
+        queries: Query vectors, shape (m, dim)
+        candidates: Candidate vectors, shape (n, dim)
+        k: Matches to keep per query
+        threshold: Drop matches whose similarity is not above this value
+
+    Returns:
+        Per query, (candidate index, cosine similarity) pairs, most similar first
+    """
+    if len(queries) == 0:
+        return []
+    if len(candidates) == 0:
+        return [[] for _ in range(len(queries))]
+
+    scores = normalize_rows(queries) @ normalize_rows(candidates).T
+
+    matches: list[list[tuple[int, float]]] = []
+    for row in scores:
+        top = top_k_indices(row, k)
+        if threshold is not None:
+            top = top[row[top] > threshold]
+        matches.append([(int(i), float(row[i])) for i in top])
+    return matches
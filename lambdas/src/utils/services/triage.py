@@ -0,0 +1,104 @@
+# filePath: lambdas/src/utils/services/triage.py
+"""
+First tier of the batch-analysis model cascade.
+
+The triage model sees a short excerpt of every candidate block and answers
+with nothing but the indices of blocks worth a full review, so its output
+stays a few dozen tokens regardless of document size. Blocks it does not
+flag never reach the expensive analysis prompt.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Sequence
+
+from src.utils.services.bedrock_runtime import analysis_rate_limiter, invoke_claude
+from src.utils.services.rate_limiter import call_with_throttle_retry
+from src.utils.settings import ANALYSIS_TRIAGE_MODEL
+
+TRIAGE_BLOCKS_PER_CALL = 60
+TRIAGE_EXCERPT_CHARS = 300
+TRIAGE_MAX_TOKENS = 400
+TRIAGE_MAX_WORKERS = 2
+
+
+def create_triage_prompt(blocks: Sequence[Any], framework: str) -> str:
+    """Build the compact triage prompt for a slice of blocks"""
+    lines: list[str] = []
+    for block in blocks:
+        text = block.text[:TRIAGE_EXCERPT_CHARS].replace('\n', ' ')
+        marker = ' (header)' if block.is_header else ''
+        lines.append(f"[{block.block_index}]{marker} {text}")
+
+    return f"""You are screening a policy document for a {framework} compliance review.
+        Below are numbered text blocks. Flag ONLY blocks that likely contain a compliance
+        issue: a missing or vague obligation, an unspecified period or method, a conflict,
+        or a statement that falls short of {framework}. Ignore purely descriptive text
+        such as addresses, contact lists, company history or navigation.
+
+        BLOCKS:
+        {chr(10).join(lines)}
+
+        Return ONLY a JSON array of the flagged block numbers, e.g. [3, 7, 12].
+        Return [] if none are worth reviewing."""
+
+
+def parse_triage_response(content: str, valid_indices: set[int]) -> set[int]:
+    """Parse the flagged block indices, ignoring anything outside this slice"""
+    start = content.find('[')
+    end = content.rfind(']')
+    if start == -1 or end == -1:
+        raise ValueError(f"No JSON array in triage response: {content[:200]}")
+
+    parsed = json.loads(content[start:end + 1])
+    return {
+        int(idx) for idx in parsed
+        if isinstance(idx, (int, str)) and str(idx).isdigit() and int(idx) in valid_indices
+    }
+
+
+def _triage_slice(blocks: Sequence[Any], framework: str) -> set[int]:
+    """Triage one slice of blocks; fail open so no block is silently skipped"""
+    valid_indices = {block.block_index for block in blocks}
+    try:
+        response = call_with_throttle_retry(
+            lambda prompt: invoke_claude(
+                model_id=ANALYSIS_TRIAGE_MODEL,
+                prompt=prompt,
+                max_tokens=TRIAGE_MAX_TOKENS,
+                temperature=0.0
+            ),
+            create_triage_prompt(blocks, framework),
+            analysis_rate_limiter
+        )
+        return parse_triage_response(response.text, valid_indices)
+    except Exception as e:
+        print(f"  ⚠ Triage failed for {len(blocks)} blocks, escalating all: {e}")
+        return valid_indices
+
+
+def triage_blocks(blocks: Sequence[Any], framework: str) -> set[int]:
+    """
+    Flag the blocks that should go on to full analysis.
+
+    Args:
+        blocks: Candidate blocks (anything with block_index, text and is_header)
+        framework: Compliance framework (GDPR, SOC2, HIPAA)
+
+    Returns:
+        Set of flagged block indices
+    """
+    if not blocks:
+        return set()
+
+    slices = [
+        blocks[i:i + TRIAGE_BLOCKS_PER_CALL]
+        for i in range(0, len(blocks), TRIAGE_BLOCKS_PER_CALL)
+    ]
+
+    flagged: set[int] = set()
+    with ThreadPoolExecutor(max_workers=TRIAGE_MAX_WORKERS) as executor:
+        for result in executor.map(lambda s: _triage_slice(s, framework), slices):
+            flagged |= result
+
+    print(f"🚦 Triage flagged {len(flagged)}/{len(blocks)} blocks ({len(slices)} calls)")
+    return flagged
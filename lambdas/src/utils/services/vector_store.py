@@ -0,0 +1,136 @@
+# filePath: lambdas/src/utils/services/vector_store.py
+"""
+Embedded control vector store - the OPEN_SEARCH_ENV=embedded backend.
+
+The whole control corpus is a few hundred vectors, so instead of a cluster
+round trip the vectors live in one contiguous, row-normalized matrix
+(float32, or float16/int8 to cut memory 2-4x) with a row range per framework_id.
+A search is a matrix-vector product over the framework's rows plus an
+argpartition top-k.
+
+The store loads from the controls snapshot artifact
+(pre/build_controls_snapshot.py --embeddings), once per container.
+"""
+import threading
+from typing import Any
+
+import numpy as np
+
+from src.utils.services.controls_snapshot import ControlsSnapshot, load_snapshot
+from src.utils.services.embedding_profiles import VectorDtype, get_embedding_profile, quantize_rows
+from src.utils.services.similarity import normalize_rows, top_k_indices
+from src.utils.settings import VECTOR_STORE_DTYPE, VECTOR_STORE_PATH
+
+# Fields returned per hit, matching the compliance_controls index _source
+SOURCE_FIELDS = ('framework_id', 'control_id', 'requirement', 'keywords', 'category', 'severity')
+
+
+class EmbeddedVectorStore:
+    """Contiguous control embedding matrix with per-framework row ranges"""
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        sources: list[dict[str, Any]],
+        ranges: dict[str, tuple[int, int]]
+    ):
+        self.matrix = matrix
+        self.sources = sources
+        self.ranges = ranges
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: ControlsSnapshot,
+        embedding_model: str,
+        dtype: VectorDtype = 'float32'
+    ) -> 'EmbeddedVectorStore':
+        """
+        Build the store from a snapshot's embeddings of one embedding profile.
+
+        Queries are embedded with that profile, so vectors of another model (or
+        dimension) would rank controls by meaningless scores. Frameworks whose
+        embeddings are from another model are left out and search like a
+        framework without an index.
+
+        Args:
+            snapshot: Loaded controls snapshot
+            embedding_model: Key of the active embedding profile
+            dtype: Row storage type
+
+        Raises:
+            ValueError: If no framework has embeddings of embedding_model
+        """
+        blocks: list[np.ndarray] = []
+        sources: list[dict[str, Any]] = []
+        ranges: dict[str, tuple[int, int]] = {}
+        for framework_id, fw in snapshot.frameworks.items():
+            if fw.embeddings is not None and fw.embedding_model != embedding_model:
+                print(f"⚠️ Snapshot embeddings of {framework_id} are from {fw.embedding_model or 'an unknown model'}, "
+                      f"not {embedding_model}; leaving it out of the vector store")
+        dims = {
+            fw.embedding_dim for fw in snapshot.frameworks.values()
+            if fw.embeddings is not None and fw.embedding_model == embedding_model
+        }
+        if not dims:
+            raise ValueError(
+                f"Snapshot has no embeddings of {embedding_model}; "
+                "rebuild it with pre/build_controls_snapshot.py --embeddings"
+            )
+        if len(dims) != 1:
+            raise ValueError(f"Snapshot needs embeddings of a single dimension, found {sorted(dims)}")
+
+        for framework_id, fw in snapshot.frameworks.items():
+            if fw.embeddings is None or fw.embedding_model != embedding_model:
+                continue
+            by_id = {c['control_id']: c for c in fw.controls}
+            start = len(sources)
+            blocks.append(np.frombuffer(fw.embeddings, dtype=np.float32).reshape(-1, fw.embedding_dim))
+            for control_id in fw.embedding_ids:
+                control = by_id.get(control_id, {'framework_id': framework_id, 'control_id': control_id})
+                sources.append({field: control.get(field) for field in SOURCE_FIELDS})
+            ranges[framework_id] = (start, len(sources))
+
+        matrix = quantize_rows(normalize_rows(np.concatenate(blocks)), dtype)
+        return cls(matrix, sources, ranges)
+
+    def search(self, query_embedding: list[float], framework_id: str, k: int = 5) -> list[dict[str, Any]]:
+        """Top-k controls of one framework by cosine similarity"""
+        start, end = self.ranges.get(framework_id, (0, 0))
+        k = min(k, end - start)
+        if k <= 0:
+            return []
+
+        query = normalize_rows(query_embedding)[0]
+        rows = self.matrix[start:end]
+        # NumPy has no BLAS path for float16/int8; upcasting the slice is far faster.
+        # int8 rows carry a constant x127 scale, which does not change the ranking
+        if rows.dtype != np.float32:
+            rows = rows.astype(np.float32)
+        scores = rows @ query
+
+        return [self.sources[start + int(i)] for i in top_k_indices(scores, k)]
+
+
+_store: EmbeddedVectorStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_embedded_store() -> EmbeddedVectorStore:
+    """Load the store from VECTOR_STORE_PATH once per container, for the active embedding profile"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                snapshot = load_snapshot(VECTOR_STORE_PATH)
+                if snapshot is None:
+                    raise FileNotFoundError(
+                        f"No controls snapshot at {VECTOR_STORE_PATH}; "
+                        "run pre/build_controls_snapshot.py --embeddings"
+                    )
+                _store = EmbeddedVectorStore.from_snapshot(
+                    snapshot, get_embedding_profile().key, VECTOR_STORE_DTYPE  # type: ignore[arg-type]
+                )
+                print(f"🧭 Embedded vector store: {_store.matrix.shape[0]} vectors "
+                      f"({_store.matrix.dtype}, {_store.matrix.nbytes / 1024:.0f} KB)")
+    return _store
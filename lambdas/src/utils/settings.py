@@ -22,6 +22,64 @@ AGENT_CLAUDE_SONNET = "anthropic.claude-3-5-sonnet-20240620-v1:0"
 AGENT_CLAUDE_HAIKU_4_5="us.anthropic.claude-haiku-4-5-20251001-v1:0"
 AGENT_CLAUDE_SONNET_4_5 = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
 
+# Batch analysis model cascade
+# A cheap triage pass flags blocks that likely contain issues; only flagged
+# blocks reach the full-analysis prompt. Leave the escalation model empty to
+# keep each analyzer's default model, or point it at Sonnet for deeper review.
+# Off by default: triage misses are findings the full analysis never sees, so
+# turn it on only once its recall is acceptable for the deployment.
+ANALYSIS_CASCADE_ENABLED = os.environ.get('ANALYSIS_CASCADE_ENABLED', 'false').lower() == 'true'
+ANALYSIS_TRIAGE_MODEL = os.environ.get('ANALYSIS_TRIAGE_MODEL', AGENT_CLAUDE_HAIKU)
+ANALYSIS_ESCALATION_MODEL = os.environ.get('ANALYSIS_ESCALATION_MODEL', '')
+
+# Shared bedrock-runtime client pool. Sized for the widest fan-out in one
+# container: parallel analysis batches plus triage workers plus embeddings.
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', '16'))
+
+# Compliance controls: framework_id partition keys are "<framework>_<version>",
+# e.g. gdpr_2025. Loaded controls are cached in-process for the TTL.
+CONTROLS_VERSION = os.environ.get('CONTROLS_VERSION', '2025')
+CONTROLS_CACHE_TTL_SECONDS = int(os.environ.get('CONTROLS_CACHE_TTL_SECONDS', '900'))
+# Compiled snapshot bundled with the package (built by pre/build_controls_snapshot.py)
+CONTROLS_SNAPSHOT_PATH = os.environ.get(
+    'CONTROLS_SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'controls_snapshot.bin')
+)
+
+# OpenSearch / control vector search
+# OPEN_SEARCH_ENV: local | aws | serverless | embedded (in-process store loaded
+# from the controls snapshot built with --embeddings; no cluster needed)
+OPEN_SEARCH_ENV = os.environ.get('OPEN_SEARCH_ENV', 'local')
+OPEN_SEARCH_HOST = os.environ.get('OPEN_SEARCH_HOST', 'localhost')
+OPEN_SEARCH_REGION = os.environ.get('OPEN_SEARCH_REGION', AWS_REGION)
+OPEN_SEARCH_LOCAL_HOST = os.environ.get('OPEN_SEARCH_LOCAL_HOST', 'localhost')
+OPEN_SEARCH_LOCAL_PORT = int(os.environ.get('OPEN_SEARCH_LOCAL_PORT', '9200'))
+# HTTP connections kept alive per OpenSearch host by the shared client
+OPEN_SEARCH_POOL_MAXSIZE = int(os.environ.get('OPEN_SEARCH_POOL_MAXSIZE', '10'))
+# Embedded store: artifact path and in-memory precision (float32 | float16 | int8)
+VECTOR_STORE_PATH = os.environ.get('VECTOR_STORE_PATH', CONTROLS_SNAPSHOT_PATH)
+VECTOR_STORE_DTYPE = os.environ.get('VECTOR_STORE_DTYPE', 'float32')
+
+# Embedding model, output dimension and storage precision
+# (see src/utils/services/embedding_profiles.py for the available profiles)
+EMBEDDING_PROFILE = os.environ.get('EMBEDDING_PROFILE', 'titan-v1')
+# Embedding cache: in-process LRU entries, DynamoDB tier on/off and entry lifetime
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '4096'))
+EMBEDDING_CACHE_PERSISTENT = os.environ.get('EMBEDDING_CACHE_PERSISTENT', 'true').lower() == 'true'
+EMBEDDING_CACHE_TTL_DAYS = int(os.environ.get('EMBEDDING_CACHE_TTL_DAYS', '90'))
+# Concurrent embedding: parallel requests and request starts per second (shared per container)
+EMBEDDING_MAX_WORKERS = int(os.environ.get('EMBEDDING_MAX_WORKERS', '8'))
+EMBEDDING_MAX_RPS = float(os.environ.get('EMBEDDING_MAX_RPS', '20'))
+# Comprehensive check: concurrent per-category analysis calls and their start rate
+ANALYSIS_MAX_WORKERS = int(os.environ.get('ANALYSIS_MAX_WORKERS', '6'))
+ANALYSIS_MAX_RPS = float(os.environ.get('ANALYSIS_MAX_RPS', '4'))
+# Add a short LLM-written narrative to the locally rendered analysis summary
+ANALYSIS_NARRATIVE_ENABLED = os.environ.get('ANALYSIS_NARRATIVE_ENABLED', 'false').lower() == 'true'
+# Scan the Annotations table when its indexes return nothing for a document.
+# Off by default: publish_to_s3.sh runs pre/backfill_annotations.py, which
+# indexes older items; only enable it while that backfill has not run yet
+ANNOTATIONS_LEGACY_SCAN = os.environ.get('ANNOTATIONS_LEGACY_SCAN', 'false').lower() == 'true'
+
 # S3
 S3_BUCKET_NAME = os.environ['S3_BUCKET_NAME']
 
@@ -35,6 +93,31 @@ __all__ = [
     'AGENT_CLAUDE_SONNET',
     'AGENT_CLAUDE_HAIKU_4_5',
     'AGENT_CLAUDE_SONNET_4_5',
+    'ANALYSIS_CASCADE_ENABLED',
+    'ANALYSIS_TRIAGE_MODEL',
+    'ANALYSIS_ESCALATION_MODEL',
+    'BEDROCK_MAX_POOL_CONNECTIONS',
+    'CONTROLS_VERSION',
+    'CONTROLS_CACHE_TTL_SECONDS',
+    'CONTROLS_SNAPSHOT_PATH',
+    'OPEN_SEARCH_ENV',
+    'OPEN_SEARCH_HOST',
+    'OPEN_SEARCH_REGION',
+    'OPEN_SEARCH_LOCAL_HOST',
+    'OPEN_SEARCH_LOCAL_PORT',
+    'OPEN_SEARCH_POOL_MAXSIZE',
+    'VECTOR_STORE_PATH',
+    'VECTOR_STORE_DTYPE',
+    'EMBEDDING_PROFILE',
+    'EMBEDDING_CACHE_SIZE',
+    'EMBEDDING_CACHE_PERSISTENT',
+    'EMBEDDING_CACHE_TTL_DAYS',
+    'EMBEDDING_MAX_WORKERS',
+    'EMBEDDING_MAX_RPS',
+    'ANALYSIS_MAX_WORKERS',
+    'ANALYSIS_MAX_RPS',
+    'ANALYSIS_NARRATIVE_ENABLED',
+    'ANNOTATIONS_LEGACY_SCAN',
     'S3_BUCKET_NAME',
 ]
 
@@ -0,0 +1,16 @@
+# filePath: lambdas/tests/conftest.py
+"""
+Settings read these at import; tests never reach AWS, so any value will do.
+Real values from the environment (or .env) take precedence.
+"""
+import os
+
+for name, value in {
+    'ENV_AWS_REGION': 'us-east-1',
+    'ENV_AWS_PROFILE': 'test',
+    'COGNITO_USER_POOL_ID': 'us-east-1_test',
+    'COGNITO_CLIENT_ID': 'test',
+    'S3_BUCKET_NAME': 'test-bucket',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+}.items():
+    os.environ.setdefault(name, value)
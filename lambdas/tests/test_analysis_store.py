@@ -0,0 +1,101 @@
+# filePath: lambdas/tests/test_analysis_store.py
+# Run from lambdas/: python -m pytest tests/test_analysis_store.py
+import unittest
+from typing import Any
+from unittest import mock
+
+from src.utils.services import analysis_store as store_module
+from src.utils.services.analysis_store import AnalysisStore, analysis_key, remap_file_ids
+
+
+class FakeResultsTable:
+    """In-memory PolicyMateAnalysisResults keyed by analysis_key"""
+
+    def __init__(self):
+        self.items: dict[str, dict[str, Any]] = {}
+        self.get_calls = 0
+
+    def put_item(self, Item: dict[str, Any]) -> None:
+        self.items[Item['analysis_key']] = Item
+
+    def get_item(self, Key: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
+        self.get_calls += 1
+        item = self.items.get(Key['analysis_key'])
+        return {'Item': item} if item else {}
+
+
+class AnalysisKeyTest(unittest.TestCase):
+    def test_framework_case_does_not_matter(self):
+        self.assertEqual(analysis_key('h', 'gdpr', 'm', 'v1'), analysis_key('h', 'GDPR', 'm', 'v1'))
+
+    def test_every_part_changes_the_key(self):
+        base = analysis_key('h', 'GDPR', 'm', 'v1', controls_version='2025')
+        variants = [
+            analysis_key('h2', 'GDPR', 'm', 'v1', controls_version='2025'),
+            analysis_key('h', 'SOC2', 'm', 'v1', controls_version='2025'),
+            analysis_key('h', 'GDPR', 'm2', 'v1', controls_version='2025'),
+            analysis_key('h', 'GDPR', 'm', 'v2', controls_version='2025'),
+            analysis_key('h', 'GDPR', 'm', 'v1', controls_version='2026'),
+        ]
+        self.assertNotIn(base, variants)
+        self.assertEqual(len(set(variants)), len(variants))
+
+
+class RemapFileIdsTest(unittest.TestCase):
+    def test_ids_are_pointed_at_the_new_file(self):
+        stored = {
+            'document_id': 'old-doc',
+            'analysis_id': 'old-analysis',
+            'annotations': [
+                {'annotation_id': 'a1', 'file_id': 'old-doc', 'analysis_id': 'old-analysis', 'page_number': 3},
+                {'annotation_id': 'a2', 'file_id': 'old-doc', 'review_comments': 'old-doc is vague'},
+            ],
+        }
+
+        remapped = remap_file_ids(stored, 'new-doc', 'new-analysis')
+        self.assertEqual(remapped['document_id'], 'new-doc')
+        self.assertEqual(remapped['analysis_id'], 'new-analysis')
+        first, second = remapped['annotations']
+        self.assertEqual((first['file_id'], first['analysis_id'], first['page_number']), ('new-doc', 'new-analysis', 3))
+        self.assertEqual(second['review_comments'], 'old-doc is vague')
+        self.assertNotIn(first['annotation_id'], ('a1', 'a2'))
+        self.assertNotEqual(first['annotation_id'], second['annotation_id'])
+        self.assertEqual(stored['annotations'][0]['annotation_id'], 'a1')
+
+    def test_analysis_id_kept_when_not_given(self):
+        self.assertEqual(remap_file_ids({'analysis_id': 'x'}, 'doc')['analysis_id'], 'x')
+
+
+class AnalysisStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.table = FakeResultsTable()
+        patch = mock.patch.object(store_module, 'get_table', return_value=self.table)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.store = AnalysisStore()
+
+    def test_same_bytes_are_served_to_another_file(self):
+        result = {'document_id': 'doc-1', 'annotations': [{'annotation_id': 'a1', 'file_id': 'doc-1'}]}
+        self.assertTrue(self.store.put('hash', 'gdpr', 'model', 'v1', 'doc-1', result))
+
+        served = self.store.get('hash', 'GDPR', 'model', 'v1', 'doc-2', 'analysis-2')
+        assert served is not None
+        self.assertEqual(served['document_id'], 'doc-2')
+        self.assertEqual(served['annotations'][0]['file_id'], 'doc-2')
+
+    def test_other_analyzer_version_misses(self):
+        self.store.put('hash', 'GDPR', 'model', 'v1', 'doc-1', {'document_id': 'doc-1'})
+        self.assertIsNone(self.store.get('hash', 'GDPR', 'model', 'v2', 'doc-2'))
+
+    def test_without_file_hash_nothing_is_read_or_written(self):
+        self.assertFalse(self.store.put('', 'GDPR', 'model', 'v1', 'doc-1', {}))
+        self.assertIsNone(self.store.get('', 'GDPR', 'model', 'v1', 'doc-1'))
+        self.assertEqual((self.table.items, self.table.get_calls), ({}, 0))
+
+    def test_table_errors_are_a_miss(self):
+        self.table.get_item = mock.Mock(side_effect=RuntimeError('unavailable'))
+        self.assertIsNone(self.store.get('hash', 'GDPR', 'model', 'v1', 'doc-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+# filePath: lambdas/tests/test_annotations.py
+# Run from lambdas/: python -m pytest tests/test_annotations.py
+import unittest
+from typing import Any
+from unittest import mock
+
+from src.utils.services import annotations as annotations_module
+from src.utils.services.annotations import (
+    DOCUMENT_ANNOTATIONS_INDEX,
+    FILE_ANNOTATIONS_INDEX,
+    find_existing_annotations,
+    query_annotations,
+    save_annotations_to_dynamodb,
+)
+
+
+class FakeAnnotation:
+    """Stands in for SimpleAnnotation"""
+
+    def __init__(self, annotation_id: str, page_number: int, x: int = 10, resolved: bool = False, comment: str = ''):
+        self.fields = {
+            'annotation_id': annotation_id, 'file_id': 'doc-1', 'page_number': page_number,
+            'x': x, 'y': 20, 'width': 100, 'height': 30,
+            'bookmark_type': 'action_required', 'review_comments': comment, 'resolved': resolved,
+        }
+
+    def model_dump(self) -> dict[str, Any]:
+        return dict(self.fields)
+
+
+class _BatchWriter:
+    def __init__(self, table: 'FakeAnnotationsTable'):
+        self.table = table
+
+    def __enter__(self) -> '_BatchWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.table.batch_writes += 1
+
+    def put_item(self, Item: dict[str, Any]) -> None:
+        self.table.items[Item['annotation_id']] = Item
+
+
+class FakeAnnotationsTable:
+    """
+    Annotations table with its two GSIs. Index queries return PAGE_SIZE items
+    (or Limit) per page; like DynamoDB, Limit counts items before the filter.
+    """
+    PAGE_SIZE = 2
+
+    def __init__(self, items: list[dict[str, Any]] | None = None):
+        self.items = {item['annotation_id']: item for item in items or []}
+        self.queries: list[dict[str, Any]] = []
+        self.scans = 0
+        self.batch_writes = 0
+
+    def batch_writer(self, overwrite_by_pkeys: list[str] | None = None) -> _BatchWriter:
+        return _BatchWriter(self)
+
+    def query(self, **kwargs: Any) -> dict[str, Any]:
+        self.queries.append(kwargs)
+        values = kwargs['ExpressionAttributeValues']
+        if kwargs['IndexName'] == FILE_ANNOTATIONS_INDEX:
+            matches = [i for i in self.items.values() if i.get('file_id') == values[':doc_id']]
+        else:
+            matches = [i for i in self.items.values()
+                       if i.get('document_id') == values[':doc_id'] and 'status_framework' in i]
+            if ':status' in values:
+                if 'begins_with' in kwargs['KeyConditionExpression']:
+                    matches = [i for i in matches if i['status_framework'].startswith(values[':status'])]
+                else:
+                    matches = [i for i in matches if i['status_framework'] == values[':status']]
+        matches.sort(key=lambda i: (i.get('status_framework', ''), i['annotation_id']))
+
+        start = kwargs.get('ExclusiveStartKey', {}).get('offset', 0)
+        size = kwargs.get('Limit', self.PAGE_SIZE)
+        page = matches[start:start + size]
+        if ':fw_id' in values:
+            page = [i for i in page if i.get('framework_id') == values[':fw_id']]
+        response: dict[str, Any] = {'Items': page}
+        if start + size < len(matches):
+            response['LastEvaluatedKey'] = {'offset': start + size}
+        return response
+
+    def scan(self, **kwargs: Any) -> dict[str, Any]:
+        self.scans += 1
+        doc_id = kwargs['ExpressionAttributeValues'][':doc_id']
+        return {'Items': [i for i in self.items.values() if i.get('document_id') == doc_id]}
+
+
+def _stored(annotation_id: str, resolved: bool = False, framework_id: str = 'GDPR') -> dict[str, Any]:
+    return {
+        'annotation_id': annotation_id, 'document_id': 'doc-1', 'file_id': 'doc-1',
+        'framework_id': framework_id, 'resolved': resolved,
+        'status_framework': f"{'resolved' if resolved else 'open'}#{framework_id}",
+    }
+
+
+class AnnotationsTestCase(unittest.TestCase):
+    def use_table(self, table: FakeAnnotationsTable) -> FakeAnnotationsTable:
+        patch = mock.patch.object(annotations_module, 'get_table', return_value=table)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return table
+
+
+class SaveAnnotationsTest(AnnotationsTestCase):
+    def test_second_save_updates_in_place(self):
+        table = self.use_table(FakeAnnotationsTable())
+        first = save_annotations_to_dynamodb(
+            [FakeAnnotation(f'new-{p}', p) for p in range(1, 6)], 'doc-1', 'GDPR', 'analysis-1'
+        )
+        self.assertEqual((first['created'], first['updated']), (5, 0))
+        created_at = {i['annotation_id']: i['created_at'] for i in table.items.values()}
+
+        second = save_annotations_to_dynamodb(
+            [FakeAnnotation(f'again-{p}', p, comment='revised') for p in range(1, 6)] + [FakeAnnotation('new-6', 6)],
+            'doc-1', 'GDPR', 'analysis-2'
+        )
+        self.assertEqual((second['created'], second['updated']), (1, 5))
+        self.assertEqual(len(table.items), 6)
+        for annotation_id, created in created_at.items():
+            item = table.items[annotation_id]
+            self.assertEqual((item['created_at'], item['review_comments']), (created, 'revised'))
+        self.assertEqual(table.items['new-1']['status_framework'], 'open#GDPR')
+        self.assertEqual(table.items['new-1']['file_id'], 'doc-1')
+        self.assertEqual(table.batch_writes, 2)
+        # Existing hashes were read page by page from the file index, never scanned
+        self.assertEqual({q['IndexName'] for q in table.queries}, {FILE_ANNOTATIONS_INDEX})
+        self.assertEqual(table.scans, 0)
+
+    def test_same_location_twice_is_written_once(self):
+        table = self.use_table(FakeAnnotationsTable())
+        stats = save_annotations_to_dynamodb(
+            [FakeAnnotation('a', 1, comment='first'), FakeAnnotation('b', 1, comment='second')],
+            'doc-1', 'GDPR', 'analysis-1'
+        )
+        self.assertEqual((stats['created'], stats['total']), (1, 2))
+        self.assertEqual([i['review_comments'] for i in table.items.values()], ['second'])
+
+    def test_find_existing_follows_pages(self):
+        table = FakeAnnotationsTable([{**_stored(f'a{i}'), 'annotation_hash': f'h{i}'} for i in range(5)])
+        existing = find_existing_annotations(table, 'doc-1')
+        self.assertEqual(sorted(existing), [f'h{i}' for i in range(5)])
+        self.assertEqual(len(table.queries), 3)
+
+
+class QueryAnnotationsTest(AnnotationsTestCase):
+    def setUp(self):
+        self.table = self.use_table(FakeAnnotationsTable([
+            _stored('a1'), _stored('a2'), _stored('a3', framework_id='SOC2'),
+            _stored('a4', resolved=True), _stored('a5', resolved=True, framework_id='SOC2'),
+        ]))
+
+    def test_open_annotations_by_key_condition(self):
+        page = query_annotations('doc-1', limit=10)
+        self.assertEqual([a['annotation_id'] for a in page['annotations']], ['a1', 'a2', 'a3'])
+        self.assertEqual(self.table.queries[0]['ExpressionAttributeValues'][':status'], 'open#')
+        self.assertNotIn('FilterExpression', self.table.queries[0])
+
+        page = query_annotations('doc-1', framework_id='SOC2', limit=10)
+        self.assertEqual([a['annotation_id'] for a in page['annotations']], ['a3'])
+
+    def test_pages_chain_through_next_page_token(self):
+        seen: list[str] = []
+        token = None
+        while True:
+            page = query_annotations('doc-1', include_resolved=True, limit=2, last_key=token)
+            seen.extend(a['annotation_id'] for a in page['annotations'])
+            if not page['has_more']:
+                break
+            token = page['next_page_token']
+        self.assertEqual(sorted(seen), ['a1', 'a2', 'a3', 'a4', 'a5'])
+        self.assertEqual(len(self.table.queries), 3)
+        self.assertEqual(self.table.queries[0]['Limit'], 2)
+        self.assertEqual(self.table.queries[0]['IndexName'], DOCUMENT_ANNOTATIONS_INDEX)
+
+    def test_resolved_with_framework_uses_filter(self):
+        page = query_annotations('doc-1', framework_id='GDPR', include_resolved=True, limit=10)
+        self.assertEqual(sorted(a['annotation_id'] for a in page['annotations']), ['a1', 'a2', 'a4'])
+        self.assertEqual(self.table.queries[0]['FilterExpression'], 'framework_id = :fw_id')
+
+
+class LegacyScanTest(AnnotationsTestCase):
+    def setUp(self):
+        legacy = {'annotation_id': 'old', 'document_id': 'doc-1', 'framework_id': 'GDPR',
+                  'resolved': False, 'annotation_hash': 'h-old', 'created_at': 't0'}
+        self.table = self.use_table(FakeAnnotationsTable([legacy]))
+
+    def test_unindexed_items_are_not_scanned_by_default(self):
+        self.assertEqual(query_annotations('doc-1')['annotations'], [])
+        self.assertEqual(find_existing_annotations(self.table, 'doc-1'), {})
+        self.assertEqual(self.table.scans, 0)
+
+    def test_scan_fallback_when_enabled(self):
+        with mock.patch.object(annotations_module, 'ANNOTATIONS_LEGACY_SCAN', True):
+            page = query_annotations('doc-1')
+            existing = find_existing_annotations(self.table, 'doc-1')
+        self.assertEqual([a['annotation_id'] for a in page['annotations']], ['old'])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(list(existing), ['h-old'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# filePath: lambdas/tests/test_comprehensive_check.py
+# Run from lambdas/: python -m pytest tests/test_comprehensive_check.py
+import unittest
+from dataclasses import replace
+from types import ModuleType
+from typing import Any
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from src.agents.v2.v2_tools import comprehensive_check_v2
+from src.tools import comprehensive_check
+from src.utils.services.bedrock_runtime import ClaudeResponse
+from src.utils.services.rate_limiter import AdaptiveRateLimiter
+
+
+def _client_error(code: str, message: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, 'Converse')
+
+
+class _AnalyzeBatchTests:
+    """analyze_batch against a stubbed converse_with_tool; the prompt is the block list"""
+    module: ModuleType
+    analyzer_class: str
+
+    def setUp(self):
+        self.analyzer = getattr(self.module, self.analyzer_class)()
+        self.analyzer.create_analysis_prompt = lambda batch, controls, framework: [
+            replace(b, text=b.text[:self.analyzer.PROMPT_BLOCK_CHARS]) for b in batch['blocks']
+        ]
+        self.calls: list[list[tuple[int, int]]] = []
+        patches = [mock.patch.object(self.module, 'converse_with_tool', self._converse)]
+        if hasattr(self.module, 'analysis_rate_limiter'):
+            patches.append(mock.patch.object(self.module, 'analysis_rate_limiter', AdaptiveRateLimiter(1000)))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.respond = self._all_low
+
+    def _block(self, index: int, chars: int = 10) -> Any:
+        return self.module.EnhancedTextBlock(
+            1, index, 0, 'x' * chars, (0, 0, 1, 1), [], [10.0],
+            False, False, False, False, False, False, index, chars, 1
+        )
+
+    def _converse(self, model_id: str, prompt: Any, tool_spec: Any, max_tokens: int, temperature: float) -> ClaudeResponse:
+        self.calls.append([(b.block_index, len(b.text)) for b in prompt])
+        return self.respond(prompt)
+
+    @staticmethod
+    def _all_low(blocks: list[Any]) -> ClaudeResponse:
+        return ClaudeResponse('', 'end_turn', 0, 0, 0, {'f': [{'b': b.block_index, 's': 'low'} for b in blocks]})
+
+    def _analyze(self, blocks: list[Any]) -> list[dict[str, Any]]:
+        return self.analyzer.analyze_batch({'blocks': blocks}, [], 'GDPR', 1)
+
+    def test_too_long_batch_is_split_in_halves(self):
+        def respond(blocks: list[Any]) -> ClaudeResponse:
+            if len(blocks) > 2:
+                raise _client_error('ValidationException', 'Input is too long for requested model.')
+            return self._all_low(blocks)
+        self.respond = respond
+
+        findings = self._analyze([self._block(i) for i in range(8)])
+        self.assertEqual(sorted(f['block_index'] for f in findings), list(range(8)))
+        self.assertEqual([len(c) for c in self.calls], [8, 4, 2, 2, 4, 2, 2])
+        self.assertEqual(self.analyzer.unanalyzed_blocks, [])
+
+    def test_lone_block_is_resubmitted_with_halved_prompt_text(self):
+        def respond(blocks: list[Any]) -> ClaudeResponse:
+            if sum(len(b.text) for b in blocks) > self.analyzer.PROMPT_BLOCK_CHARS // 2:
+                raise _client_error('ValidationException', 'Input is too long')
+            return self._all_low(blocks)
+        self.respond = respond
+
+        findings = self._analyze([self._block(0, 1600)])
+        self.assertEqual([f['block_index'] for f in findings], [0])
+        self.assertEqual([c[0][1] for c in self.calls],
+                         [self.analyzer.PROMPT_BLOCK_CHARS, self.analyzer.PROMPT_BLOCK_CHARS // 2])
+
+    def test_block_too_short_to_halve_is_recorded_unanalyzed(self):
+        def respond(blocks: list[Any]) -> ClaudeResponse:
+            raise _client_error('ValidationException', 'Input is too long')
+        self.respond = respond
+        self.analyzer.MIN_BLOCK_CHARS = self.analyzer.PROMPT_BLOCK_CHARS
+
+        self.assertEqual(self._analyze([self._block(3, 1000)]), [])
+        self.assertEqual(self.analyzer.unanalyzed_blocks, [3])
+
+    def test_other_errors_record_the_batch_unanalyzed(self):
+        def respond(blocks: list[Any]) -> ClaudeResponse:
+            raise _client_error('ValidationException', 'The provided model identifier is invalid.')
+        self.respond = respond
+
+        self.assertEqual(self._analyze([self._block(i) for i in range(4)]), [])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.analyzer.unanalyzed_blocks, [0, 1, 2, 3])
+
+    def test_max_tokens_resubmits_last_reported_block_and_the_rest(self):
+        def respond(blocks: list[Any]) -> ClaudeResponse:
+            if len(blocks) == 4:
+                return ClaudeResponse('', 'max_tokens', 0, 0, 0, {'f': [{'b': 0, 's': 'high'}, {'b': 1, 's': 'low'}]})
+            return self._all_low(blocks)
+        self.respond = respond
+
+        findings = self._analyze([self._block(i) for i in range(4)])
+        self.assertEqual(sorted(f['block_index'] for f in findings), [0, 1, 2, 3])
+        self.assertEqual([b for b, _ in self.calls[1]], [1])
+        self.assertEqual(findings[0]['severity'], 'high')
+
+
+class ImprovedAnalyzerBatchTest(_AnalyzeBatchTests, unittest.TestCase):
+    module = comprehensive_check
+    analyzer_class = 'ImprovedComplianceAnalyzer'
+
+
+class OptimizedAnalyzerBatchTest(_AnalyzeBatchTests, unittest.TestCase):
+    module = comprehensive_check_v2
+    analyzer_class = 'OptimizedComplianceAnalyzer'
+
+
+if __name__ == '__main__':
+    unittest.main()
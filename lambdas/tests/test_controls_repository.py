@@ -0,0 +1,113 @@
+# filePath: lambdas/tests/test_controls_repository.py
+# Run from lambdas/: python -m pytest tests/test_controls_repository.py
+import os
+import tempfile
+import unittest
+from typing import Any
+from unittest import mock
+
+from src.utils.services import controls_repository as repository_module
+from src.utils.services.controls_repository import (
+    MANIFEST_CONTROL_ID,
+    ControlsRepository,
+    compile_framework,
+)
+from src.utils.services.controls_snapshot import write_snapshot
+
+
+def _control(control_id: str, requirement: str = 'Keep records') -> dict[str, Any]:
+    return {'framework_id': 'gdpr_2025', 'control_id': control_id, 'requirement': requirement, 'severity': 'high'}
+
+
+class FakeControlsTable:
+    """Pages a partition's items, PAGE_SIZE at a time, plus the manifest row"""
+    PAGE_SIZE = 2
+
+    def __init__(self, items: list[dict[str, Any]], manifest_hash: str | None = None):
+        self.items = items
+        self.manifest_hash = manifest_hash
+        self.queries: list[dict[str, Any]] = []
+        self.get_items = 0
+
+    def query(self, **kwargs: Any) -> dict[str, Any]:
+        self.queries.append(kwargs)
+        start = kwargs.get('ExclusiveStartKey', {}).get('offset', 0)
+        response: dict[str, Any] = {'Items': self.items[start:start + self.PAGE_SIZE]}
+        if start + self.PAGE_SIZE < len(self.items):
+            response['LastEvaluatedKey'] = {'offset': start + self.PAGE_SIZE}
+        return response
+
+    def get_item(self, Key: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
+        self.get_items += 1
+        if Key['control_id'] != MANIFEST_CONTROL_ID or self.manifest_hash is None:
+            return {}
+        return {'Item': {'controls_hash': self.manifest_hash}}
+
+
+class RepositoryTestCase(unittest.TestCase):
+    def use_table(self, table: FakeControlsTable) -> None:
+        patch = mock.patch.object(repository_module, 'get_table', return_value=table)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+
+class QueryPartitionTest(RepositoryTestCase):
+    def test_follows_pagination_and_skips_manifest_rows(self):
+        items = [_control('A-1'), {'framework_id': 'gdpr_2025', 'control_id': MANIFEST_CONTROL_ID},
+                 _control('A-2'), _control('A-3'), _control('A-4')]
+        table = FakeControlsTable(items)
+        self.use_table(table)
+
+        controls = ControlsRepository(snapshot_path=None).query_partition('gdpr_2025')
+        self.assertEqual([c['control_id'] for c in controls], ['A-1', 'A-2', 'A-3', 'A-4'])
+        self.assertEqual(len(table.queries), 3)
+        self.assertEqual(table.queries[0]['ExpressionAttributeValues'], {':fw_id': 'gdpr_2025'})
+        self.assertNotIn('ExclusiveStartKey', table.queries[0])
+        self.assertEqual(table.queries[2]['ExclusiveStartKey'], {'offset': 4})
+
+    def test_get_controls_is_cached_per_framework(self):
+        table = FakeControlsTable([_control('A-2'), _control('A-1')])
+        self.use_table(table)
+        repository = ControlsRepository(snapshot_path=None)
+
+        first = repository.get_controls('GDPR')
+        self.assertIs(repository.get_controls('gdpr'), first)
+        self.assertEqual([c['control_id'] for c in first], ['A-1', 'A-2'])
+        self.assertEqual(len(table.queries), 1)
+
+
+class SnapshotStalenessTest(RepositoryTestCase):
+    def setUp(self):
+        self.bundled = compile_framework('gdpr_2025', [_control('A-1'), _control('A-2')])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'controls.snapshot')
+        write_snapshot(self.path, [self.bundled], built_at='2025-01-01T00:00:00Z')
+
+    def test_snapshot_used_when_manifest_hash_matches(self):
+        table = FakeControlsTable([], manifest_hash=self.bundled.controls_hash)
+        self.use_table(table)
+
+        framework = ControlsRepository(snapshot_path=self.path).get_framework('GDPR')
+        self.assertEqual(framework.source, 'snapshot')
+        self.assertEqual([c['control_id'] for c in framework.controls], ['A-1', 'A-2'])
+        self.assertEqual((table.get_items, len(table.queries)), (1, 0))
+
+    def test_stale_snapshot_falls_back_to_partition_query(self):
+        table = FakeControlsTable([_control('A-1', 'Changed'), _control('A-2')], manifest_hash='other')
+        self.use_table(table)
+
+        framework = ControlsRepository(snapshot_path=self.path).get_framework('GDPR')
+        self.assertEqual(framework.source, 'dynamodb')
+        self.assertEqual(framework.by_id['A-1']['requirement'], 'Changed')
+        self.assertEqual(len(table.queries), 1)
+
+    def test_missing_manifest_counts_as_stale(self):
+        table = FakeControlsTable([_control('A-1')])
+        self.use_table(table)
+
+        self.assertEqual(ControlsRepository(snapshot_path=self.path).get_framework('GDPR').source, 'dynamodb')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# filePath: lambdas/tests/test_conversation_store.py
+# Run from lambdas/: python -m pytest tests/test_conversation_store.py
+import re
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any
+from unittest import mock
+
+from src.utils import conversation_store as store_module
+from src.utils.conversation_store import SESSION_TITLE_MAX_CHARS, ConversationStore, update_session_summary
+from src.utils.services.dynamoDB import DynamoDBTable
+
+_SET_ACTION = re.compile(r'(#?\w+) = (?:if_not_exists\((\w+), (:\w+)\)|(:\w+))')
+_ADD_ACTION = re.compile(r'ADD (\w+) (:\w+)')
+
+
+class FakeSessionsTable:
+    """Applies the SET / if_not_exists / ADD update expressions the store writes"""
+
+    def __init__(self):
+        self.items: dict[tuple[str, str], dict[str, Any]] = {}
+        self.queries: list[dict[str, Any]] = []
+
+    def update_item(self, Key: dict[str, Any], UpdateExpression: str, ExpressionAttributeValues: dict[str, Any],
+                    ExpressionAttributeNames: dict[str, str] | None = None) -> None:
+        item = self.items.setdefault((Key['user_id'], Key['session_id']), dict(Key))
+        names = ExpressionAttributeNames or {}
+        set_part, _, add_part = UpdateExpression.partition(' ADD ')
+        for target, guarded, guarded_value, value in _SET_ACTION.findall(set_part):
+            attribute = names.get(target, target)
+            if guarded:
+                item.setdefault(attribute, ExpressionAttributeValues[guarded_value])
+            else:
+                item[attribute] = ExpressionAttributeValues[value]
+        for attribute, value in _ADD_ACTION.findall('ADD ' + add_part):
+            item[attribute] = item.get(attribute, Decimal(0)) + ExpressionAttributeValues[value]
+
+    def query(self, **kwargs: Any) -> dict[str, Any]:
+        self.queries.append(kwargs)
+        items = sorted(
+            (i for i in self.items.values() if i['user_id'] == kwargs['ExpressionAttributeValues'][':uid']),
+            key=lambda i: i['last_message_time'], reverse=not kwargs.get('ScanIndexForward', True)
+        )
+        start = kwargs.get('ExclusiveStartKey', {}).get('offset', 0)
+        response: dict[str, Any] = {'Items': items[start:start + kwargs['Limit']]}
+        if start + kwargs['Limit'] < len(items):
+            response['LastEvaluatedKey'] = {'offset': start + kwargs['Limit']}
+        return response
+
+
+class FakeHistoryTable:
+    def __init__(self):
+        self.items: list[dict[str, Any]] = []
+
+    def put_item(self, Item: dict[str, Any]) -> None:
+        self.items.append(Item)
+
+
+class ConversationStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sessions = FakeSessionsTable()
+        self.history = FakeHistoryTable()
+        tables = {DynamoDBTable.CONVERSATION_SESSIONS: self.sessions, DynamoDBTable.CONVERSATION_HISTORY: self.history}
+        patch = mock.patch.object(store_module, 'get_table', side_effect=tables.__getitem__)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+
+class UpdateSessionSummaryTest(ConversationStoreTestCase):
+    def test_first_user_message_names_the_session(self):
+        update_session_summary('s1', 'u1', 'user', '  Is our\nretention   policy GDPR compliant? ' + 'x' * 100, 't1', ttl=99)
+        summary = self.sessions.items[('u1', 's1')]
+        self.assertEqual(summary['title'], ('Is our retention policy GDPR compliant? ' + 'x' * 100)[:SESSION_TITLE_MAX_CHARS])
+        self.assertEqual(
+            (summary['created_at'], summary['last_message_time'], summary['message_count'], summary['ttl']),
+            ('t1', 't1', 1, 99)
+        )
+
+    def test_later_messages_bump_count_and_time_only(self):
+        update_session_summary('s1', 'u1', 'assistant', 'Welcome', 't1')
+        update_session_summary('s1', 'u1', 'user', 'First question', 't2')
+        update_session_summary('s1', 'u1', 'assistant', 'Answer', 't3')
+        update_session_summary('s1', 'u1', 'user', 'Second question', 't4')
+
+        summary = self.sessions.items[('u1', 's1')]
+        self.assertEqual(summary['title'], 'First question')
+        self.assertEqual((summary['created_at'], summary['last_message_time'], summary['message_count']), ('t1', 't4', 4))
+        self.assertNotIn('ttl', summary)
+
+
+class SessionListingTest(ConversationStoreTestCase):
+    def test_save_message_keeps_summary_for_session_listing(self):
+        # One second between messages, so the recency order does not depend on clock resolution
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        clock = mock.Mock(side_effect=[start + timedelta(seconds=i) for i in range(4)])
+        patch = mock.patch.object(store_module, 'datetime', mock.Mock(now=clock))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        store = ConversationStore()
+        for session_id in ('s1', 's2', 's3'):
+            store.save_message(session_id, 'u1', 'user', f'About {session_id}')
+        store.save_message('s1', 'u1', 'assistant', 'Reply')
+        self.assertEqual(len(self.history.items), 4)
+
+        first = store.get_user_sessions('u1', limit=2)
+        self.assertEqual([s['session_id'] for s in first['sessions']], ['s1', 's3'])
+        self.assertEqual((first['sessions'][0]['message_count'], first['sessions'][0]['title']), (2, 'About s1'))
+        self.assertTrue(first['has_more'])
+        self.assertEqual(self.sessions.queries[0]['IndexName'], 'UserRecentSessionsIndex')
+
+        second = store.get_user_sessions('u1', limit=2, last_key=first['next_page_token'])
+        self.assertEqual([s['session_id'] for s in second['sessions']], ['s2'])
+        self.assertFalse(second['has_more'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# filePath: lambdas/tests/test_extract_json.py
+# Run from lambdas/: python -m pytest tests/test_extract_json.py
+import json
+import unittest
+
+from src.utils.extract_json import LenientJSONError, extract_json_from_response, parse_lenient_json
+
+
+class ValidJSONTest(unittest.TestCase):
+    def test_code_fence_inside_string_value(self):
+        payload = {'summarised_markdown': 'Use:\n```python\nx=1\n```\n', 'tool_payload': {'a': [1, 2]}}
+        self.assertEqual(parse_lenient_json(json.dumps(payload)), payload)
+
+    def test_code_fence_inside_indented_string_value(self):
+        payload = {'markdown': '```json\n{"inner": true}\n```', 'n': 1}
+        self.assertEqual(parse_lenient_json('\n  ' + json.dumps(payload, indent=2) + '\n'), payload)
+
+    def test_expect_array(self):
+        self.assertEqual(parse_lenient_json('[{"a": 1}]', expect='array'), [{'a': 1}])
+
+
+class FencedAndProseTest(unittest.TestCase):
+    def test_prose_around_fenced_payload(self):
+        text = 'Here is the result:\n```json\n{"a": 1, "b": "c"}\n```\nLet me know.'
+        self.assertEqual(parse_lenient_json(text), {'a': 1, 'b': 'c'})
+
+    def test_fence_preferred_over_braces_in_prose(self):
+        text = 'I checked {the policy}:\n```json\n{"verdict": "PARTIAL"}\n```'
+        self.assertEqual(parse_lenient_json(text), {'verdict': 'PARTIAL'})
+
+    def test_braces_in_prose_after_fenced_payload(self):
+        text = 'Done:\n```json\n{"a": None}\n```\nUse {placeholder} names next time.'
+        self.assertEqual(parse_lenient_json(text), {'a': None})
+
+    def test_fenced_payload_with_fence_in_raw_string(self):
+        text = 'Sure!\n```json\n{"a": "x\n```\ny", \'b\': True,}\n```'
+        self.assertEqual(parse_lenient_json(text), {'a': 'x\n```\ny', 'b': True})
+
+    def test_bare_json_in_prose(self):
+        self.assertEqual(parse_lenient_json('The answer is {"a": 1} as requested.'), {'a': 1})
+
+    def test_no_json(self):
+        with self.assertRaises(LenientJSONError):
+            parse_lenient_json('no payload here')
+
+    def test_extract_agent_response_skips_other_objects(self):
+        text = 'Context {"x": 1} then {"response_type": "conversation", "content": {"markdown": "hi"}}'
+        self.assertEqual(extract_json_from_response(text), {'response_type': 'conversation', 'content': {'markdown': 'hi'}})
+
+
+class LenientSyntaxTest(unittest.TestCase):
+    def test_python_literals_and_trailing_comma(self):
+        self.assertEqual(parse_lenient_json("{'a': True, 'b': None, 'c': [1, 2,],}"), {'a': True, 'b': None, 'c': [1, 2]})
+
+    def test_smart_quotes_and_decimal(self):
+        self.assertEqual(parse_lenient_json('{“score”: Decimal(\'1.5\')}'), {'score': 1.5})
+
+    def test_unescaped_quote_inside_string(self):
+        self.assertEqual(parse_lenient_json('{"a": "say "hi" now", "b": 1}'), {'a': 'say "hi" now', 'b': 1})
+
+
+class TruncatedTest(unittest.TestCase):
+    def test_truncated_raises_by_default(self):
+        with self.assertRaises(LenientJSONError):
+            parse_lenient_json('{"a": 1, "b": [1, 2')
+
+    def test_truncated_recovered_when_allowed(self):
+        self.assertEqual(parse_lenient_json('{"a": 1, "b": [1, 2', allow_truncated=True), {'a': 1, 'b': [1, 2]})
+
+    def test_truncated_drop_incomplete(self):
+        text = '[{"id": 1}, {"id": 2, "note": "cut of'
+        self.assertEqual(parse_lenient_json(text, expect='array', drop_incomplete=True, allow_truncated=True), [{'id': 1}])
+
+    def test_truncated_agent_response_is_rejected(self):
+        self.assertIsNone(extract_json_from_response('{"response_type": "conversation", "content": {"markdown": "hi'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# filePath: lambdas/tests/test_rate_limiter.py
+# Run from lambdas/: python -m pytest tests/test_rate_limiter.py
+import unittest
+from typing import Any
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from src.utils.services import rate_limiter
+from src.utils.services.rate_limiter import AdaptiveRateLimiter, call_with_throttle_retry, is_throttling_error
+
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+
+class FakeClock:
+    """time.monotonic/time.sleep pair where sleeping advances the clock"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patch = mock.patch.object(rate_limiter, 'time', self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+
+class AdaptiveRateLimiterTest(RateLimiterTestCase):
+    def test_starts_are_spaced_by_the_rate(self):
+        limiter = AdaptiveRateLimiter(max_rate=4)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [0.25, 0.25])
+
+    def test_throttle_halves_rate_down_to_min_and_success_recovers(self):
+        limiter = AdaptiveRateLimiter(max_rate=8, min_rate=1, recovery_step=0.5)
+        for _ in range(5):
+            limiter.on_throttle()
+        self.assertEqual(limiter.rate, 1)
+        limiter.on_success()
+        self.assertEqual(limiter.rate, 1.5)
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 8)
+
+
+class CallWithThrottleRetryTest(RateLimiterTestCase):
+    def test_throttling_is_retried_with_backoff(self):
+        outcomes: list[Any] = [_client_error('ThrottlingException'), _client_error('TooManyRequestsException'), 'ok']
+
+        def call(item: str) -> str:
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return f'{item}:{outcome}'
+
+        limiter = AdaptiveRateLimiter(max_rate=1000, min_rate=1)
+        self.assertEqual(call_with_throttle_retry(call, 'req', limiter), 'req:ok')
+        self.assertAlmostEqual(limiter.rate, 250.1)
+        backoffs = [s for s in self.clock.sleeps if s >= rate_limiter.BACKOFF_BASE_SECONDS]
+        self.assertEqual(len(backoffs), 2)
+        self.assertGreaterEqual(backoffs[1], 2 * rate_limiter.BACKOFF_BASE_SECONDS)
+
+    def test_other_errors_are_not_retried(self):
+        calls: list[str] = []
+
+        def call(item: str) -> str:
+            calls.append(item)
+            raise _client_error('ValidationException')
+
+        with self.assertRaises(ClientError):
+            call_with_throttle_retry(call, 'req', AdaptiveRateLimiter(max_rate=1000))
+        self.assertEqual(calls, ['req'])
+
+    def test_gives_up_after_retries(self):
+        calls: list[str] = []
+
+        def call(item: str) -> str:
+            calls.append(item)
+            raise _client_error('ThrottlingException')
+
+        with self.assertRaises(ClientError):
+            call_with_throttle_retry(call, 'req', AdaptiveRateLimiter(max_rate=1000), retries=2)
+        self.assertEqual(len(calls), 3)
+
+    def test_is_throttling_error(self):
+        self.assertTrue(is_throttling_error(_client_error('ServiceQuotaExceededException')))
+        self.assertFalse(is_throttling_error(_client_error('AccessDeniedException')))
+        self.assertFalse(is_throttling_error(TimeoutError()))
+
+
+if __name__ == '__main__':
+    unittest.main()
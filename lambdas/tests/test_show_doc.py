@@ -0,0 +1,125 @@
+# filePath: lambdas/tests/test_show_doc.py
+# Run from lambdas/: python -m pytest tests/test_show_doc.py
+import unittest
+from typing import Any
+from unittest import mock
+
+from src.tools.show_doc import show_doc_tool
+from src.utils.services import dynamoDB
+from src.utils.services.dynamoDB import DocumentStatus, DynamoDBTable, batch_get_items, user_file_sort_key
+
+
+class FakeTable:
+    def __init__(self, item: dict[str, Any] | None):
+        self.item = item
+
+    def get_item(self, Key: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
+        return {'Item': self.item} if self.item else {}
+
+
+class FakeDynamoDB:
+    """dynamoDB.dynamodb stand-in: one user item and a Files table served by BatchGetItem"""
+
+    def __init__(self, user_item: dict[str, Any] | None, files: dict[str, dict[str, Any]], unprocessed_once: bool = False):
+        self.user_item = user_item
+        self.files = files
+        self.unprocessed_once = unprocessed_once
+        self.batch_requests: list[list[str]] = []
+
+    def Table(self, name: str) -> FakeTable:
+        return FakeTable(self.user_item)
+
+    def batch_get_item(self, RequestItems: dict[str, Any]) -> dict[str, Any]:
+        request = RequestItems[DynamoDBTable.FILES.value]
+        file_ids = [key['file_id'] for key in request['Keys']]
+        assert len(file_ids) <= dynamoDB.BATCH_GET_LIMIT
+        self.batch_requests.append(file_ids)
+        if self.unprocessed_once and len(file_ids) > 1:
+            self.unprocessed_once = False
+            served, unprocessed = file_ids[:1], file_ids[1:]
+            return {
+                'Responses': {DynamoDBTable.FILES.value: [self.files[f] for f in served if f in self.files]},
+                'UnprocessedKeys': {DynamoDBTable.FILES.value: {**request, 'Keys': [{'file_id': f} for f in unprocessed]}},
+            }
+        return {'Responses': {DynamoDBTable.FILES.value: [self.files[f] for f in file_ids if f in self.files]}}
+
+
+def _file(index: int, status: DocumentStatus = DocumentStatus.ANALYSIS_SUCCEEDED) -> dict[str, Any]:
+    return {
+        'file_id': f'f{index}', 's3_key': f'custom-docs/u/f{index}/policy-{index}.pdf', 'file_type': 'pdf',
+        'file_size': 1024, 'status': status.value, 'created_at': 1_700_000_000_000 + index, 'page_count': 3,
+    }
+
+
+class DynamoDBTestCase(unittest.TestCase):
+    def use_dynamodb(self, fake: FakeDynamoDB) -> FakeDynamoDB:
+        for patch in (mock.patch.object(dynamoDB, 'dynamodb', fake), mock.patch.object(dynamoDB.time, 'sleep')):
+            patch.start()
+            self.addCleanup(patch.stop)
+        return fake
+
+
+class BatchGetItemsTest(DynamoDBTestCase):
+    def test_chunks_of_100_and_unprocessed_keys_retried(self):
+        files = {f'f{i}': _file(i) for i in range(250)}
+        fake = self.use_dynamodb(FakeDynamoDB(None, files, unprocessed_once=True))
+
+        items = batch_get_items(DynamoDBTable.FILES, [{'file_id': f} for f in files])
+        self.assertEqual(sorted(i['file_id'] for i in items), sorted(files))
+        self.assertEqual([len(r) for r in fake.batch_requests], [100, 99, 100, 50])
+
+
+class ShowDocPagingTest(DynamoDBTestCase):
+    def setUp(self):
+        files = {f'f{i}': _file(i) for i in range(7)}
+        files['f3'] = _file(3, DocumentStatus.PROCESSING)
+        self.fake = self.use_dynamodb(FakeDynamoDB({
+            'user_id': 'user-1',
+            'uploaded_files': set(files),
+            'file_sort_keys': {user_file_sort_key(f['created_at'], fid) for fid, f in files.items()},
+        }, files))
+
+    def _all_pages(self, limit: int, newest_first: bool = True) -> list[list[str]]:
+        pages: list[list[str]] = []
+        token = None
+        while True:
+            result = show_doc_tool('user-1', limit=limit, last_key=token, newest_first=newest_first)
+            pages.append([d['document_id'] for d in result['documents']])
+            if not result['has_more']:
+                return pages
+            token = result['next_page_token']
+
+    def test_pages_newest_first_and_skip_files_not_uploaded(self):
+        self.assertEqual(self._all_pages(limit=2), [['f6', 'f5'], ['f4', 'f2'], ['f1', 'f0']])
+
+    def test_oldest_first(self):
+        self.assertEqual(self._all_pages(limit=4, newest_first=False), [['f0', 'f1', 'f2', 'f4'], ['f5', 'f6']])
+
+    def test_only_page_files_are_fetched(self):
+        result = show_doc_tool('user-1', limit=2)
+        self.assertEqual(result['next_page_token'], {'created_at': 1_700_000_000_005, 'file_id': 'f5'})
+        self.assertEqual(self.fake.batch_requests, [['f6', 'f5']])
+        self.assertEqual(result['documents'][0]['file_name'], 'policy-6.pdf')
+
+    def test_cursor_survives_new_uploads(self):
+        token = show_doc_tool('user-1', limit=2)['next_page_token']
+        new = _file(9)
+        self.fake.files['f9'] = new
+        self.fake.user_item['uploaded_files'].add('f9')
+        self.fake.user_item['file_sort_keys'].add(user_file_sort_key(new['created_at'], 'f9'))
+
+        result = show_doc_tool('user-1', limit=2, last_key=token)
+        self.assertEqual([d['document_id'] for d in result['documents']], ['f4', 'f2'])
+
+    def test_users_without_sort_keys_are_derived_from_files(self):
+        del self.fake.user_item['file_sort_keys']
+        self.assertEqual(self._all_pages(limit=3), [['f6', 'f5', 'f4'], ['f2', 'f1', 'f0']])
+
+    def test_user_without_files(self):
+        self.fake.user_item = None
+        result = show_doc_tool('user-1', limit=2)
+        self.assertEqual((result['documents'], result['has_more']), ([], False))
+
+
+if __name__ == '__main__':
+    unittest.main()
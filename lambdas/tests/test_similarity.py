@@ -0,0 +1,87 @@
+# filePath: lambdas/tests/test_similarity.py
+# Run from lambdas/: python -m pytest tests/test_similarity.py
+import random
+import unittest
+from typing import Any
+from unittest import mock
+
+import numpy as np
+
+import comprehensive_check_handler
+from src.utils.services.control_index import ControlIndex
+from src.utils.services.document_extractor import cosine_similarity
+from src.utils.services.similarity import normalize_rows, top_k_indices, top_k_matches
+
+
+class TopKTest(unittest.TestCase):
+    def test_top_k_indices_highest_first(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7, 0.2], dtype=np.float32)
+        self.assertEqual(top_k_indices(scores, 3).tolist(), [1, 3, 2])
+        self.assertEqual(top_k_indices(scores, 10).tolist(), [1, 3, 2, 4, 0])
+        self.assertEqual(top_k_indices(scores, 0).tolist(), [])
+
+    def test_zero_rows_score_zero(self):
+        rows = normalize_rows([[0, 0], [3, 4]])
+        self.assertEqual(rows[0].tolist(), [0, 0])
+        self.assertAlmostEqual(float(np.linalg.norm(rows[1])), 1.0, places=6)
+
+    def test_matches_pairwise_cosine_loop(self):
+        rng = random.Random(7)
+        queries = [[rng.gauss(0, 1) for _ in range(16)] for _ in range(6)]
+        candidates = [[rng.gauss(0, 1) for _ in range(16)] for _ in range(40)]
+
+        matches = top_k_matches(queries, candidates, k=5, threshold=0.1)
+        for query, query_matches in zip(queries, matches):
+            scored = sorted(
+                ((i, cosine_similarity(query, c)) for i, c in enumerate(candidates)),
+                key=lambda pair: -pair[1]
+            )
+            expected = [(i, s) for i, s in scored[:5] if s > 0.1]
+            self.assertEqual([i for i, _ in query_matches], [i for i, _ in expected])
+            for (_, got), (_, want) in zip(query_matches, expected):
+                self.assertAlmostEqual(got, want, places=5)
+
+    def test_empty_inputs(self):
+        self.assertEqual(top_k_matches([], [[1, 0]], k=3), [])
+        self.assertEqual(top_k_matches([[1, 0], [0, 1]], [], k=3), [[], []])
+
+
+class ControlIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ControlIndex(['A', 'B', 'C'], np.array([[1, 0], [0, 1], [1, 1]], dtype=np.float32))
+
+    def test_centroid_scores_mean_query_direction(self):
+        ranked = self.index.top_k([[1, 0], [0, 1]], k=1)
+        self.assertEqual(ranked[0][0], 'C')
+
+    def test_max_scores_best_query_per_control(self):
+        ranked = [cid for cid, _ in self.index.top_k([[1, 0], [0, 1]], k=2, reduce='max')]
+        self.assertEqual(sorted(ranked), ['A', 'B'])
+
+
+class FindRelevantChunksTest(unittest.TestCase):
+    def test_precomputed_control_embeddings_are_not_re_embedded(self):
+        chunks: list[dict[str, Any]] = [{'text': t} for t in ('retention', 'consent', 'breach')]
+        vectors = {'retention': [1, 0, 0], 'consent': [0, 1, 0], 'breach': [0, 0, 1], 'Notify breaches ': [0, 0.2, 1]}
+        embedded: list[list[str]] = []
+
+        def generate_embeddings(texts: list[str]) -> list[list[float]]:
+            embedded.append(texts)
+            return [vectors[t] for t in texts]
+
+        controls = [
+            {'control_id': 'C1', 'requirement': 'Keep data', 'keywords': []},
+            {'control_id': 'C2', 'requirement': 'Notify breaches', 'keywords': []},
+        ]
+        with mock.patch.object(comprehensive_check_handler, 'generate_embeddings', generate_embeddings):
+            relevant = comprehensive_check_handler.find_relevant_chunks(
+                chunks, controls, top_k=2, query_embeddings={'C1': [0.9, 0.1, 0]}
+            )
+
+        self.assertEqual([c['text'] for c in relevant['C1']], ['retention'])
+        self.assertEqual([c['text'] for c in relevant['C2']], ['breach'])
+        self.assertEqual(embedded, [['retention', 'consent', 'breach'], ['Notify breaches ']])
+
+
+if __name__ == '__main__':
+    unittest.main()
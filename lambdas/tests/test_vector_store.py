@@ -0,0 +1,51 @@
+# filePath: lambdas/tests/test_vector_store.py
+# Run from lambdas/: python -m pytest tests/test_vector_store.py
+import unittest
+
+import numpy as np
+
+from src.utils.services.controls_snapshot import ControlsSnapshot, FrameworkSnapshot
+from src.utils.services.vector_store import EmbeddedVectorStore
+
+
+def _framework(framework_id: str, model: str, rows: list[list[float]]) -> FrameworkSnapshot:
+    ids = [f'{framework_id}-{i}' for i in range(len(rows))]
+    return FrameworkSnapshot(
+        framework_id=framework_id,
+        controls_hash='h',
+        controls=[{'framework_id': framework_id, 'control_id': cid, 'requirement': cid} for cid in ids],
+        keywords={},
+        embedding_model=model,
+        embedding_dim=len(rows[0]),
+        embedding_ids=ids,
+        embeddings=memoryview(np.array(rows, dtype=np.float32).tobytes()).cast('f'),
+    )
+
+
+class FromSnapshotTest(unittest.TestCase):
+    def test_search_ranks_by_cosine_within_framework(self):
+        snapshot = ControlsSnapshot('now', {
+            'GDPR': _framework('GDPR', 'm1', [[1, 0], [0, 1], [1, 1]]),
+            'SOC2': _framework('SOC2', 'm1', [[1, 0]]),
+        })
+        store = EmbeddedVectorStore.from_snapshot(snapshot, 'm1')
+        hits = store.search([0.9, 0.1], 'GDPR', k=2)
+        self.assertEqual([h['control_id'] for h in hits], ['GDPR-0', 'GDPR-2'])
+
+    def test_frameworks_of_another_model_are_left_out(self):
+        snapshot = ControlsSnapshot('now', {
+            'GDPR': _framework('GDPR', 'm1', [[1, 0]]),
+            'SOC2': _framework('SOC2', 'm2', [[1, 0]]),
+        })
+        store = EmbeddedVectorStore.from_snapshot(snapshot, 'm1')
+        self.assertEqual(store.search([1, 0], 'SOC2'), [])
+        self.assertNotIn('SOC2', store.ranges)
+
+    def test_no_embeddings_of_the_profile_raises(self):
+        snapshot = ControlsSnapshot('now', {'GDPR': _framework('GDPR', 'm2', [[1, 0]])})
+        with self.assertRaisesRegex(ValueError, 'no embeddings of m1'):
+            EmbeddedVectorStore.from_snapshot(snapshot, 'm1')
+
+
+if __name__ == '__main__':
+    unittest.main()